@@ -0,0 +1,90 @@
+"""Gerador de usuários sintéticos realistas: nomes brasileiros, CPFs com dígitos verificadores válidos, CEPs e e-mails"""
+import random
+import unicodedata
+import uuid
+
+PRENOMES = ('Ana', 'Maria', 'João', 'José', 'Antônio', 'Francisco', 'Carlos', 'Paulo',
+            'Pedro', 'Lucas', 'Luiz', 'Marcos', 'Luís', 'Gabriel', 'Rafael', 'Daniel',
+            'Marcelo', 'Bruno', 'Eduardo', 'Felipe', 'Raimundo', 'Rodrigo', 'Manoel',
+            'Juliana', 'Márcia', 'Fernanda', 'Patrícia', 'Aline', 'Adriana', 'Sandra',
+            'Camila', 'Amanda', 'Bruna', 'Jéssica', 'Letícia', 'Júlia', 'Luciana',
+            'Vanessa', 'Mariana', 'Gabriela', 'Vitória', 'Beatriz', 'Conceição', 'Sebastião')
+
+SOBRENOMES = ('Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves',
+              'Pereira', 'Lima', 'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho',
+              'Almeida', 'Lopes', 'Soares', 'Fernandes', 'Vieira', 'Barbosa', 'Rocha',
+              'Dias', 'Nascimento', 'Andrade', 'Moreira', 'Nunes', 'Marques', 'Machado',
+              'Mendes', 'Freitas', 'Cardoso', 'Ramos', 'Gonçalves', 'Santana', 'Teixeira',
+              'Araújo', 'Melo', 'Barros', 'Cavalcanti', 'Magalhães', 'Brandão', 'Conceição')
+
+DOMINIOS = ('gmail.com', 'hotmail.com', 'outlook.com', 'yahoo.com.br', 'uol.com.br',
+            'bol.com.br', 'terra.com.br', 'ig.com.br')
+
+# Multiplicador coprimo com 10^9: percorre as bases de CPF sem repetir
+_PASSO_CPF = 387420489
+
+
+def digitos_verificadores(base):
+    """Os dois dígitos verificadores dos 9 primeiros dígitos do CPF (texto)"""
+    digitos = [int(d) for d in base]
+    for peso_inicial in (10, 11):
+        soma = sum(d * peso for d, peso in zip(digitos, range(peso_inicial, 1, -1)))
+        resto = soma * 10 % 11
+        digitos.append(0 if resto == 10 else resto)
+    return f'{digitos[9]}{digitos[10]}'
+
+
+def gerar_cpf(sequencia, deslocamento=0):
+    """CPF formatado e válido, diferente para cada número de sequência (até 10^9)"""
+    base = f'{(deslocamento + sequencia * _PASSO_CPF) % 10 ** 9:09d}'
+    if len(set(base)) == 1:
+        # 111.111.111-11 e afins são inválidos
+        base = base[:8] + str((int(base[8]) + 1) % 10)
+    cpf = base + digitos_verificadores(base)
+    return f'{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}'
+
+
+def gerar_cep(aleatorio):
+    """CEP formatado (faixa 01000-000 a 99999-999, como os CEPs reais)"""
+    return f'{aleatorio.randint(1000, 99999):05d}-{aleatorio.randint(0, 999):03d}'
+
+
+def _sem_acentos(texto):
+    decomposto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def gerar_dados(sequencia, aleatorio, deslocamento=0):
+    """Campos do formulário (nome, cpf, idade, email, cep) de um usuário sintético"""
+    prenome = aleatorio.choice(PRENOMES)
+    sobrenomes = aleatorio.sample(SOBRENOMES, aleatorio.choice((1, 2, 2, 3)))
+    nome = ' '.join([prenome] + sobrenomes)
+    # O número de sequência garante e-mails únicos
+    email = (f'{_sem_acentos(prenome)}.{_sem_acentos(sobrenomes[-1])}{sequencia}'
+             f'@{aleatorio.choice(DOMINIOS)}')
+    return {
+        'nome': nome,
+        'cpf': gerar_cpf(sequencia, deslocamento),
+        'idade': aleatorio.randint(1, 99),
+        'email': email,
+        'cep': gerar_cep(aleatorio),
+    }
+
+
+def gerar_usuarios(quantidade, semente=0, inicio=0):
+    """Gera usuários completos (esquema do JSON) numerados a partir de 'inicio'
+
+    A mesma semente gera sempre os mesmos dados; sequências diferentes
+    nunca repetem CPF nem e-mail.
+    """
+    aleatorio = random.Random(semente)
+    deslocamento = aleatorio.randrange(10 ** 9)
+    aleatorio.seed(f'{semente}:{inicio}')
+    for sequencia in range(inicio, inicio + quantidade):
+        usuario = gerar_dados(sequencia, aleatorio, deslocamento)
+        usuario['id'] = uuid.UUID(int=aleatorio.getrandbits(128), version=4).hex
+        usuario['data_cadastro'] = (f'{aleatorio.randint(1, 28):02d}/{aleatorio.randint(1, 12):02d}/'
+                                    f'{aleatorio.randint(2020, 2025)} {aleatorio.randint(0, 23):02d}:'
+                                    f'{aleatorio.randint(0, 59):02d}:{aleatorio.randint(0, 59):02d}')
+        usuario['versao'] = 1
+        yield usuario
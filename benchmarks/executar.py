@@ -0,0 +1,238 @@
+"""Mede os caminhos críticos do cadastro em vários tamanhos e grava os tempos em JSON
+
+Uso: python benchmarks/executar.py [--tamanhos 1000,100000,1000000] [--saida arquivo.json]
+     [--comparar resultados_anteriores.json]
+
+A lista virtual usa uma Treeview real quando há display (por exemplo
+com xvfb-run) e a TreeviewFalsa em memória quando não há.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(PASTA), 'source_code.py'))
+
+from dados_sinteticos import gerar_usuarios
+from treeview_falsa import TreeviewFalsa, BarraFalsa
+from lista_virtual import ListaVirtual
+from ordenacao import COLUNAS
+from persistencia import criar_armazenamento, gravar_snapshot, OP_INSERIR
+from servico import RepositorioUsuarios, ServicoUsuarios
+
+TAMANHOS = (1000, 100000, 1000000)
+
+# Operações individuais (inserção, edição, ...) medidas em cada tamanho
+OPERACOES = 1000
+
+# Redesenhos da lista medidos por visão (sem filtro, buscada, ordenada)
+REDESENHOS = 100
+
+# Consultas usadas na medição da busca
+CONSULTAS = ('silva', 'maria oliveira', 'conceição', '123', '4567', 'gmail', 'ana.s', 'zzzz')
+
+# Uma operação acima disto (proporcionalmente) é apontada como regressão
+TOLERANCIA = 0.2
+
+# Extensão do arquivo do cadastro por tipo de armazenamento (os demais usam JSON)
+EXTENSOES = {'sqlite': '.db', 'binario': '.bin'}
+
+
+def formatar_linha(usuario):
+    """Mesmos valores exibidos pela interface (ModernCRUDApp.valores_linha)"""
+    return usuario['nome'], usuario['cpf'], usuario['idade'], usuario['email'], usuario['cep']
+
+
+def criar_lista(usar_tk=True):
+    """ListaVirtual sobre uma Treeview do Tk ou, sem display, sobre a TreeviewFalsa"""
+    if usar_tk:
+        try:
+            import tkinter as tk
+            from tkinter import ttk
+        except ImportError:
+            tk = None
+        if tk is not None:
+            try:
+                root = tk.Tk()
+                root.withdraw()
+                tree = ttk.Treeview(root, columns=COLUNAS, show='headings', height=15)
+                return ListaVirtual(tree, ttk.Scrollbar(root), formatar_linha), 'tk'
+            except tk.TclError:
+                pass
+    return ListaVirtual(TreeviewFalsa(), BarraFalsa(), formatar_linha), 'falsa'
+
+
+class Cronometro:
+    """Acumula os tempos de cada operação de um tamanho"""
+
+    def __init__(self):
+        self.resultados = {}
+
+    def medir(self, nome, funcao, operacoes=1):
+        inicio = time.perf_counter()
+        retorno = funcao()
+        segundos = time.perf_counter() - inicio
+        self.resultados[nome] = {
+            'segundos': round(segundos, 6),
+            'operacoes': operacoes,
+            'ms_por_operacao': round(segundos * 1000 / max(operacoes, 1), 4),
+        }
+        print(f"  {nome:<26} {segundos:10.3f} s  ({operacoes} op)", flush=True)
+        return retorno
+
+
+def _gravar_completo(tipo, caminho, usuarios):
+    if tipo == 'sqlite':
+        armazenamento = criar_armazenamento(tipo, caminho)
+        armazenamento.aplicar([(OP_INSERIR, usuario) for usuario in usuarios], usuarios)
+        armazenamento.fechar()
+    else:
+        gravar_snapshot(caminho, usuarios)
+
+
+def _carregar_completo(armazenamento):
+    repositorio = RepositorioUsuarios()
+    for pagina in armazenamento.carregar_paginas():
+        repositorio.inserir_lote(pagina)
+    return repositorio
+
+
+def medir_tamanho(tamanho, tipo, lista, pasta, operacoes=OPERACOES, semente=0):
+    """Executa todas as medições sobre um cadastro sintético de 'tamanho' usuários"""
+    cronometro = Cronometro()
+    medir = cronometro.medir
+    aleatorio = random.Random(semente)
+    caminho = os.path.join(pasta, f'usuarios_{tamanho}' + EXTENSOES.get(tipo, '.json'))
+
+    usuarios = medir('geracao', lambda: list(gerar_usuarios(tamanho, semente)), tamanho)
+    medir('gravacao_completa', lambda: _gravar_completo(tipo, caminho, usuarios), tamanho)
+    del usuarios
+
+    armazenamento = criar_armazenamento(tipo, caminho)
+    try:
+        repositorio = medir('carga_completa', lambda: _carregar_completo(armazenamento), tamanho)
+        gravadas = []
+        servico = ServicoUsuarios(repositorio, gravadas.extend)
+        quantidade = min(operacoes, tamanho)
+        # Continuação da mesma sequência: CPFs e e-mails ainda não cadastrados
+        novos = list(gerar_usuarios(quantidade, semente, inicio=tamanho))
+        existentes = aleatorio.sample(repositorio.usuarios, quantidade)
+
+        medir('validacao', lambda: [servico.validar(dados) for dados in novos], quantidade)
+        indice = repositorio.indice
+        medir('duplicidade', lambda: [(indice.cpf_em_uso(usuario['cpf']),
+                                       indice.email_em_uso(usuario['email']))
+                                      for usuario in existentes], quantidade)
+        medir('insercao', lambda: [servico.cadastrar(dados) for dados in novos], quantidade)
+        medir('atualizacao', lambda: [servico.atualizar(usuario['id'],
+                                                        dict(usuario, nome=usuario['nome'] + ' Jr'),
+                                                        usuario.get('versao', 0))
+                                      for usuario in existentes], quantidade)
+        editados = [repositorio.obter(usuario['id']) for usuario in existentes]
+        medir('exclusao', lambda: [servico.excluir(usuario['id']) for usuario in editados],
+              quantidade)
+        medir('gravacao_operacoes', lambda: armazenamento.aplicar(gravadas, repositorio.usuarios),
+              len(gravadas))
+
+        medir('busca', lambda: [len(repositorio.visao(consulta)) for consulta in CONSULTAS],
+              len(CONSULTAS))
+        medir('ordenacao', lambda: [repositorio.visao('', coluna)[0:1]
+                                    for coluna in range(len(COLUNAS))], len(COLUNAS))
+
+        visoes = (('atualizar_lista', ''), ('atualizar_lista_busca', 'silva'))
+        for nome, consulta in visoes:
+            medir(nome, lambda: [lista.definir_dados(repositorio.visao(consulta))
+                                 for _ in range(REDESENHOS)], REDESENHOS)
+        medir('atualizar_lista_ordenada',
+              lambda: [lista.definir_dados(repositorio.visao('', i % len(COLUNAS), i % 2 == 1))
+                       for i in range(REDESENHOS)], REDESENHOS)
+        medir('rolagem', lambda: [lista.rolar('moveto', i / REDESENHOS) for i in range(REDESENHOS)],
+              REDESENHOS)
+    finally:
+        armazenamento.fechar()
+    return cronometro.resultados
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PASTA,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(atual, anterior, tolerancia=TOLERANCIA):
+    """Imprime a razão atual/anterior de cada operação; retorna as regressões encontradas"""
+    regressoes = []
+    if atual['armazenamento'] != anterior.get('armazenamento'):
+        print(f"Atenção: comparando {atual['armazenamento']} com {anterior.get('armazenamento')}")
+    for tamanho, operacoes in atual['resultados'].items():
+        antigas = anterior['resultados'].get(tamanho, {})
+        for nome, medicao in operacoes.items():
+            if nome not in antigas or not antigas[nome]['segundos']:
+                continue
+            razao = medicao['segundos'] / antigas[nome]['segundos']
+            marca = ''
+            if razao > 1 + tolerancia:
+                marca = '  <- regressão'
+                regressoes.append((tamanho, nome, razao))
+            print(f"{tamanho:>8} {nome:<26} {razao:6.2f}x{marca}")
+    return regressoes
+
+
+def executar(tamanhos=TAMANHOS, tipo='diario', usar_tk=True, operacoes=OPERACOES, semente=0):
+    """Mede todos os tamanhos; retorna o documento gravado no JSON de resultados"""
+    lista, treeview = criar_lista(usar_tk)
+    resultados = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        for tamanho in tamanhos:
+            print(f"{tamanho} usuários ({tipo}, treeview {treeview})", flush=True)
+            resultados[str(tamanho)] = medir_tamanho(tamanho, tipo, lista, pasta,
+                                                     operacoes, semente)
+    return {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'armazenamento': tipo,
+        'treeview': treeview,
+        'semente': semente,
+        'resultados': resultados,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark das operações do cadastro")
+    parser.add_argument('--tamanhos', default=','.join(map(str, TAMANHOS)),
+                        help="quantidades de usuários separadas por vírgula")
+    parser.add_argument('--armazenamento', choices=('diario', 'json', 'binario', 'sqlite'),
+                        default='diario')
+    parser.add_argument('--operacoes', type=int, default=OPERACOES,
+                        help="inserções, edições e exclusões medidas em cada tamanho")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--sem-tk', action='store_true', help="usa a Treeview falsa mesmo com display")
+    parser.add_argument('--saida', default=os.path.join(PASTA, 'resultados.json'))
+    parser.add_argument('--comparar', help="JSON de uma execução anterior")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA)
+    args = parser.parse_args()
+
+    documento = executar([int(t) for t in args.tamanhos.split(',')], args.armazenamento,
+                         not args.sem_tk, args.operacoes, args.semente)
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(documento, f, ensure_ascii=False, indent=2)
+    print(f"Resultados gravados em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            anterior = json.load(f)
+        regressoes = comparar(documento, anterior, args.tolerancia)
+        if regressoes:
+            print(f"{len(regressoes)} regressão(ões) acima de {args.tolerancia:.0%}")
+            sys.exit(1)
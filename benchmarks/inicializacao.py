@@ -0,0 +1,119 @@
+"""Mede o tempo até a primeira tela do cadastro, cada vez em um processo novo
+
+Uso: python benchmarks/inicializacao.py [--usuarios 100000] [--repeticoes 5] [--meta 1.0]
+
+Precisa de display (ou xvfb-run). O cadastro sintético é gravado em uma
+pasta temporária e a interface é aberta nela; o tempo conta da criação do
+processo até a janela estar desenhada (primeira tela) e até a lista estar
+completa. Sai com código 1 se a mediana da primeira tela passar da meta.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+CODIGO = os.path.join(os.path.dirname(PASTA), 'source_code.py')
+sys.path.insert(0, CODIGO)
+
+# Meta (s) para a janela aparecer desenhada, contada desde a criação do processo
+META_PRIMEIRA_TELA = 1.0
+
+USUARIOS = 100000
+REPETICOES = 5
+
+# Intervalo (ms) de verificação do fim da carga no processo medido
+INTERVALO_VERIFICACAO = 10
+
+
+def preparar_cadastro(pasta, quantidade, tipo, semente=0):
+    """Grava 'quantidade' usuários sintéticos no arquivo que a interface abre na pasta"""
+    # Importados aqui para o processo medido carregar só o que a interface carrega
+    from dados_sinteticos import gerar_usuarios
+    from persistencia import (criar_armazenamento, gravar_snapshot, ARQUIVO_BINARIO,
+                              ARQUIVO_DADOS, OP_INSERIR)
+
+    usuarios = list(gerar_usuarios(quantidade, semente))
+    if tipo == 'sqlite':
+        from armazenamento_sqlite import ARQUIVO_BANCO
+        armazenamento = criar_armazenamento(tipo, os.path.join(pasta, ARQUIVO_BANCO))
+        armazenamento.aplicar([(OP_INSERIR, usuario) for usuario in usuarios], usuarios)
+        armazenamento.fechar()
+    else:
+        arquivo = ARQUIVO_BINARIO if tipo == 'binario' else ARQUIVO_DADOS
+        gravar_snapshot(os.path.join(pasta, arquivo), usuarios)
+
+
+def abrir_interface():
+    """Processo medido: abre a interface e imprime (em JSON) os instantes da primeira tela e da lista completa"""
+    import tkinter as tk
+    from Atividade_SA import ModernCRUDApp
+
+    instantes = {}
+    root = tk.Tk()
+    app = ModernCRUDApp(root)
+
+    # A carga começa logo depois da primeira tela desenhada
+    carregar_dados = app.carregar_dados
+
+    def primeira_tela():
+        instantes['primeira_tela'] = time.time()
+        carregar_dados()
+        root.after(INTERVALO_VERIFICACAO, verificar_carga)
+
+    def verificar_carga():
+        if app.carregando:
+            root.after(INTERVALO_VERIFICACAO, verificar_carga)
+            return
+        instantes['lista_completa'] = time.time()
+        print(json.dumps(instantes), flush=True)
+        app.ao_fechar()
+
+    app.carregar_dados = primeira_tela
+    root.mainloop()
+
+
+def medir(pasta, tipo):
+    """Uma abertura da interface: (primeira tela, lista completa) em segundos"""
+    ambiente = dict(os.environ, CADASTRO_ARMAZENAMENTO=tipo)
+    inicio = time.time()
+    saida = subprocess.run([sys.executable, os.path.abspath(__file__), '--filho'], cwd=pasta,
+                           env=ambiente, capture_output=True, text=True, check=True).stdout
+    instantes = json.loads(saida.strip().splitlines()[-1])
+    return instantes['primeira_tela'] - inicio, instantes['lista_completa'] - inicio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tempo até a primeira tela do cadastro")
+    parser.add_argument('--usuarios', type=int, default=USUARIOS)
+    parser.add_argument('--repeticoes', type=int, default=REPETICOES)
+    parser.add_argument('--armazenamento', choices=('diario', 'json', 'binario', 'sqlite'),
+                        default='diario')
+    parser.add_argument('--meta', type=float, default=META_PRIMEIRA_TELA,
+                        help="mediana máxima (s) até a primeira tela")
+    parser.add_argument('--filho', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        abrir_interface()
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        preparar_cadastro(pasta, args.usuarios, args.armazenamento)
+        telas, listas = [], []
+        for repeticao in range(1, args.repeticoes + 1):
+            tela, lista = medir(pasta, args.armazenamento)
+            telas.append(tela)
+            listas.append(lista)
+            print(f"{repeticao}: primeira tela {tela:.3f} s, lista completa {lista:.3f} s", flush=True)
+
+    mediana = statistics.median(telas)
+    print(f"Mediana: primeira tela {mediana:.3f} s (meta {args.meta:.3f} s), "
+          f"lista completa {statistics.median(listas):.3f} s ({args.usuarios} usuários)")
+    if mediana > args.meta:
+        print("Primeira tela acima da meta")
+        sys.exit(1)
@@ -0,0 +1,77 @@
+"""Treeview e Scrollbar em memória para medir a ListaVirtual sem display (sem Xvfb)"""
+
+
+class TreeviewFalsa:
+    """Implementa só os métodos da ttk.Treeview usados pela ListaVirtual"""
+
+    def __init__(self, altura=15):
+        self.altura = altura
+        self.itens = []
+        self.valores = {}
+        self.selecao = ()
+
+    def cget(self, opcao):
+        return self.altura
+
+    def configure(self, **opcoes):
+        pass
+
+    def bind(self, evento, funcao):
+        pass
+
+    def after_idle(self, funcao):
+        pass
+
+    def get_children(self, item=''):
+        return tuple(self.itens)
+
+    def exists(self, iid):
+        return iid in self.valores
+
+    def insert(self, pai, posicao, iid, values=()):
+        self.itens.insert(posicao, iid)
+        self.valores[iid] = tuple(values)
+        return iid
+
+    def item(self, iid, values=None):
+        if values is not None:
+            self.valores[iid] = tuple(values)
+        return {'values': self.valores[iid]}
+
+    def move(self, iid, pai, posicao):
+        self.itens.remove(iid)
+        self.itens.insert(posicao, iid)
+
+    def delete(self, *iids):
+        removidos = set(iids)
+        self.itens = [iid for iid in self.itens if iid not in removidos]
+        for iid in iids:
+            del self.valores[iid]
+
+    def selection(self):
+        return self.selecao
+
+    def selection_set(self, itens):
+        self.selecao = tuple(itens)
+
+    def focus(self, iid=None):
+        pass
+
+    def yview(self):
+        return 0.0, 1.0
+
+    def yview_moveto(self, fracao):
+        pass
+
+
+class BarraFalsa:
+    """Scrollbar que só guarda a última posição"""
+
+    def __init__(self):
+        self.posicao = (0.0, 1.0)
+
+    def configure(self, **opcoes):
+        pass
+
+    def set(self, primeiro, ultimo):
+        self.posicao = (primeiro, ultimo)
@@ -1,9 +1,24 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, font
-import json
+from tkinter import ttk, font
+from tkinter import messagebox as tk_messagebox, filedialog as tk_filedialog
 from datetime import datetime
+from time import perf_counter
 import os
-import re
+from persistencia import (criar_armazenamento, TAMANHO_PAGINA, ErroConflito,
+                          TrabalhadorPersistencia,
+                          OP_INSERIR, OP_ATUALIZAR, OP_REMOVER)
+from snapshot_binario import SnapshotCorrompido
+from lista_virtual import ListaVirtual
+from ordenacao import COLUNAS
+from servico import (RepositorioUsuarios, ServicoUsuarios, ErroValidacao,
+                     ErroDuplicado, UsuarioNaoEncontrado)
+from instrumentacao import (cronometrar, metricas, Dialogos, MonitorLaco,
+                            iniciar_perfil, encerrar_perfil)
+from painel_desempenho import PainelDesempenho
+from mascaras import CampoMascarado, MASCARA_CPF, MASCARA_CEP, MASCARA_IDADE, MASCARA_DATA
+from indice_cep import IndiceCep
+from indice_tempo import epoca_data
+import validacao
 
 # Cores do Sistema
 branco = "#ffffff"
@@ -15,20 +30,85 @@ preto_suave = "#2c3e50"
 azul_suave_bg = "#d0d7db"
 azul_cinza = "#2a4b61"
 
+# Meio de armazenamento: 'diario' (JSON + diário), 'json' (regrava tudo), 'binario' ou 'sqlite'
+TIPO_ARMAZENAMENTO = os.environ.get('CADASTRO_ARMAZENAMENTO', 'diario')
+
+# Intervalo (ms) de verificação dos resultados da thread de persistência
+INTERVALO_PERSISTENCIA = 100
+
+# Espera (ms) após a última tecla antes de executar a busca
+ATRASO_BUSCA = 250
+
+# Máscara de cada tipo de campo do formulário
+MASCARAS = {'cpf': MASCARA_CPF, 'number': MASCARA_IDADE, 'cep': MASCARA_CEP}
+
+# Campos da edição em lote (rótulo exibido -> campo do cadastro)
+CAMPOS_EDICAO_LOTE = {'CEP': 'cep', 'Idade': 'idade', 'Nome': 'nome'}
+
+# Datas do filtro por período (rótulo exibido -> campo do IndiceTempo)
+CAMPOS_FILTRO_DATA = {'Cadastro': 'cadastro', 'Alteração': 'alteracao'}
+
+# Cadastros parecidos listados no aviso de possível duplicata
+MAXIMO_AVISO_DUPLICATAS = 5
+
+# Cor do campo de data inválida
+vermelho_erro = "#c0392b"
+
+# Tamanho fixo da janela principal
+LARGURA_JANELA = 1700
+ALTURA_JANELA = 900
+
+# Tecla que abre o painel de desempenho (oculto)
+TECLA_PAINEL = '<F12>'
+
+# O tempo com um diálogo aberto (esperando o usuário) não entra nas medições
+messagebox = Dialogos(tk_messagebox)
+filedialog = Dialogos(tk_filedialog)
+
 class ModernCRUDApp:
     def __init__(self, root):
+        inicio = perf_counter()
         self.root = root
-        self.usuarios = []
-        self.editing_index = None
+        # Usuários e índices ficam no repositório; as regras, no serviço
+        self.repositorio = RepositorioUsuarios()
+        self.servico = ServicoUsuarios(self.repositorio, self.salvar_dados)
+        self.consulta = ""
+        # (campo, início, fim) do filtro por data, ou None
+        self.periodo = None
+        self.coluna_ordenacao = None
+        self.ordem_decrescente = False
+        self.busca_agendada = None
+        self.armazenamento = criar_armazenamento(TIPO_ARMAZENAMENTO)
+        self.trabalhador = TrabalhadorPersistencia(self.armazenamento,
+                                                   lambda: self.repositorio.usuarios)
+        self.editing_id = None
+        # Versão do usuário quando a edição começou (detecta alterações de outra instância)
+        self.editing_versao = None
+        # Os dados só começam a ser carregados depois da primeira tela
+        self.carregando = True
+        self.importacao = None
+        self.calculando_duplicatas = False
+        self.exportacao = None
+        # Campos com máscara de digitação (mantêm a StringVar de cada um viva)
+        self.campos_mascarados = {}
+        # Aberto só na primeira consulta de CEP
+        self.indice_cep = IndiceCep()
         self.setup_window()
         self.setup_styles()
         self.create_widgets()
         self.center_window()
-        self.carregar_dados()
+        self.root.bind('<Map>', lambda event: self.primeiro_quadro(event, inicio))
+        self.root.after(INTERVALO_PERSISTENCIA, self.verificar_persistencia)
+        self.monitor = MonitorLaco(self.root)
+        self.painel = PainelDesempenho(self.root)
+        self.root.bind_all(TECLA_PAINEL, self.painel.alternar)
+        # Criado na primeira abertura
+        self.painel_estatisticas = None
         
     def setup_window(self):
         self.root.title("Sistema de Cadastro CRUD - S/A")
-        self.root.geometry("1700x900")
+        self.root.protocol("WM_DELETE_WINDOW", self.ao_fechar)
+        self.root.geometry(f"{LARGURA_JANELA}x{ALTURA_JANELA}")
         self.root.configure(bg=azul_suave_bg)
         self.root.resizable(False, False)
         
@@ -65,73 +145,6 @@ class ModernCRUDApp:
             background=[('selected', azul_suave)],
             foreground=[('selected', branco)])
     
-    def formatar_cpf(self, event):
-        """Formata o CPF automaticamente enquanto digita"""
-        widget = event.widget
-        valor = widget.get()
-        
-        # Remove tudo que não é número
-        apenas_numeros = re.sub(r'[^0-9]', '', valor)
-        
-        # Limita a 11 dígitos
-        if len(apenas_numeros) > 11:
-            apenas_numeros = apenas_numeros[:11]
-        
-        # Aplica formatação
-        if len(apenas_numeros) <= 3:
-            valor_formatado = apenas_numeros
-        elif len(apenas_numeros) <= 6:
-            valor_formatado = f"{apenas_numeros[:3]}.{apenas_numeros[3:]}"
-        elif len(apenas_numeros) <= 9:
-            valor_formatado = f"{apenas_numeros[:3]}.{apenas_numeros[3:6]}.{apenas_numeros[6:]}"
-        else:
-            valor_formatado = f"{apenas_numeros[:3]}.{apenas_numeros[3:6]}.{apenas_numeros[6:9]}-{apenas_numeros[9:]}"
-        
-        # Atualiza o campo
-        widget.delete(0, tk.END)
-        widget.insert(0, valor_formatado)
-        widget.config(fg=preto_suave)
-    
-    def formatar_cep(self, event):
-        """Formata o CEP automaticamente enquanto digita"""
-        widget = event.widget
-        valor = widget.get()
-        
-        # Remove tudo que não é número
-        apenas_numeros = re.sub(r'[^0-9]', '', valor)
-        
-        # Limita a 8 dígitos
-        if len(apenas_numeros) > 8:
-            apenas_numeros = apenas_numeros[:8]
-        
-        # Aplica formatação
-        if len(apenas_numeros) <= 5:
-            valor_formatado = apenas_numeros
-        else:
-            valor_formatado = f"{apenas_numeros[:5]}-{apenas_numeros[5:]}"
-        
-        # Atualiza o campo
-        widget.delete(0, tk.END)
-        widget.insert(0, valor_formatado)
-        widget.config(fg=preto_suave)
-    
-    def limitar_idade(self, event):
-        """Limita a idade a apenas números e máximo 3 dígitos"""
-        widget = event.widget
-        valor = widget.get()
-        
-        # Remove tudo que não é número
-        apenas_numeros = re.sub(r'[^0-9]', '', valor)
-        
-        # Limita a 3 dígitos
-        if len(apenas_numeros) > 3:
-            apenas_numeros = apenas_numeros[:3]
-        
-        # Atualiza o campo
-        widget.delete(0, tk.END)
-        widget.insert(0, apenas_numeros)
-        widget.config(fg=preto_suave)
-            
     def create_widgets(self):
         # Frame principal
         main_frame = tk.Frame(self.root, bg=azul_suave_bg)
@@ -213,6 +226,17 @@ class ModernCRUDApp:
                             command=self.limpar_formulario)
         btn_limpar.pack(side='left', padx=6)
 
+        # Botão Cancelar (habilitado apenas durante a edição)
+        self.btn_cancelar = tk.Button(button_frame, text="❌ Cancelar",
+                            font=('Segoe UI', 10, 'bold'),
+                            bg=azul_cinza, fg='white',
+                            relief='flat', padx=15, pady=10,
+                            width=12,
+                            cursor='hand2',
+                            state='disabled',
+                            command=self.cancelar_edicao)
+        self.btn_cancelar.pack(side='left', padx=6)
+
         
     def create_form_field(self, parent, label_text, field_name, required=False, field_type="text", placeholder=""):
         # Frame do campo
@@ -238,14 +262,6 @@ class ModernCRUDApp:
                         insertbackground=preto_suave)
         entry.pack(fill='x', pady=(0, 5))
         
-        # Configurar validação e formatação baseada no tipo
-        if field_type == "cpf":
-            entry.bind('<KeyRelease>', self.formatar_cpf)
-        elif field_type == "number":
-            entry.bind('<KeyRelease>', self.limitar_idade)
-        elif field_type == "cep":
-            entry.bind('<KeyRelease>', self.formatar_cep)
-        
         # Placeholder
         if placeholder:
             entry.insert(0, placeholder)
@@ -264,32 +280,102 @@ class ModernCRUDApp:
             entry.bind('<FocusIn>', on_focus_in)
             entry.bind('<FocusOut>', on_focus_out)
         
+        # Máscara de digitação conforme o tipo (o placeholder não é reformatado)
+        mascara = MASCARAS.get(field_type)
+        if mascara is not None:
+            self.campos_mascarados[field_name] = CampoMascarado(entry, mascara, placeholder or None)
+
+        # Cidade/UF do CEP, consultadas no índice local enquanto digita
+        if field_type == "cep":
+            self.endereco_label = tk.Label(field_frame, text="", font=('Segoe UI', 10),
+                                           bg=branco, fg=cinza_escuro, anchor='w')
+            self.endereco_label.pack(fill='x')
+            self.campos_mascarados[field_name].variavel.trace_add('write', self.preencher_endereco)
+
         # Armazenar referência
         setattr(self, field_name, entry)
         
+    @cronometrar
+    def preencher_endereco(self, *args):
+        """Mostra a cidade e a UF de um CEP completo (vazio sem o índice de CEPs)"""
+        cep = self.campos_mascarados['entry_cep'].variavel.get()
+        texto = ""
+        if validacao.validar_cep(cep) and self.indice_cep.disponivel:
+            endereco = self.indice_cep.buscar(cep)
+            texto = f"📍 {endereco[0]}/{endereco[1]}" if endereco else "CEP não encontrado na base local"
+        self.endereco_label.config(text=texto)
+
+    def criar_campo_data(self, parent, rotulo, nome):
+        """Campo dd/mm/aaaa do filtro por período, com máscara de digitação"""
+        tk.Label(parent, text=rotulo, font=('Segoe UI', 11),
+                 bg=branco, fg=preto_suave).pack(side='left', padx=(10, 5))
+        entry = tk.Entry(parent, width=11,
+                         font=('Segoe UI', 12),
+                         relief='solid',
+                         bd=1,
+                         bg=cinza_claro,
+                         fg=preto_suave,
+                         insertbackground=preto_suave)
+        entry.pack(side='left')
+        entry.bind('<KeyRelease>', self.agendar_busca)
+        self.campos_mascarados[nome] = CampoMascarado(entry, MASCARA_DATA)
+        return entry
+
     def create_list_section(self, parent):
         # Título da seção
         list_title = ttk.Label(parent, text="📋 Lista de Usuários", style='Header.TLabel')
         list_title.pack(pady=25)
         
+        # Busca (filtra enquanto digita)
+        search_frame = tk.Frame(parent, bg=branco)
+        search_frame.pack(fill='x', padx=20)
+        
+        search_label = tk.Label(search_frame, text="🔍 Buscar:",
+                               font=('Segoe UI', 12, 'bold'),
+                               bg=branco, fg=preto_suave)
+        search_label.pack(side='left', padx=(0, 10))
+        
+        self.entry_busca = tk.Entry(search_frame,
+                                   font=('Segoe UI', 12),
+                                   relief='solid',
+                                   bd=1,
+                                   bg=cinza_claro,
+                                   fg=preto_suave,
+                                   insertbackground=preto_suave)
+        self.entry_busca.pack(side='left', fill='x', expand=True)
+        self.entry_busca.bind('<KeyRelease>', self.agendar_busca)
+
+        # Filtro por período (datas inclusivas), aplicado junto com a busca
+        periodo_label = tk.Label(search_frame, text="📅 Período:",
+                                font=('Segoe UI', 12, 'bold'),
+                                bg=branco, fg=preto_suave)
+        periodo_label.pack(side='left', padx=(20, 10))
+        self.campo_periodo = ttk.Combobox(search_frame, values=list(CAMPOS_FILTRO_DATA),
+                                          state='readonly', width=10, font=('Segoe UI', 11))
+        self.campo_periodo.current(0)
+        self.campo_periodo.bind('<<ComboboxSelected>>', self.agendar_busca)
+        self.campo_periodo.pack(side='left')
+        self.entry_data_de = self.criar_campo_data(search_frame, "de", 'data_de')
+        self.entry_data_ate = self.criar_campo_data(search_frame, "até", 'data_ate')
+        
         # Frame da lista
         list_frame = tk.Frame(parent, bg=branco, relief='solid', bd=1)
         list_frame.pack(fill='both', expand=True, padx=20, pady=20)
         
         # Treeview
-        columns = ('Nome', 'CPF', 'Idade', 'E-mail', 'CEP')
+        columns = COLUNAS
         self.tree = ttk.Treeview(list_frame, columns=columns, show='headings', 
-                                style='Modern.Treeview')
+                                style='Modern.Treeview', selectmode='extended')
         
         # Configurar cabeçalhos
         column_widths = {'Nome': 200, 'CPF': 150, 'Idade': 80, 'E-mail': 200, 'CEP': 120}
         for col in columns:
-            self.tree.heading(col, text=col)
+            self.tree.heading(col, text=col, command=lambda c=col: self.ordenar_por(c))
             self.tree.column(col, width=column_widths[col], anchor='center')
         
-        # Scrollbars
-        scrollbar_y = ttk.Scrollbar(list_frame, orient='vertical', command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar_y.set)
+        # Scrollbars (controlada pela lista virtual, que mapeia a rolagem para fatias da visão atual)
+        scrollbar_y = ttk.Scrollbar(list_frame, orient='vertical')
+        self.lista = ListaVirtual(self.tree, scrollbar_y, self.valores_linha)
         
         # Pack treeview e scrollbars
         self.tree.pack(side='left', fill='both', expand=True)
@@ -323,49 +409,61 @@ class ModernCRUDApp:
                                 cursor='hand2',
                                 command=self.atualizar_lista_manual)
         btn_atualizar.pack(side='left', padx=6)
+
+        # Importação em lote de CSV / JSON Lines
+        btn_importar = tk.Button(action_frame, text="📥 Importar",
+                                font=('Segoe UI', 11, 'bold'),
+                                bg=azul_cinza, fg='white',
+                                relief='flat', padx=15, pady=10,
+                                cursor='hand2',
+                                command=self.importar_usuarios)
+        btn_importar.pack(side='left', padx=6)
+
+        # Exporta a lista como está exibida (com a busca e a ordenação atuais)
+        btn_exportar = tk.Button(action_frame, text="📤 Exportar",
+                                font=('Segoe UI', 11, 'bold'),
+                                bg=azul_cinza, fg='white',
+                                relief='flat', padx=15, pady=10,
+                                cursor='hand2',
+                                command=self.exportar_usuarios)
+        btn_exportar.pack(side='left', padx=6)
+
+        # Contagens por faixa etária, região do CEP e dia de cadastro
+        btn_estatisticas = tk.Button(action_frame, text="📊 Estatísticas",
+                                font=('Segoe UI', 11, 'bold'),
+                                bg=azul_cinza, fg='white',
+                                relief='flat', padx=15, pady=10,
+                                cursor='hand2',
+                                command=self.abrir_estatisticas)
+        btn_estatisticas.pack(side='left', padx=6)
         
         # Info label
         self.info_label = tk.Label(parent, text="Total de usuários: 0", 
                                   font=('Segoe UI', 12, 'bold'),
                                   bg=branco, fg=preto_suave)
-        self.info_label.pack(pady=15)
+        self.info_label.pack(pady=(15, 0))
+
+        # Situação da gravação em segundo plano
+        self.status_label = tk.Label(parent, text="",
+                                    font=('Segoe UI', 10),
+                                    bg=branco, fg=cinza_escuro)
+        self.status_label.pack(pady=(0, 10))
 
     def atualizar_lista_manual(self):
         """Atualiza a lista manualmente e mostra feedback"""
         self.atualizar_lista()
         messagebox.showinfo("Atualizado", "📋 Lista atualizada com sucesso!")
         
-    def validar_cpf(self, cpf):
-        """Valida CPF brasileiro - deve ter exatamente 11 dígitos"""
-        # Remove tudo que não for número
-        cpf = re.sub(r'[^0-9]', '', cpf)
-        
-        # Verifica se tem exatamente 11 dígitos
-        if len(cpf) != 11:
-            return False
-        
-        # Verifica se não é uma sequência de números iguais
-        if cpf == cpf[0] * 11:
-            return False
-        
-        return True
+    def dados_formulario(self):
+        """Valores digitados no formulário (sem os placeholders)"""
+        return {
+            'nome': self.get_field_value(self.entry_nome),
+            'cpf': self.get_field_value(self.entry_cpf),
+            'idade': self.get_field_value(self.entry_idade),
+            'email': self.get_field_value(self.entry_email),
+            'cep': self.get_field_value(self.entry_cep)
+        }
 
-    def validar_email(self, email):
-        """Valida formato de email"""
-        if not email or '@' not in email:
-            return False
-        
-        # Padrão mais robusto para validação de email
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return re.match(pattern, email) is not None
-        
-    def validar_cep(self, cep):
-        """Valida CEP brasileiro - deve ter exatamente 8 dígitos"""
-        # Remove formatação
-        cep = re.sub(r'[^0-9]', '', cep)
-        # Verifica se tem exatamente 8 dígitos
-        return len(cep) == 8 and cep.isdigit()
-        
     def get_field_value(self, field):
         """Obtém valor do campo removendo placeholder se necessário"""
         value = field.get().strip()
@@ -375,145 +473,78 @@ class ModernCRUDApp:
             return ""
         return value
         
-    def validar_campos(self):
-        """Valida todos os campos do formulário"""
-        # Obter valores dos campos
-        nome = self.get_field_value(self.entry_nome)
-        cpf = self.get_field_value(self.entry_cpf)
-        idade = self.get_field_value(self.entry_idade)
-        email = self.get_field_value(self.entry_email)
-        cep = self.get_field_value(self.entry_cep)
-        
-        # Validar nome
-        if not nome:
-            messagebox.showerror("Erro de Validação", "Nome não pode estar vazio!")
-            self.entry_nome.focus()
-            return False
-            
-        if len(nome) < 2:
-            messagebox.showerror("Erro de Validação", "Nome deve ter pelo menos 2 caracteres!")
-            self.entry_nome.focus()
-            return False
-        
-        # Validar CPF
-        if not cpf:
-            messagebox.showerror("Erro de Validação", "CPF não pode estar vazio!")
-            self.entry_cpf.focus()
-            return False
-            
-        if not self.validar_cpf(cpf):
-            messagebox.showerror("Erro de Validação", "CPF inválido! Deve ter exatamente 11 dígitos.")
-            self.entry_cpf.focus()
-            return False
-        
-        # Validar idade
-        if not idade:
-            messagebox.showerror("Erro de Validação", "Idade não pode estar vazia!")
-            self.entry_idade.focus()
-            return False
-            
-        try:
-            idade_int = int(idade)
-            if idade_int <= 0 or idade_int > 150:
-                messagebox.showerror("Erro de Validação", "Idade deve estar entre 1 e 150 anos!")
-                self.entry_idade.focus()
-                return False
-        except ValueError:
-            messagebox.showerror("Erro de Validação", "Idade deve ser um número válido!")
-            self.entry_idade.focus()
-            return False
-        
-        # Validar email
-        if not email:
-            messagebox.showerror("Erro de Validação", "E-mail não pode estar vazio!")
-            self.entry_email.focus()
-            return False
-            
-        if not self.validar_email(email):
-            messagebox.showerror("Erro de Validação", "E-mail inválido! Verifique o formato.")
-            self.entry_email.focus()
-            return False
-        
-        # Validar CEP
-        if not cep:
-            messagebox.showerror("Erro de Validação", "CEP não pode estar vazio!")
-            self.entry_cep.focus()
-            return False
-            
-        if not self.validar_cep(cep):
-            messagebox.showerror("Erro de Validação", "CEP inválido! Deve ter exatamente 8 dígitos.")
-            self.entry_cep.focus()
-            return False
-        
-        # Verificar duplicatas apenas ao cadastrar novo usuário
-        if self.editing_index is None:
-            cpf_limpo = re.sub(r'[^0-9]', '', cpf)
-            for i, usuario in enumerate(self.usuarios):
-                if re.sub(r'[^0-9]', '', usuario['cpf']) == cpf_limpo:
-                    messagebox.showerror("Erro", "Este CPF já está cadastrado!")
-                    self.entry_cpf.focus()
-                    return False
-                if usuario['email'].lower() == email.lower():
-                    messagebox.showerror("Erro", "Este e-mail já está cadastrado!")
-                    self.entry_email.focus()
-                    return False
-        else:
-            # Verificar duplicatas durante edição (excluindo o registro atual)
-            cpf_limpo = re.sub(r'[^0-9]', '', cpf)
-            for i, usuario in enumerate(self.usuarios):
-                if i != self.editing_index:
-                    if re.sub(r'[^0-9]', '', usuario['cpf']) == cpf_limpo:
-                        messagebox.showerror("Erro", "Este CPF já está cadastrado!")
-                        self.entry_cpf.focus()
-                        return False
-                    if usuario['email'].lower() == email.lower():
-                        messagebox.showerror("Erro", "Este e-mail já está cadastrado!")
-                        self.entry_email.focus()
-                        return False
-             
-        return True
+    def mostrar_erro_validacao(self, erro):
+        """Mostra a mensagem do serviço e leva o foco para o campo com problema"""
+        titulo = "Erro" if isinstance(erro, ErroDuplicado) else "Erro de Validação"
+        messagebox.showerror(titulo, str(erro))
+        if erro.campo:
+            getattr(self, 'entry_' + erro.campo).focus()
     
+    @cronometrar
     def cadastrar_usuario(self):
         """Cadastra novo usuário ou atualiza existente"""
-        if not self.validar_campos():
+        if self.aguardando_carga():
             return
-            
-        usuario = {
-            'nome': self.get_field_value(self.entry_nome),
-            'cpf': self.get_field_value(self.entry_cpf),
-            'idade': int(self.get_field_value(self.entry_idade)),
-            'email': self.get_field_value(self.entry_email),
-            'cep': self.get_field_value(self.entry_cep)
-        }
+        dados = self.dados_formulario()
         
-        if self.editing_index is None:
-            # Cadastrar novo usuário
-            usuario['data_cadastro'] = datetime.now().strftime('%d/%m/%Y %H:%M:%S')
-            self.usuarios.append(usuario)
-            messagebox.showinfo("Sucesso!", "✅ Usuário cadastrado com sucesso!")
-        else:
-            # Atualizar usuário existente
-            usuario['data_cadastro'] = self.usuarios[self.editing_index]['data_cadastro']
-            usuario['data_atualizacao'] = datetime.now().strftime('%d/%m/%Y %H:%M:%S')
-            self.usuarios[self.editing_index] = usuario
-            messagebox.showinfo("Sucesso!", "✅ Usuário atualizado com sucesso!")
+        try:
+            if not self.confirmar_duplicatas(dados):
+                return
+            if self.editing_id is None:
+                # Cadastrar novo usuário
+                usuario = self.servico.cadastrar(dados)
+                self.refletir_na_lista(OP_INSERIR, usuario)
+                messagebox.showinfo("Sucesso!", "✅ Usuário cadastrado com sucesso!")
+            else:
+                # Atualizar usuário existente (localizado pela chave estável)
+                usuario = self.servico.atualizar(self.editing_id, dados, self.editing_versao)
+                self.refletir_na_lista(OP_ATUALIZAR, usuario)
+                messagebox.showinfo("Sucesso!", "✅ Usuário atualizado com sucesso!")
+                self.cancelar_edicao()
+        except ErroValidacao as e:
+            self.mostrar_erro_validacao(e)
+            return
+        except UsuarioNaoEncontrado:
+            messagebox.showerror("Erro", "Este usuário não existe mais!")
+            self.cancelar_edicao()
+            return
+        except ErroConflito as e:
+            messagebox.showerror("Erro", str(e))
             self.cancelar_edicao()
+            return
         
-        # Atualização automática da lista após cadastro/edição
-        self.atualizar_lista()
+        # A lista já foi atualizada só na linha afetada; falta o contador
+        self.atualizar_contador()
         self.limpar_formulario()
-        self.salvar_dados()
         
+    def confirmar_duplicatas(self, dados):
+        """Avisa se os dados parecem de alguém já cadastrado; retorna False se o usuário desistir"""
+        semelhantes = self.servico.possiveis_duplicatas(dados, self.editing_id)
+        if not semelhantes:
+            return True
+        linhas = [f"• {usuario['nome']} ({usuario['cpf']}, {usuario['email']}): {motivo}"
+                  for usuario, motivo, _ in semelhantes[:MAXIMO_AVISO_DUPLICATAS]]
+        if len(semelhantes) > MAXIMO_AVISO_DUPLICATAS:
+            linhas.append(f"• e mais {len(semelhantes) - MAXIMO_AVISO_DUPLICATAS}")
+        return messagebox.askyesno("Possível duplicata",
+                                   "Já existe cadastro parecido:\n\n" + "\n".join(linhas)
+                                   + "\n\nSalvar mesmo assim?")
+
+    @cronometrar
     def editar_usuario(self):
-        """Carrega dados do usuário selecionado para edição"""
-        selected = self.tree.selection()
-        if not selected:
+        """Carrega dados do usuário selecionado para edição (com vários, abre a edição em lote)"""
+        if self.aguardando_carga():
+            return
+        chaves = self.lista.chaves_selecionadas()
+        if len(chaves) > 1:
+            self.editar_em_lote(chaves)
+            return
+        usuario = self.repositorio.obter(self.lista.chave_selecionada())
+        if usuario is None:
             messagebox.showwarning("Aviso", "Selecione um usuário para editar!")
             return
             
-        item = self.tree.item(selected)
-        values = item['values']
-        index = self.tree.index(selected)
+        values = self.valores_linha(usuario)
         
         # Preencher formulário
         self.entry_nome.delete(0, tk.END)
@@ -537,29 +568,95 @@ class ModernCRUDApp:
         self.entry_cep.config(fg=preto_suave)
         
         # Ativar modo de edição
-        self.editing_index = index
+        self.editing_id = usuario['id']
+        self.editing_versao = usuario.get('versao', 0)
         self.btn_cadastrar.config(text="💾 Atualizar")
         self.btn_cancelar.config(state='normal')
         
+    @cronometrar
     def excluir_usuario(self):
-        """Exclui usuário selecionado"""
-        selected = self.tree.selection()
-        if not selected:
+        """Exclui usuário selecionado (ou todos os selecionados, de uma vez)"""
+        if self.aguardando_carga():
+            return
+        chaves = self.lista.chaves_selecionadas()
+        if len(chaves) > 1:
+            self.excluir_em_lote(chaves)
+            return
+        chave = self.lista.chave_selecionada()
+        removido = self.repositorio.obter(chave)
+        if removido is None:
             messagebox.showwarning("Aviso", "Selecione um usuário para excluir!")
             return
             
         if messagebox.askyesno("Confirmação", "Tem certeza que deseja excluir este usuário?"):
-            index = self.tree.index(selected)
-            nome_removido = self.usuarios[index]['nome']
-            self.usuarios.pop(index)
-            # Atualização automática após exclusão
-            self.atualizar_lista()
-            self.salvar_dados()
+            removido, posicao = self.servico.excluir(chave)
+            nome_removido = removido['nome']
+            # Remove apenas o item excluído da lista
+            self.refletir_na_lista(OP_REMOVER, removido, posicao)
+            self.atualizar_contador()
             messagebox.showinfo("Sucesso!", f"🗑️ {nome_removido} foi removido com sucesso!")
-            
+
+    def excluir_em_lote(self, chaves):
+        """Exclui vários usuários com uma confirmação, uma gravação e um redesenho da lista"""
+        if not messagebox.askyesno("Confirmação",
+                                   f"Tem certeza que deseja excluir os {len(chaves)} usuários selecionados?"):
+            return
+        removidos, posicoes = self.servico.excluir_lote(chaves)
+        if self.editing_id in chaves:
+            self.cancelar_edicao()
+        if self.visao_derivada():
+            self.atualizar_lista()
+        else:
+            self.lista.removidos_em_lote(chaves, posicoes)
+            self.atualizar_contador()
+        messagebox.showinfo("Sucesso!", f"🗑️ {len(removidos)} usuário(s) removido(s) com sucesso!")
+
+    def editar_em_lote(self, chaves):
+        """Janela para aplicar o mesmo valor de um campo a todos os usuários selecionados"""
+        janela = tk.Toplevel(self.root)
+        janela.title("Editar em lote")
+        janela.configure(bg=branco)
+        janela.resizable(False, False)
+        janela.transient(self.root)
+
+        tk.Label(janela, text=f"✏️ {len(chaves)} usuários selecionados",
+                 font=('Segoe UI', 12, 'bold'), bg=branco, fg=preto_suave).pack(padx=20, pady=(20, 10))
+
+        campo = ttk.Combobox(janela, values=list(CAMPOS_EDICAO_LOTE), state='readonly',
+                             font=('Segoe UI', 11))
+        campo.current(0)
+        campo.pack(fill='x', padx=20, pady=5)
+
+        valor = tk.Entry(janela, font=('Segoe UI', 12), relief='solid', bd=1,
+                         bg=cinza_claro, fg=preto_suave, insertbackground=preto_suave)
+        valor.pack(fill='x', padx=20, pady=5)
+        valor.focus_set()
+
+        def aplicar():
+            try:
+                novos = self.servico.atualizar_lote(
+                    chaves, {CAMPOS_EDICAO_LOTE[campo.get()]: valor.get().strip()})
+            except ErroValidacao as e:
+                messagebox.showerror("Erro de Validação", str(e), parent=janela)
+                return
+            janela.destroy()
+            if self.editing_id in chaves:
+                self.cancelar_edicao()
+            if self.visao_derivada():
+                self.atualizar_lista()
+            else:
+                self.lista.redesenhar()
+            messagebox.showinfo("Sucesso!", f"✅ {len(novos)} usuário(s) atualizado(s) com sucesso!")
+
+        tk.Button(janela, text="✅ Aplicar a todos", font=('Segoe UI', 11, 'bold'),
+                  bg=azul_cinza, fg='white', relief='flat', padx=15, pady=8,
+                  cursor='hand2', command=aplicar).pack(pady=(10, 20))
+        janela.grab_set()
+
     def cancelar_edicao(self):
         """Cancela modo de edição"""
-        self.editing_index = None
+        self.editing_id = None
+        self.editing_versao = None
         self.btn_cadastrar.config(text="✅ Cadastrar")
         self.btn_cancelar.config(state='disabled')
         self.limpar_formulario()
@@ -582,57 +679,346 @@ class ModernCRUDApp:
         self.entry_cep.insert(0, "00000-000")
         self.entry_cep.config(fg=cinza_escuro)
             
+    def valores_linha(self, usuario):
+        """Valores exibidos na Treeview para um usuário"""
+        return (
+            usuario['nome'],
+            usuario['cpf'],
+            usuario['idade'],
+            usuario['email'],
+            usuario['cep']
+        )
+            
+    @cronometrar
     def atualizar_lista(self):
         """Atualiza lista de usuários na interface"""
-        # Limpar lista atual
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
-        # Adicionar usuários
-        for usuario in self.usuarios:
-            self.tree.insert('', 'end', values=(
-                usuario['nome'],
-                usuario['cpf'],
-                usuario['idade'],
-                usuario['email'],
-                usuario['cep']
-            ))
-            
-        # Atualizar contador
-        total = len(self.usuarios)
+        # Apenas as linhas visíveis são (re)desenhadas
+        dados = self.repositorio.visao(self.consulta, self.coluna_ordenacao,
+                                       self.ordem_decrescente, self.periodo)
+        self.lista.definir_dados(dados)
+        self.atualizar_contador()
+        
+    def atualizar_contador(self):
+        """Atualiza o contador de usuários"""
+        total = len(self.repositorio)
         emoji = "👥" if total > 0 else "📝"
-        self.info_label.config(text=f"Total de usuários: {total} {emoji}")
-        
-    def salvar_dados(self):
-        """Salva dados em arquivo JSON"""
-        try:
-            with open('usuarios_cadastrados.json', 'w', encoding='utf-8') as f:
-                json.dump(self.usuarios, f, ensure_ascii=False, indent=2)
-            
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao salvar dados: {str(e)}")
+        if self.consulta or self.periodo is not None:
+            exibidos = len(self.lista.dados)
+            self.info_label.config(text=f"Exibindo {exibidos} de {total} usuários 🔍")
+        else:
+            self.info_label.config(text=f"Total de usuários: {total} {emoji}")
+
+    def visao_derivada(self):
+        """True se a lista exibe uma visão filtrada ou ordenada, refeita a cada alteração"""
+        return bool(self.consulta) or self.periodo is not None or self.coluna_ordenacao is not None
+
+    def refletir_na_lista(self, op, usuario, posicao=None):
+        """Reflete uma alteração na Treeview (só a linha afetada, ou refaz a visão filtrada/ordenada)"""
+        if self.visao_derivada():
+            self.atualizar_lista()
+        elif op == OP_INSERIR:
+            self.lista.inserido(usuario)
+        elif op == OP_ATUALIZAR:
+            self.lista.atualizado(usuario)
+        else:
+            self.lista.removido(usuario, posicao)
+
+    @cronometrar
+    def ordenar_por(self, nome_coluna):
+        """Clique no cabeçalho: crescente, decrescente e de volta à ordem de cadastro"""
+        if self.aguardando_carga():
+            return
+        coluna = COLUNAS.index(nome_coluna)
+        if self.coluna_ordenacao != coluna:
+            self.coluna_ordenacao, self.ordem_decrescente = coluna, False
+        elif not self.ordem_decrescente:
+            self.ordem_decrescente = True
+        else:
+            self.coluna_ordenacao, self.ordem_decrescente = None, False
+
+        # Indicador de ordenação no cabeçalho
+        for i, col in enumerate(COLUNAS):
+            seta = ""
+            if i == self.coluna_ordenacao:
+                seta = " ▼" if self.ordem_decrescente else " ▲"
+            self.tree.heading(col, text=col + seta)
+        self.atualizar_lista()
+
+    def agendar_busca(self, event):
+        """Agenda a busca para depois que o usuário parar de digitar"""
+        if self.busca_agendada is not None:
+            self.root.after_cancel(self.busca_agendada)
+        self.busca_agendada = self.root.after(ATRASO_BUSCA, self.executar_busca)
+
+    @cronometrar
+    def executar_busca(self):
+        """Filtra a lista pela consulta digitada e pelo período usando os índices"""
+        self.busca_agendada = None
+        consulta = self.entry_busca.get().strip()
+        periodo = self.periodo_digitado()
+        if consulta == self.consulta and periodo == self.periodo:
+            return
+        self.consulta = consulta
+        self.periodo = periodo
+        self.atualizar_lista()
+
+    def periodo_digitado(self):
+        """(campo, início, fim) do filtro por data, ou None; datas incompletas ou inválidas ficam de fora"""
+        limites = []
+        for entry, fim in ((self.entry_data_de, False), (self.entry_data_ate, True)):
+            texto = entry.get()
+            limite = None
+            if len(texto) == 10:
+                try:
+                    limite = epoca_data(texto, fim)
+                except ValueError:
+                    pass
+            entry.config(fg=vermelho_erro if len(texto) == 10 and limite is None else preto_suave)
+            limites.append(limite)
+        if limites == [None, None]:
+            return None
+        return (CAMPOS_FILTRO_DATA[self.campo_periodo.get()],) + tuple(limites)
+
+    @cronometrar
+    def salvar_dados(self, operacoes):
+        """Envia as operações para a thread de persistência (não bloqueia a interface)"""
+        self.trabalhador.enviar(operacoes)
+        self.status_label.config(text="💾 Salvando...")
+
+    def verificar_persistencia(self):
+        """Mostra o resultado das gravações feitas em segundo plano"""
+        for ok, quantidade, erro in self.trabalhador.resultados():
+            if ok:
+                horario = datetime.now().strftime('%H:%M:%S')
+                self.status_label.config(text=f"💾 Alterações salvas às {horario}")
+            elif isinstance(erro, ErroConflito):
+                # Não são reenviadas: a lista volta ao que está gravado (aplicar_novidades)
+                self.status_label.config(text=f"⚠️ {quantidade} alteração(ões) recusada(s)")
+                messagebox.showwarning("Conflito", str(erro))
+            else:
+                self.status_label.config(text=f"⚠️ {quantidade} alteração(ões) pendente(s)")
+                messagebox.showerror("Erro", f"Erro ao salvar dados: {str(erro)}")
+        if not self.carregando:
+            self.aplicar_novidades()
+        self.root.after(INTERVALO_PERSISTENCIA, self.verificar_persistencia)
+
+    @cronometrar
+    def aplicar_novidades(self):
+        """Reflete as alterações gravadas por outras instâncias, só nos registros alterados"""
+        alteracoes = self.armazenamento.novidades()
+        if alteracoes is None:
+            # Esta instância ficou para trás demais: recarrega tudo
+            self.trabalhador.descarregar()
+            self.carregar_dados()
+            return
+        aplicadas = self.repositorio.sincronizar(alteracoes)
+        if not aplicadas:
+            return
+        if self.visao_derivada():
+            self.atualizar_lista()
+        else:
+            for op, usuario, posicao in aplicadas:
+                self.refletir_na_lista(op, usuario, posicao)
+            self.atualizar_contador()
+        if any(usuario['id'] == self.editing_id for _, usuario, _ in aplicadas):
+            self.status_label.config(text="⚠️ O usuário em edição foi alterado em outra instância")
             
+    @cronometrar
     def carregar_dados(self):
-        """Carrega dados do arquivo JSON"""
+        """Inicia o carregamento em páginas, sem bloquear a abertura da janela"""
+        self.repositorio.limpar()
+        self.atualizar_lista()
+        self.carregando = True
+        self._paginas = self.armazenamento.carregar_paginas(TAMANHO_PAGINA)
+        self.root.after(0, self._carregar_proxima_pagina)
+
+    @cronometrar
+    def _carregar_proxima_pagina(self):
+        """Carrega uma página e agenda a próxima pelo root.after"""
         try:
-            if os.path.exists('usuarios_cadastrados.json'):
-                with open('usuarios_cadastrados.json', 'r', encoding='utf-8') as f:
-                    self.usuarios = json.load(f)
-                self.atualizar_lista()
+            pagina = next(self._paginas, None)
+        except SnapshotCorrompido as e:
+            # Os blocos íntegros (e os diários) já foram carregados
+            messagebox.showerror("Erro", f"{e}.\nOs {len(self.repositorio)} usuários lidos antes "
+                                          "do erro foram mantidos.")
+            pagina = None
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao carregar dados: {str(e)}")
-            self.usuarios = []
+            self.repositorio.limpar()
+            pagina = None
+
+        if pagina is None:
+            self.carregando = False
+            self.atualizar_lista()
+            self.calcular_duplicatas()
+            return
+
+        self.repositorio.inserir_lote(pagina)
+        if not self.visao_derivada():
+            self.lista.acrescentados()
+        self.info_label.config(text=f"Carregando usuários... {len(self.repositorio)} ⏳")
+        # Um pequeno intervalo deixa o Tk processar os eventos entre as páginas
+        self.root.after(1, self._carregar_proxima_pagina)
+
+    def calcular_duplicatas(self):
+        """Agenda o cálculo dos blocos de duplicatas que ficaram pendentes"""
+        if not self.calculando_duplicatas:
+            self.calculando_duplicatas = True
+            self.root.after(1, self._calcular_proximas_duplicatas)
+
+    @cronometrar
+    def _calcular_proximas_duplicatas(self):
+        """Calcula os blocos de uma página de registros pendentes e agenda a próxima"""
+        if self.repositorio.duplicatas.calcular_pendentes(TAMANHO_PAGINA):
+            self.root.after(1, self._calcular_proximas_duplicatas)
+        else:
+            self.calculando_duplicatas = False
+
+    def importar_usuarios(self):
+        """Importa usuários de um arquivo CSV ou JSON Lines, um lote por vez"""
+        if self.aguardando_carga():
+            return
+        if self.importacao is not None:
+            messagebox.showwarning("Aviso", "Já existe uma importação em andamento!")
+            return
+        caminho = filedialog.askopenfilename(
+            title="Importar usuários",
+            filetypes=[("CSV ou JSON Lines", "*.csv *.jsonl *.ndjson *.json"),
+                       ("Todos os arquivos", "*.*")])
+        if not caminho:
+            return
+        # Importado só quando usado, para não pesar na abertura
+        from importacao import Importacao
+        self.importacao = Importacao(caminho, self.repositorio.indice,
+                                     self.confirmar_importados)
+        self._lotes_importacao = self.importacao.lotes()
+        self.root.after(0, self._importar_proximo_lote)
+
+    def confirmar_importados(self, usuarios):
+        """Inclui um lote de usuários importados (validados) no cadastro"""
+        usuarios = self.repositorio.inserir_lote(usuarios)
+        if not self.visao_derivada():
+            self.lista.acrescentados()
+        self.calcular_duplicatas()
+        self.salvar_dados([(OP_INSERIR, usuario) for usuario in usuarios])
+
+    def _importar_proximo_lote(self):
+        """Processa um lote da importação e agenda o próximo pelo root.after"""
+        importacao = self.importacao
+        try:
+            progresso = next(self._lotes_importacao, None)
+        except Exception as e:
+            self.importacao = None
+            self.atualizar_lista()
+            messagebox.showerror("Erro", f"Erro ao importar usuários: {str(e)}")
+            return
+
+        if progresso is not None:
+            lidos, aceitos, rejeitados = progresso
+            self.info_label.config(text=f"Importando... {lidos} lidos, {aceitos} aceitos, "
+                                        f"{rejeitados} rejeitados ⏳")
+            self.root.after(1, self._importar_proximo_lote)
+            return
+
+        self.importacao = None
+        self.atualizar_lista()
+        mensagem = (f"{importacao.aceitos} usuário(s) importado(s) de {importacao.lidos} "
+                    f"linha(s).")
+        if importacao.rejeitados:
+            mensagem += (f"\n\n{importacao.rejeitados} linha(s) rejeitada(s). "
+                         f"Relatório: {importacao.caminho_relatorio}")
+        messagebox.showinfo("Importação concluída", mensagem)
+
+    def exportar_usuarios(self):
+        """Exporta os usuários exibidos para CSV, JSON Lines ou formato colunar"""
+        if self.aguardando_carga():
+            return
+        if self.exportacao is not None:
+            messagebox.showwarning("Aviso", "Já existe uma exportação em andamento!")
+            return
+        caminho = filedialog.asksaveasfilename(
+            title="Exportar usuários",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"),
+                       ("Colunar binário", "*.col")])
+        if not caminho:
+            return
+        # Cópia rasa da visão atual: os registros nunca são alterados no lugar
+        dados = self.lista.dados
+        from exportacao import exportar_em_etapas
+        self.exportacao = exportar_em_etapas(dados[0:len(dados)], caminho)
+        self.caminho_exportacao = caminho
+        self.exportados = 0
+        self.root.after(0, self._exportar_proximo_bloco)
+
+    def _exportar_proximo_bloco(self):
+        """Grava um bloco da exportação e agenda o próximo pelo root.after"""
+        try:
+            total = next(self.exportacao, None)
+        except Exception as e:
+            self.exportacao = None
+            self.atualizar_contador()
+            messagebox.showerror("Erro", f"Erro ao exportar usuários: {str(e)}")
+            return
+
+        if total is not None:
+            self.exportados = total
+            self.info_label.config(text=f"Exportando... {total} usuários ⏳")
+            self.root.after(1, self._exportar_proximo_bloco)
+            return
+
+        self.exportacao = None
+        self.atualizar_contador()
+        messagebox.showinfo("Exportação concluída",
+                            f"{self.exportados} usuário(s) exportado(s) para "
+                            f"{self.caminho_exportacao}")
+
+    def abrir_estatisticas(self):
+        """Abre (ou fecha) o painel de estatísticas do cadastro"""
+        if self.painel_estatisticas is None:
+            # Importado só quando usado, para não pesar na abertura
+            from painel_estatisticas import PainelEstatisticas
+            self.painel_estatisticas = PainelEstatisticas(self.root, self.repositorio.estatisticas)
+        self.painel_estatisticas.alternar()
+
+    def aguardando_carga(self):
+        """Avisa e retorna True se os dados ainda estão sendo carregados"""
+        if self.carregando:
+            messagebox.showwarning("Aviso", "Aguarde o término do carregamento dos usuários!")
+        return self.carregando
+        
+    def ao_fechar(self):
+        """Grava as alterações pendentes e fecha o armazenamento antes de encerrar"""
+        pendentes = self.trabalhador.descarregar()
+        if pendentes and not messagebox.askyesno(
+                "Erro", f"{len(pendentes)} alteração(ões) não puderam ser salvas. "
+                        "Deseja fechar mesmo assim?"):
+            return
+        try:
+            self.trabalhador.parar()
+            self.armazenamento.fechar()
+            self.indice_cep.fechar()
+        finally:
+            self.root.destroy()
         
     def center_window(self):
-        """Centraliza janela na tela"""
+        """Centraliza janela na tela (o tamanho é fixo, sem esperar o cálculo do layout)"""
+        x = (self.root.winfo_screenwidth() // 2) - (LARGURA_JANELA // 2)
+        y = (self.root.winfo_screenheight() // 2) - (ALTURA_JANELA // 2)
+        self.root.geometry(f'{LARGURA_JANELA}x{ALTURA_JANELA}+{x}+{y}')
+
+    def primeiro_quadro(self, event, inicio):
+        """Quando a janela aparece, termina de desenhá-la e só então carrega os dados"""
+        if event.widget is not self.root:
+            return
+        self.root.unbind('<Map>')
         self.root.update_idletasks()
-        width = self.root.winfo_width()
-        height = self.root.winfo_height()
-        x = (self.root.winfo_screenwidth() // 2) - (width // 2)
-        y = (self.root.winfo_screenheight() // 2) - (height // 2)
-        self.root.geometry(f'{width}x{height}+{x}+{y}')
+        metricas.registrar('inicio.primeiro_quadro', perf_counter() - inicio)
+        self.carregar_dados()
 
 if __name__ == "__main__":
+    perfil = iniciar_perfil()
     root = tk.Tk()
     app = ModernCRUDApp(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+    encerrar_perfil(perfil)
@@ -0,0 +1,50 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Build do executável: pyinstaller Atividade_SA.spec (nesta pasta)
+#
+# Gera uma pasta (dist/Atividade_SA) em vez de um único .exe: o executável
+# de arquivo único descompacta tudo em uma pasta temporária a cada
+# abertura, o que atrasa a primeira tela. Sem UPX pelo mesmo motivo.
+
+# Pacotes e módulos que a interface não usa. O NumPy é opcional (validação
+# de lotes grandes); sem ele o executável valida em Python puro.
+EXCLUIDOS = [
+    'numpy', 'pygame', 'webview',
+    'unittest', 'doctest', 'pydoc', 'pydoc_data', 'pdb', 'lib2to3',
+    'xmlrpc', 'idlelib', 'turtle', 'turtledemo', 'tkinter.tix', 'tkinter.test',
+    'distutils', 'setuptools', 'pip',
+]
+
+a = Analysis(
+    ['Atividade_SA.py'],
+    pathex=[],
+    binaries=[],
+    datas=[],
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=EXCLUIDOS,
+    noarchive=False,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='Atividade_SA',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+)
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    name='Atividade_SA',
+)
@@ -0,0 +1,360 @@
+"""API HTTP/JSON local do cadastro (asyncio, sem interface gráfica)
+
+Rotas:
+    GET    /usuarios?q=&ordem=nome&desc=1&inicio=0&limite=100
+           &data=cadastro|alteracao&de=dd/mm/aaaa&ate=dd/mm/aaaa (período, datas inclusivas)
+    GET    /usuarios/<id>
+    POST   /usuarios            um objeto, ou uma lista para cadastro em lote
+    PUT    /usuarios/<id>       "versao" opcional: recusa (409) se o registro mudou
+    DELETE /usuarios/<id>?versao=
+    POST   /lote                lista de pedidos {"op", "id", "dados", "versao"}
+    GET    /estatisticas?dias=30  contagens por faixa etária, região do CEP e dia de cadastro
+    GET    /duplicatas          pares de possíveis duplicatas (nome parecido no mesmo CEP, e-mail equivalente)
+    POST   /duplicatas          cadastros parecidos com os dados enviados, sem salvar ("id" opcional: edição)
+    GET    /saude
+
+As conexões HTTP/1.1 são mantidas abertas (keep-alive) e cada uma é
+atendida por uma tarefa própria; as alterações são feitas no loop de
+eventos e gravadas pela thread de persistência, sem bloquear as demais
+requisições. O relatório de duplicatas e as recargas completas do
+cadastro rodam em uma thread do executor; durante uma recarga as
+alterações respondem 503.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from urllib.parse import urlsplit, parse_qs
+
+from duplicatas import descrever, verificar
+from indice_tempo import CAMPOS_PERIODO, epoca_data
+from modelo import para_json
+from persistencia import criar_armazenamento, TrabalhadorPersistencia
+from servico import (RepositorioUsuarios, ServicoUsuarios, ErroValidacao,
+                     ErroDuplicado, ErroConflito, UsuarioNaoEncontrado)
+from snapshot_binario import SnapshotCorrompido
+
+HOST_PADRAO = '127.0.0.1'
+PORTA_PADRAO = 8080
+
+# Conexões ociosas por mais tempo que isto (s) são fechadas
+TEMPO_OCIOSO = 30
+
+# Tamanho máximo do corpo de uma requisição (bytes)
+LIMITE_CORPO = 16 * 1024 * 1024
+
+# Máximo de usuários devolvidos por GET /usuarios
+LIMITE_LISTAGEM = 1000
+
+# Intervalo (s) de verificação dos resultados da thread de persistência
+INTERVALO_PERSISTENCIA = 0.1
+
+# Parâmetro 'ordem' da listagem -> índice da coluna de ordenação
+CAMPOS_ORDENACAO = ('nome', 'cpf', 'idade', 'email', 'cep')
+
+_motivos = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found',
+            405: 'Method Not Allowed', 409: 'Conflict', 413: 'Payload Too Large',
+            422: 'Unprocessable Entity', 431: 'Request Header Fields Too Large',
+            500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+_codificar = json.JSONEncoder(ensure_ascii=False, default=para_json).encode
+
+
+class ErroHTTP(Exception):
+    """Resposta de erro com o status HTTP correspondente"""
+
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def _inteiro(parametros, nome, padrao):
+    try:
+        return int(parametros.get(nome, [padrao])[0])
+    except ValueError:
+        raise ErroHTTP(400, f"Parâmetro '{nome}' deve ser um número")
+
+
+class ServidorAPI:
+    """Traduz requisições HTTP em chamadas ao ServicoUsuarios"""
+
+    def __init__(self, servico):
+        self.servico = servico
+        # True enquanto um repositório novo é carregado fora do loop
+        self.recarregando = False
+
+    @property
+    def repositorio(self):
+        # Trocado por inteiro a cada recarga
+        return self.servico.repositorio
+
+    async def atender(self, leitor, escritor):
+        """Atende uma conexão, requisição após requisição, até o cliente encerrar"""
+        try:
+            while True:
+                try:
+                    pedido = await asyncio.wait_for(self._ler_pedido(leitor), TEMPO_OCIOSO)
+                except ErroHTTP as e:
+                    self._responder(escritor, e.status, {'erro': str(e)}, False)
+                    await escritor.drain()
+                    break
+                if pedido is None:
+                    break
+                metodo, alvo, versao, cabecalhos, corpo = pedido
+                conexao = cabecalhos.get('connection', '').lower()
+                manter = conexao == 'keep-alive' if versao == 'HTTP/1.0' else conexao != 'close'
+                status, resposta = self.despachar(metodo, alvo, corpo)
+                if asyncio.isfuture(resposta):
+                    resposta = await resposta
+                self._responder(escritor, status, resposta, manter)
+                await escritor.drain()
+                if not manter:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            escritor.close()
+
+    async def _ler_linha(self, leitor):
+        try:
+            return await leitor.readline()
+        except (ValueError, asyncio.LimitOverrunError):
+            # Linha maior que o limite do StreamReader
+            raise ErroHTTP(431, "Linha da requisição muito grande")
+
+    async def _ler_pedido(self, leitor):
+        linha = await self._ler_linha(leitor)
+        if not linha:
+            return None
+        try:
+            metodo, alvo, versao = linha.decode('latin-1').split()
+        except ValueError:
+            raise ErroHTTP(400, "Linha de requisição inválida")
+        cabecalhos = {}
+        while True:
+            linha = await self._ler_linha(leitor)
+            if linha in (b'\r\n', b'\n', b''):
+                break
+            nome, _, valor = linha.decode('latin-1').partition(':')
+            cabecalhos[nome.strip().lower()] = valor.strip()
+        try:
+            tamanho = int(cabecalhos.get('content-length', 0))
+        except ValueError:
+            raise ErroHTTP(400, "Content-Length inválido")
+        if tamanho > LIMITE_CORPO:
+            raise ErroHTTP(413, "Corpo da requisição muito grande")
+        corpo = await leitor.readexactly(tamanho) if tamanho else b''
+        return metodo.upper(), alvo, versao, cabecalhos, corpo
+
+    def _responder(self, escritor, status, resposta, manter):
+        corpo = _codificar(resposta).encode('utf-8')
+        cabecalho = (f"HTTP/1.1 {status} {_motivos.get(status, '')}\r\n"
+                     f"Content-Type: application/json; charset=utf-8\r\n"
+                     f"Content-Length: {len(corpo)}\r\n"
+                     f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n")
+        escritor.write(cabecalho.encode('latin-1') + corpo)
+
+    def despachar(self, metodo, alvo, corpo):
+        """Executa a rota e retorna (status, objeto JSON da resposta, ou Future dele)"""
+        url = urlsplit(alvo)
+        partes = [parte for parte in url.path.split('/') if parte]
+        try:
+            if self.recarregando and metodo != 'GET' and partes != ['duplicatas']:
+                raise ErroHTTP(503, "O cadastro está sendo recarregado; tente novamente em instantes")
+            if partes == ['usuarios']:
+                if metodo == 'GET':
+                    return 200, self.listar(parse_qs(url.query))
+                if metodo == 'POST':
+                    dados = self._json(corpo)
+                    if isinstance(dados, list):
+                        pedidos = [{'op': 'inserir', 'dados': item} for item in dados]
+                        return 200, {'resultados': self.servico.executar_lote(pedidos)}
+                    return 201, self.servico.cadastrar(self._objeto(dados))
+                raise ErroHTTP(405, "Método não permitido")
+            if len(partes) == 2 and partes[0] == 'usuarios':
+                chave = partes[1]
+                if metodo == 'GET':
+                    usuario = self.repositorio.obter(chave)
+                    if usuario is None:
+                        raise UsuarioNaoEncontrado(chave)
+                    return 200, usuario
+                if metodo == 'PUT':
+                    dados = self._objeto(self._json(corpo))
+                    return 200, self.servico.atualizar(chave, dados, dados.get('versao'))
+                if metodo == 'DELETE':
+                    parametros = parse_qs(url.query)
+                    versao = _inteiro(parametros, 'versao', None) if 'versao' in parametros else None
+                    usuario, _ = self.servico.excluir(chave, versao)
+                    return 200, usuario
+                raise ErroHTTP(405, "Método não permitido")
+            if partes == ['lote']:
+                if metodo != 'POST':
+                    raise ErroHTTP(405, "Método não permitido")
+                pedidos = self._json(corpo)
+                if not isinstance(pedidos, list):
+                    raise ErroHTTP(400, "O corpo deve ser uma lista de pedidos")
+                return 200, {'resultados': self.servico.executar_lote(pedidos)}
+            if partes == ['estatisticas'] and metodo == 'GET':
+                parametros = parse_qs(url.query)
+                dias = _inteiro(parametros, 'dias', None) if 'dias' in parametros else None
+                return 200, self.repositorio.estatisticas.resumo(dias)
+            if partes == ['duplicatas']:
+                if metodo == 'GET':
+                    # Os grupos são copiados aqui; a comparação não segura o loop
+                    grupos = self.repositorio.duplicatas.grupos()
+                    return 200, asyncio.get_running_loop().run_in_executor(None, _relatorio_duplicatas,
+                                                                           grupos)
+                if metodo == 'POST':
+                    dados = self._objeto(self._json(corpo))
+                    semelhantes = self.servico.possiveis_duplicatas(dados, dados.get('id'))
+                    return 200, {'semelhantes': [{'usuario': usuario, 'motivo': motivo,
+                                                  'semelhanca': round(semelhanca, 2)}
+                                                 for usuario, motivo, semelhanca in semelhantes]}
+                raise ErroHTTP(405, "Método não permitido")
+            if partes == ['saude'] and metodo == 'GET':
+                return 200, {'usuarios': len(self.repositorio)}
+            raise ErroHTTP(404, "Rota não encontrada")
+        except ErroHTTP as e:
+            return e.status, {'erro': str(e)}
+        except ErroDuplicado as e:
+            return 409, {'erro': str(e), 'campo': e.campo}
+        except ErroValidacao as e:
+            return 422, {'erro': str(e), 'campo': e.campo}
+        except UsuarioNaoEncontrado:
+            return 404, {'erro': "Usuário não encontrado!"}
+        except ErroConflito as e:
+            return 409, {'erro': str(e), 'campo': 'versao'}
+        except Exception as e:
+            return 500, {'erro': str(e)}
+
+    def listar(self, parametros):
+        """Página da visão filtrada/ordenada, no mesmo formato da lista da interface"""
+        ordem = parametros.get('ordem', [None])[0]
+        if ordem is not None and ordem not in CAMPOS_ORDENACAO:
+            raise ErroHTTP(400, f"Parâmetro 'ordem' deve ser um de: {', '.join(CAMPOS_ORDENACAO)}")
+        coluna = CAMPOS_ORDENACAO.index(ordem) if ordem else None
+        decrescente = parametros.get('desc', ['0'])[0] not in ('0', '', 'false')
+        inicio = max(_inteiro(parametros, 'inicio', 0), 0)
+        limite = min(max(_inteiro(parametros, 'limite', 100), 0), LIMITE_LISTAGEM)
+        dados = self.repositorio.visao(parametros.get('q', [''])[0].strip(), coluna, decrescente,
+                                       self._periodo(parametros))
+        return {'total': len(dados), 'inicio': inicio,
+                'usuarios': dados[inicio:inicio + limite]}
+
+    def _periodo(self, parametros):
+        """(campo, início, fim) dos parâmetros data/de/ate, ou None sem 'de' e 'ate'"""
+        campo = parametros.get('data', ['cadastro'])[0]
+        if campo not in CAMPOS_PERIODO:
+            raise ErroHTTP(400, f"Parâmetro 'data' deve ser um de: {', '.join(CAMPOS_PERIODO)}")
+        de = parametros.get('de', [''])[0]
+        ate = parametros.get('ate', [''])[0]
+        if not de and not ate:
+            return None
+        try:
+            return (campo, epoca_data(de) if de else None, epoca_data(ate, fim=True) if ate else None)
+        except ValueError as e:
+            raise ErroHTTP(400, str(e))
+
+    def _json(self, corpo):
+        try:
+            return json.loads(corpo or b'null')
+        except ValueError:
+            raise ErroHTTP(400, "JSON inválido")
+
+    def _objeto(self, dados):
+        if not isinstance(dados, dict):
+            raise ErroHTTP(400, "O corpo deve ser um objeto JSON")
+        return dados
+
+
+def _relatorio_duplicatas(grupos):
+    """Resposta de GET /duplicatas (roda em uma thread do executor)"""
+    pares = descrever(verificar(grupos))
+    return {'total': len(pares), 'pares': pares}
+
+
+def carregar_repositorio(armazenamento):
+    """Repositório novo com todo o cadastro; não usa o loop, então pode rodar no executor"""
+    repositorio = RepositorioUsuarios()
+    try:
+        for pagina in armazenamento.carregar_paginas():
+            repositorio.inserir_lote(pagina)
+    except SnapshotCorrompido as erro:
+        # Os blocos íntegros (e os diários) já foram carregados
+        print(f"{erro}; {len(repositorio)} usuários lidos antes do erro foram mantidos",
+              file=sys.stderr)
+    # Ainda fora do loop: os blocos de duplicatas ficam prontos antes da troca
+    repositorio.duplicatas.calcular_pendentes()
+    return repositorio
+
+
+async def _verificar_persistencia(api, trabalhador):
+    """Relata no stderr as gravações que falharam e aplica as alterações de outras instâncias
+
+    A recarga completa monta um repositório novo no executor; as consultas
+    seguem no atual até a troca.
+    """
+    armazenamento = trabalhador.armazenamento
+    servico = api.servico
+    while True:
+        for ok, quantidade, erro in trabalhador.resultados():
+            if not ok:
+                print(f"Erro ao salvar {quantidade} alteração(ões): {erro}", file=sys.stderr)
+        alteracoes = armazenamento.novidades()
+        if alteracoes is None:
+            api.recarregando = True
+            try:
+                # Esperar as gravações pendentes também bloqueia: fica no executor
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, trabalhador.descarregar)
+                servico.repositorio = await loop.run_in_executor(None, carregar_repositorio, armazenamento)
+            finally:
+                api.recarregando = False
+        else:
+            servico.repositorio.sincronizar(alteracoes)
+        await asyncio.sleep(INTERVALO_PERSISTENCIA)
+
+
+async def servir(servico, trabalhador, host=HOST_PADRAO, porta=PORTA_PADRAO, pronto=None):
+    """Executa o servidor até ser cancelado; 'pronto' recebe o servidor já escutando"""
+    api = ServidorAPI(servico)
+    servidor = await asyncio.start_server(api.atender, host, porta)
+    verificacao = asyncio.ensure_future(_verificar_persistencia(api, trabalhador))
+    if pronto is not None:
+        pronto(servidor)
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        verificacao.cancel()
+
+
+def executar(host=HOST_PADRAO, porta=PORTA_PADRAO, tipo_armazenamento='diario'):
+    """Carrega o cadastro, atende requisições e grava as pendências ao encerrar"""
+    armazenamento = criar_armazenamento(tipo_armazenamento)
+    # O repositório é trocado a cada recarga completa: a lista vem sempre do serviço
+    trabalhador = TrabalhadorPersistencia(armazenamento, lambda: servico.repositorio.usuarios)
+    servico = ServicoUsuarios(carregar_repositorio(armazenamento), trabalhador.enviar)
+    try:
+        asyncio.run(servir(servico, trabalhador, host, porta,
+                           lambda _: print(f"API em http://{host}:{porta} "
+                                           f"({len(servico.repositorio)} usuários)")))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pendentes = trabalhador.descarregar()
+        if pendentes:
+            print(f"{len(pendentes)} alteração(ões) não puderam ser salvas", file=sys.stderr)
+        trabalhador.parar()
+        armazenamento.fechar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API HTTP local do cadastro de usuários")
+    parser.add_argument('--host', default=HOST_PADRAO)
+    parser.add_argument('--porta', type=int, default=PORTA_PADRAO)
+    parser.add_argument('--armazenamento', choices=('diario', 'json', 'binario', 'sqlite'),
+                        default=os.environ.get('CADASTRO_ARMAZENAMENTO', 'diario'))
+    args = parser.parse_args()
+    executar(args.host, args.porta, args.armazenamento)
@@ -0,0 +1,221 @@
+"""Armazenamento de usuários em SQLite (modo WAL, índices únicos em CPF e e-mail)"""
+import argparse
+import sqlite3
+
+from indices import normalizar_cpf, normalizar_email
+from persistencia import (Armazenamento, ArmazenamentoDiario, ARQUIVO_DADOS, ErroConflito,
+                          TAMANHO_PAGINA, OP_INSERIR, OP_ATUALIZAR)
+
+# Banco padrão, ao lado do arquivo JSON
+ARQUIVO_BANCO = 'usuarios_cadastrados.db'
+
+# Colunas de dados, na ordem usada pelas instruções abaixo
+CAMPOS = ('id', 'nome', 'cpf', 'idade', 'email', 'cep', 'data_cadastro', 'data_atualizacao',
+          'versao')
+
+# A ordem de cadastro é preservada pela coluna 'ordem' (alias do rowid)
+_criar_tabela = """
+CREATE TABLE IF NOT EXISTS usuarios (
+    ordem INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    nome TEXT NOT NULL,
+    cpf TEXT NOT NULL,
+    cpf_normalizado TEXT NOT NULL,
+    idade INTEGER NOT NULL,
+    email TEXT NOT NULL,
+    email_normalizado TEXT NOT NULL,
+    cep TEXT NOT NULL,
+    data_cadastro TEXT,
+    data_atualizacao TEXT,
+    versao INTEGER NOT NULL DEFAULT 0
+)
+"""
+_criar_indices = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_usuarios_cpf ON usuarios (cpf_normalizado)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_usuarios_email ON usuarios (email_normalizado)",
+)
+
+# Instruções fixas e parametrizadas: o sqlite3 mantém as versões preparadas em cache
+_sql_inserir = """
+INSERT INTO usuarios (id, nome, cpf, cpf_normalizado, idade, email, email_normalizado,
+                      cep, data_cadastro, data_atualizacao, versao)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+# Atualização e exclusão só valem se a versão no banco for a que o usuário editou
+_sql_atualizar = """
+UPDATE usuarios SET nome = ?, cpf = ?, cpf_normalizado = ?, idade = ?, email = ?,
+                    email_normalizado = ?, cep = ?, data_cadastro = ?, data_atualizacao = ?,
+                    versao = ?
+WHERE id = ? AND versao = ?
+"""
+_sql_remover = "DELETE FROM usuarios WHERE id = ? AND versao = ?"
+_sql_selecionar = "SELECT " + ", ".join(CAMPOS) + " FROM usuarios"
+
+
+def _parametros_insercao(usuario):
+    return (usuario['id'], usuario['nome'], usuario['cpf'], normalizar_cpf(usuario['cpf']),
+            usuario['idade'], usuario['email'], normalizar_email(usuario['email']),
+            usuario['cep'], usuario.get('data_cadastro'), usuario.get('data_atualizacao'),
+            usuario.get('versao', 0))
+
+
+def _parametros_atualizacao(usuario):
+    versao = usuario.get('versao', 0)
+    return (usuario['nome'], usuario['cpf'], normalizar_cpf(usuario['cpf']),
+            usuario['idade'], usuario['email'], normalizar_email(usuario['email']),
+            usuario['cep'], usuario.get('data_cadastro'), usuario.get('data_atualizacao'),
+            versao, usuario['id'], versao - 1)
+
+
+def _linha_para_usuario(linha):
+    """Converte uma linha do banco para o mesmo formato de dicionário do JSON"""
+    usuario = dict(zip(CAMPOS, linha))
+    if usuario['data_atualizacao'] is None:
+        del usuario['data_atualizacao']
+    return usuario
+
+
+class ArmazenamentoSQLite(Armazenamento):
+    """Cada operação vira uma instrução indexada; nada é regravado por inteiro
+
+    O próprio SQLite trava o banco entre processos; a coluna 'versao'
+    impede que uma instância sobrescreva a alteração de outra.
+    """
+
+    def __init__(self, caminho=ARQUIVO_BANCO):
+        self.caminho = caminho
+        self.conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        with self.conexao:
+            self.conexao.execute(_criar_tabela)
+            colunas = {linha[1] for linha in self.conexao.execute("PRAGMA table_info(usuarios)")}
+            if 'versao' not in colunas:
+                # Bancos criados antes do controle de versão
+                self.conexao.execute("ALTER TABLE usuarios ADD COLUMN versao "
+                                     "INTEGER NOT NULL DEFAULT 0")
+            for sql in _criar_indices:
+                self.conexao.execute(sql)
+        self._novidades = []
+
+    def carregar(self):
+        """Carrega todos os usuários na ordem de cadastro"""
+        cursor = self.conexao.execute(_sql_selecionar + " ORDER BY ordem")
+        return [_linha_para_usuario(linha) for linha in cursor]
+
+    def carregar_paginas(self, tamanho=TAMANHO_PAGINA):
+        """Consulta paginada pela chave primária: cada página custa o mesmo"""
+        ultima = 0
+        while True:
+            ultima, usuarios = self.pagina(ultima, tamanho)
+            if not usuarios:
+                return
+            yield usuarios
+
+    def iterar(self):
+        """Percorre os usuários pelo cursor, sem carregar a tabela inteira"""
+        cursor = self.conexao.execute(_sql_selecionar + " ORDER BY ordem")
+        for linha in cursor:
+            yield _linha_para_usuario(linha)
+
+    def pagina(self, apos=0, limite=TAMANHO_PAGINA):
+        """Retorna (ultima_ordem, usuarios) da próxima página, paginando pela ordem"""
+        cursor = self.conexao.execute(
+            "SELECT ordem, " + ", ".join(CAMPOS) + " FROM usuarios"
+            " WHERE ordem > ? ORDER BY ordem LIMIT ?", (apos, limite))
+        linhas = cursor.fetchall()
+        if not linhas:
+            return apos, []
+        return linhas[-1][0], [_linha_para_usuario(linha[1:]) for linha in linhas]
+
+    def contar(self):
+        """Total de usuários cadastrados"""
+        return self.conexao.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0]
+
+    def buscar_por_cpf(self, cpf):
+        """Busca um usuário pelo CPF usando o índice único"""
+        linha = self.conexao.execute(_sql_selecionar + " WHERE cpf_normalizado = ?",
+                                     (normalizar_cpf(cpf),)).fetchone()
+        return _linha_para_usuario(linha) if linha else None
+
+    def buscar_por_email(self, email):
+        """Busca um usuário pelo e-mail usando o índice único"""
+        linha = self.conexao.execute(_sql_selecionar + " WHERE email_normalizado = ?",
+                                     (normalizar_email(email),)).fetchone()
+        return _linha_para_usuario(linha) if linha else None
+
+    def buscar_por_id(self, chave):
+        """Busca um usuário pela chave estável"""
+        linha = self.conexao.execute(_sql_selecionar + " WHERE id = ?", (chave,)).fetchone()
+        return _linha_para_usuario(linha) if linha else None
+
+    def aplicar(self, operacoes, usuarios):
+        """Executa todas as operações em uma única transação, recusando as que estão em conflito"""
+        recusadas = []
+        with self.conexao:
+            for op, usuario in operacoes:
+                try:
+                    if op == OP_INSERIR:
+                        cursor = self.conexao.execute(_sql_inserir, _parametros_insercao(usuario))
+                    elif op == OP_ATUALIZAR:
+                        cursor = self.conexao.execute(_sql_atualizar,
+                                                      _parametros_atualizacao(usuario))
+                    else:
+                        cursor = self.conexao.execute(_sql_remover,
+                                                      (usuario['id'], usuario.get('versao', 0)))
+                except sqlite3.IntegrityError:
+                    # CPF ou e-mail gravado antes por outra instância
+                    recusadas.append((op, usuario))
+                    continue
+                if cursor.rowcount == 0:
+                    recusadas.append((op, usuario))
+        if recusadas:
+            # A interface desfaz as recusadas com o estado que está no banco
+            for op, usuario in recusadas:
+                self._novidades.append((usuario['id'], self.buscar_por_id(usuario['id'])))
+            raise ErroConflito(f"{len(recusadas)} alteração(ões) recusada(s): o registro foi "
+                               f"alterado por outra instância", recusadas)
+
+    def novidades(self):
+        """Registros a desfazer após conflitos (outras instâncias não são acompanhadas)"""
+        novidades, self._novidades = self._novidades, []
+        return novidades
+
+    def fechar(self):
+        """Fecha a conexão com o banco"""
+        self.conexao.close()
+
+
+def migrar_json(caminho_json=ARQUIVO_DADOS, caminho_banco=ARQUIVO_BANCO):
+    """Copia os usuários do JSON (snapshot + diário) para o banco SQLite
+
+    Retorna (quantidade migrada, lista de usuários rejeitados por CPF ou
+    e-mail repetido).
+    """
+    usuarios = ArmazenamentoDiario(caminho_json).carregar()
+    destino = ArmazenamentoSQLite(caminho_banco)
+    migrados = 0
+    rejeitados = []
+    try:
+        with destino.conexao:
+            for usuario in usuarios:
+                try:
+                    destino.conexao.execute(_sql_inserir, _parametros_insercao(usuario))
+                    migrados += 1
+                except sqlite3.IntegrityError:
+                    rejeitados.append(usuario)
+    finally:
+        destino.fechar()
+    return migrados, rejeitados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migra o cadastro em JSON para SQLite")
+    parser.add_argument('json', nargs='?', default=ARQUIVO_DADOS)
+    parser.add_argument('banco', nargs='?', default=ARQUIVO_BANCO)
+    args = parser.parse_args()
+
+    migrados, rejeitados = migrar_json(args.json, args.banco)
+    print(f"{migrados} usuários migrados para {args.banco}")
+    for usuario in rejeitados:
+        print(f"Rejeitado (CPF ou e-mail repetido): {usuario['nome']} - {usuario['cpf']}")
@@ -0,0 +1,194 @@
+"""Busca rápida por nome, CPF, e-mail e CEP com índice invertido de n-gramas"""
+import re
+import unicodedata
+from array import array
+from functools import lru_cache
+
+from indices import Indice
+
+# Tamanho dos n-gramas usados para buscas por trecho
+N = 3
+
+# Com até esta quantidade de listas montadas, os registros novos são
+# encaixados varrendo os textos por chave; acima dela, extraindo as chaves
+# de cada registro (cerca de 500 varreduras custam o mesmo que uma extração)
+LIMITE_VARREDURA = 256
+
+_nao_digitos = re.compile(r'[^0-9]')
+_so_numeros = re.compile(r'[0-9.\-]+')
+
+
+def normalizar_texto(texto):
+    """Minúsculas e sem acentos, para comparar 'João' com 'joao'"""
+    if texto.isascii():
+        return texto.lower()
+    return ' '.join(_normalizar_palavra(palavra) for palavra in texto.split())
+
+
+@lru_cache(maxsize=65536)
+def _normalizar_palavra(palavra):
+    # Nomes e sobrenomes se repetem muito: o cache evita refazer a decomposição
+    decomposto = unicodedata.normalize('NFKD', palavra.casefold())
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def texto_busca(usuario):
+    """Texto pesquisável de um usuário: nome, CPF e CEP só com dígitos, e-mail"""
+    return ' '.join((normalizar_texto(usuario['nome']),
+                     _nao_digitos.sub('', usuario['cpf']),
+                     normalizar_texto(usuario['email']),
+                     _nao_digitos.sub('', usuario['cep'])))
+
+
+def termos_consulta(consulta):
+    """Separa a consulta em termos normalizados ('123.456' vira '123456')"""
+    termos = []
+    for termo in normalizar_texto(consulta).split():
+        if _so_numeros.fullmatch(termo):
+            termo = _nao_digitos.sub('', termo)
+        if termo:
+            termos.append(termo)
+    return termos
+
+
+def _chaves(texto):
+    """Chaves de índice do texto: n-gramas de cada palavra e seus prefixos curtos
+
+    Os prefixos (1 a N-1 caracteres) atendem consultas curtas; como têm
+    tamanho diferente dos n-gramas, os dois convivem no mesmo dicionário.
+    """
+    chaves = set()
+    for palavra in texto.split():
+        chaves.update([palavra[i:i + N] for i in range(len(palavra) - N + 1)])
+        chaves.update([palavra[:tamanho] for tamanho in range(1, N)])
+    return chaves
+
+
+def _varrer(chave, registros):
+    """Array com os números de ordem (dicionário ordem -> (texto, usuario)) cujo texto tem a chave"""
+    if len(chave) < N:
+        # Prefixo curto: os textos começam com espaço, então ' ab' acha o início de qualquer palavra
+        chave = ' ' + chave
+    return array('I', [ordem for ordem, (texto, _) in registros.items() if chave in texto])
+
+
+class IndiceBusca(Indice):
+    """Índice invertido: n-grama ou prefixo curto -> números de ordem dos usuários
+
+    Cada usuário recebe um número de ordem crescente; as listas de
+    ocorrências são arrays compactos desses números. Uma lista só é montada
+    na primeira consulta que usa a sua chave, com uma varredura dos textos,
+    e daí em diante recebe os usuários novos: carregar o cadastro custa só
+    o texto pesquisável de cada registro. Exclusões e edições não apagam
+    entradas antigas (a conferência final descarta resultados que não batem
+    mais); quando o lixo acumulado fica grande as listas são descartadas e
+    voltam a ser montadas sob demanda.
+    """
+
+    def __init__(self):
+        self.reconstruir([])
+
+    def reconstruir(self, usuarios):
+        """Reconstrói o índice a partir da lista completa"""
+        self.ocorrencias = {}
+        self.registros = {}
+        self.ordem_por_id = {}
+        self.proxima_ordem = 0
+        self.lixo = 0
+        self.adicionar_lote(usuarios)
+
+    def adicionar(self, usuario):
+        """Indexa um novo usuário"""
+        self.adicionar_lote((usuario,))
+
+    def adicionar_lote(self, usuarios):
+        """Indexa vários usuários novos; só as listas já montadas recebem os números de ordem"""
+        novos = {}
+        for ordem, usuario in enumerate(usuarios, self.proxima_ordem):
+            self.ordem_por_id[usuario['id']] = ordem
+            novos[ordem] = (' ' + texto_busca(usuario), usuario)
+        self.proxima_ordem += len(novos)
+        self.registros.update(novos)
+        if len(self.ocorrencias) <= LIMITE_VARREDURA:
+            for chave, ocorrencias in self.ocorrencias.items():
+                ocorrencias.extend(_varrer(chave, novos))
+        else:
+            for ordem, (texto, _) in novos.items():
+                self._indexar(ordem, _chaves(texto))
+
+    def remover(self, usuario):
+        """Retira um usuário (as entradas viram lixo até as listas serem descartadas)"""
+        ordem = self.ordem_por_id.pop(usuario['id'], None)
+        if ordem is None:
+            return
+        del self.registros[ordem]
+        self._talvez_reconstruir()
+
+    def substituir(self, antigo, novo):
+        """Atualiza um usuário editado mantendo o seu número de ordem"""
+        ordem = self.ordem_por_id.get(antigo['id'])
+        if ordem is None:
+            self.adicionar(novo)
+            return
+        texto_antigo, _ = self.registros[ordem]
+        texto = ' ' + texto_busca(novo)
+        self.registros[ordem] = (texto, novo)
+        if texto == texto_antigo or not self.ocorrencias:
+            return
+        self._indexar(ordem, _chaves(texto) - _chaves(texto_antigo))
+        self._talvez_reconstruir()
+
+    def buscar(self, consulta):
+        """Retorna os usuários que contêm todos os termos da consulta, na ordem de cadastro"""
+        termos = termos_consulta(consulta)
+        if not termos:
+            return [registro for _, registro in self.registros.values()]
+
+        # Candidatos vêm da menor lista de ocorrências entre os termos
+        menor = None
+        for termo in termos:
+            if len(termo) >= N:
+                chaves = [termo[i:i + N] for i in range(len(termo) - N + 1)]
+            else:
+                chaves = [termo]
+            for chave in chaves:
+                ocorrencias = self._ocorrencias(chave)
+                if not ocorrencias:
+                    return []
+                if menor is None or len(ocorrencias) < len(menor):
+                    menor = ocorrencias
+
+        resultados = []
+        for ordem in sorted(set(menor)):
+            encontrado = self.registros.get(ordem)
+            if encontrado is None:
+                continue
+            texto, usuario = encontrado
+            if all(self._contem(texto, termo) for termo in termos):
+                resultados.append(usuario)
+        return resultados
+
+    def _contem(self, texto, termo):
+        if len(termo) >= N:
+            return termo in texto
+        return any(palavra.startswith(termo) for palavra in texto.split())
+
+    def _ocorrencias(self, chave):
+        ocorrencias = self.ocorrencias.get(chave)
+        if ocorrencias is None:
+            ocorrencias = self.ocorrencias[chave] = _varrer(chave, self.registros)
+        return ocorrencias
+
+    def _indexar(self, ordem, chaves):
+        # Só as listas já montadas; as outras verão o registro quando forem montadas
+        indice = self.ocorrencias
+        for chave in chaves & indice.keys():
+            indice[chave].append(ordem)
+
+    def _talvez_reconstruir(self):
+        if not self.ocorrencias:
+            return
+        self.lixo += 1
+        if self.lixo > len(self.registros) // 2 and self.lixo > 10000:
+            self.ocorrencias = {}
+            self.lixo = 0
@@ -0,0 +1,353 @@
+"""Possíveis duplicatas: nomes parecidos no mesmo CEP e e-mails equivalentes, por blocos e MinHash/LSH
+
+Uso: python duplicatas.py usuarios_cadastrados.json [--processos N]
+(relatório de todo o cadastro; o MinHash dos nomes é calculado em vários processos)
+
+Comparar todos os pares seria O(n²). Cada registro entra em poucos blocos:
+o do e-mail canônico (sem pontos nem '+etiqueta') e um por banda da
+assinatura MinHash dos trigramas do nome, junto com o CEP. Nomes parecidos
+no mesmo CEP caem, com alta probabilidade, em alguma banda comum (LSH);
+só os registros que dividem algum bloco são comparados de fato. O CEP na
+chave evita blocos enormes com os nomes mais comuns (e com cidades
+pequenas que têm um único CEP, o LSH ainda separa os nomes diferentes).
+"""
+import os
+import random
+import re
+import zlib
+from functools import lru_cache
+from itertools import islice
+
+from busca import normalizar_texto
+from indices import Indice
+from validacao import apenas_digitos
+
+# Palavras que não contam na comparação de nomes
+PARTICULAS = frozenset(('da', 'de', 'do', 'das', 'dos', 'e'))
+
+# Semelhança mínima dos nomes (Jaccard dos trigramas) para dois cadastros do mesmo CEP
+LIMIAR_NOME = 0.8
+
+# Assinatura MinHash: BANDAS grupos de LINHAS valores. Com 6 x 2, nomes com
+# semelhança 0.8 dividem alguma banda em 99,8% dos casos
+BANDAS = 6
+LINHAS = 2
+
+# Registros enviados de uma vez a cada processo da verificação completa
+REGISTROS_POR_PARTE = 5000
+
+# Lotes maiores que este ficam pendentes no índice (calcular_pendentes)
+LOTE_IMEDIATO = 100
+
+_PRIMO = (1 << 31) - 1
+# Coeficientes fixos: as assinaturas são as mesmas em qualquer processo ou execução
+_aleatorio = random.Random(20240601)
+_COEFICIENTES = [(_aleatorio.randrange(1, _PRIMO), _aleatorio.randrange(_PRIMO))
+                 for _ in range(BANDAS * LINHAS)]
+del _aleatorio
+
+_nao_letras = re.compile(r'[^a-z]+')
+
+
+def palavras_nome(nome):
+    """Palavras do nome sem acentos, pontuação e partículas ('João da Silva' -> ['joao', 'silva'])"""
+    return [limpa for palavra in nome.split() for limpa in _limpar_palavra(palavra)]
+
+
+@lru_cache(maxsize=65536)
+def _limpar_palavra(palavra):
+    # Nomes completos raramente se repetem, mas as palavras sim: os caches são por palavra
+    return tuple([limpa for limpa in _nao_letras.sub(' ', normalizar_texto(palavra)).split()
+                  if limpa not in PARTICULAS])
+
+
+@lru_cache(maxsize=65536)
+def _trigramas_palavra(palavra):
+    palavra = f' {palavra} '
+    return frozenset([palavra[i:i + 3] for i in range(len(palavra) - 2)])
+
+
+def trigramas_nome(nome):
+    """Trigramas das palavras do nome, com espaço nas pontas (não depende da ordem das palavras)"""
+    return frozenset().union(*map(_trigramas_palavra, palavras_nome(nome)))
+
+
+def semelhanca_nomes(nome, outro):
+    """Jaccard dos trigramas dos dois nomes: 1.0 para as mesmas palavras"""
+    trigramas, outros = trigramas_nome(nome), trigramas_nome(outro)
+    if not trigramas or not outros:
+        return 0.0
+    return len(trigramas & outros) / len(trigramas | outros)
+
+
+@lru_cache(maxsize=65536)
+def _hashes(trigrama):
+    # Os trigramas de nomes são poucos: cada um é espalhado uma vez só
+    valor = zlib.crc32(trigrama.encode('utf-8'))
+    return tuple([(a * valor + b) % _PRIMO for a, b in _COEFICIENTES])
+
+
+@lru_cache(maxsize=65536)
+def _assinatura_palavra(palavra):
+    return tuple(map(min, zip(*map(_hashes, _trigramas_palavra(palavra)))))
+
+
+def assinatura_nome(nome):
+    """MinHash dos trigramas do nome (BANDAS * LINHAS valores), ou None se não sobrar palavra
+
+    O mínimo sobre a união dos trigramas é o mínimo das assinaturas de cada palavra.
+    """
+    palavras = palavras_nome(nome)
+    if len(palavras) < 2:
+        return _assinatura_palavra(palavras[0]) if palavras else None
+    return tuple(map(min, *map(_assinatura_palavra, palavras)))
+
+
+def email_canonico(email):
+    """Minúsculas e, antes do @, sem pontos nem '+etiqueta' ('Joao.Silva+loja@x.com' -> 'joaosilva@x.com')"""
+    local, arroba, dominio = email.strip().lower().rpartition('@')
+    if not arroba:
+        return dominio
+    return local.split('+', 1)[0].replace('.', '') + '@' + dominio
+
+
+def campos_usuario(usuario):
+    """(nome, e-mail, CEP inteiro) comparados na detecção"""
+    return usuario.nome, usuario.email, usuario.numero_cep()
+
+
+def cep_numerico(cep):
+    """CEP digitado -> inteiro comparado com Usuario.numero_cep()"""
+    return int(apenas_digitos(cep) or 0)
+
+
+def chaves_bloco(nome, email, cep):
+    """Blocos do registro: o e-mail canônico e, para cada banda do MinHash do nome, (CEP, banda, valores)
+
+    As chaves das bandas são hash() de tuplas de inteiros, iguais em
+    qualquer processo; colisões só acrescentam candidatos.
+    """
+    chaves = []
+    canonico = email_canonico(email)
+    if canonico:
+        chaves.append(canonico)
+    assinatura = assinatura_nome(nome)
+    if assinatura is not None:
+        for banda in range(BANDAS):
+            chaves.append(hash((cep, banda) + assinatura[banda * LINHAS:(banda + 1) * LINHAS]))
+    return chaves
+
+
+def motivo_duplicata(campos, outros):
+    """(motivo, semelhança dos nomes) se os dois (nome, e-mail, CEP) parecem a mesma pessoa, senão None"""
+    semelhanca = semelhanca_nomes(campos[0], outros[0])
+    if email_canonico(campos[1]) == email_canonico(outros[1]):
+        return "e-mail equivalente", semelhanca
+    if campos[2] == outros[2] and semelhanca >= LIMIAR_NOME:
+        return "nome parecido no mesmo CEP", semelhanca
+    return None
+
+
+def _incluir(blocos, chave, usuario):
+    # Quase todo bloco tem um único registro: a lista só é criada no segundo
+    atual = blocos.get(chave)
+    if atual is None:
+        blocos[chave] = usuario
+    elif atual.__class__ is list:
+        atual.append(usuario)
+    else:
+        blocos[chave] = [atual, usuario]
+
+
+def _retirar(blocos, chave, usuario):
+    atual = blocos.get(chave)
+    if atual is usuario:
+        del blocos[chave]
+    elif atual.__class__ is list and usuario in atual:
+        atual.remove(usuario)
+        if len(atual) == 1:
+            blocos[chave] = atual[0]
+
+
+def verificar(grupos):
+    """Compara os registros de cada grupo (um bloco); pares (a, b, motivo, semelhança), mais parecidos primeiro"""
+    vistos = set()
+    pares = []
+    for grupo in grupos:
+        campos = [campos_usuario(usuario) for usuario in grupo]
+        for i, usuario in enumerate(grupo):
+            for j in range(i + 1, len(grupo)):
+                outro = grupo[j]
+                par = (id(usuario), id(outro)) if id(usuario) < id(outro) else (id(outro), id(usuario))
+                if par in vistos:
+                    continue
+                vistos.add(par)
+                resultado = motivo_duplicata(campos[i], campos[j])
+                if resultado is not None:
+                    pares.append((usuario, outro) + resultado)
+    pares.sort(key=lambda par: (-par[3], par[0]['nome']))
+    return pares
+
+
+def descrever(pares):
+    """Pares no formato da API: ids, nomes, motivo e semelhança dos nomes"""
+    return [{'usuarios': [usuario['id'], outro['id']], 'nomes': [usuario['nome'], outro['nome']],
+             'motivo': motivo, 'semelhanca': round(semelhanca, 2)}
+            for usuario, outro, motivo, semelhanca in pares]
+
+
+class IndiceDuplicatas(Indice):
+    """Blocos de possíveis duplicatas (e-mail canônico, bandas do MinHash do nome com o CEP)
+
+    'blocos' mapeia a chave para o usuário, ou para a lista se houver mais
+    de um. Alterações avulsas entram nos blocos na hora; os lotes grandes
+    (páginas da carga, importações) ficam em 'pendentes' até
+    calcular_pendentes, que a interface chama aos poucos depois da carga.
+    Enquanto houver pendentes, semelhantes() os confere um a um pelo CEP e
+    pelo e-mail, sem calcular o MinHash.
+    """
+
+    def __init__(self):
+        self.reconstruir([])
+
+    def reconstruir(self, usuarios):
+        """Descarta os blocos; a lista completa fica pendente"""
+        self.blocos = {}
+        self.pendentes = {}
+        self.adicionar_lote(usuarios)
+
+    def adicionar(self, usuario):
+        """Inclui o usuário nos seus blocos"""
+        for chave in chaves_bloco(*campos_usuario(usuario)):
+            _incluir(self.blocos, chave, usuario)
+
+    def adicionar_lote(self, usuarios):
+        """Inclui lotes pequenos nos blocos; os grandes ficam pendentes"""
+        if len(usuarios) <= LOTE_IMEDIATO:
+            for usuario in usuarios:
+                self.adicionar(usuario)
+        else:
+            self.pendentes.update(dict.fromkeys(usuarios))
+
+    def remover(self, usuario):
+        """Retira o usuário dos seus blocos (ou dos pendentes)"""
+        if usuario in self.pendentes:
+            del self.pendentes[usuario]
+            return
+        for chave in chaves_bloco(*campos_usuario(usuario)):
+            _retirar(self.blocos, chave, usuario)
+
+    def calcular_pendentes(self, quantidade=None):
+        """Inclui nos blocos até 'quantidade' registros pendentes (None: todos); retorna quantos ainda faltam"""
+        if quantidade is None or quantidade >= len(self.pendentes):
+            lote, self.pendentes = self.pendentes, {}
+        else:
+            lote = list(islice(self.pendentes, quantidade))
+            for usuario in lote:
+                del self.pendentes[usuario]
+        for usuario in lote:
+            self.adicionar(usuario)
+        return len(self.pendentes)
+
+    def semelhantes(self, nome, email, cep, ignorar=None):
+        """[(usuario, motivo, semelhança)] dos cadastros que parecem a mesma pessoa, mais parecidos primeiro
+
+        'cep' só com os dígitos, como inteiro; 'ignorar' é o registro em edição.
+        """
+        blocos = self.blocos
+        campos = (nome, email, cep)
+        vistos = set()
+        encontrados = []
+        for chave in chaves_bloco(*campos):
+            grupo = blocos.get(chave)
+            for usuario in grupo if grupo.__class__ is list else (grupo,):
+                if usuario is None or usuario is ignorar or usuario in vistos:
+                    continue
+                vistos.add(usuario)
+                resultado = motivo_duplicata(campos, campos_usuario(usuario))
+                if resultado is not None:
+                    encontrados.append((usuario,) + resultado)
+        if self.pendentes:
+            # Só o mesmo CEP ou o mesmo e-mail canônico podem dar motivo_duplicata
+            canonico = email_canonico(email)
+            for usuario in self.pendentes:
+                if usuario is ignorar:
+                    continue
+                outros = campos_usuario(usuario)
+                if outros[2] != cep and email_canonico(outros[1]) != canonico:
+                    continue
+                resultado = motivo_duplicata(campos, outros)
+                if resultado is not None:
+                    encontrados.append((usuario,) + resultado)
+        encontrados.sort(key=lambda item: -item[2])
+        return encontrados
+
+    def pares(self):
+        """Todos os pares de possíveis duplicatas do cadastro"""
+        return verificar(self.grupos())
+
+    def grupos(self):
+        """Cópia dos blocos com mais de um registro, que verificar() pode conferir em outra thread
+
+        Calcula antes os pendentes que ainda houver.
+        """
+        self.calcular_pendentes()
+        return [list(grupo) for grupo in self.blocos.values() if grupo.__class__ is list]
+
+
+def _chaves_parte(campos):
+    # Executada nos processos do pool: só recebe e devolve tuplas, strings e inteiros
+    return [chaves_bloco(*registro) for registro in campos]
+
+
+def procurar_duplicatas(usuarios, processos=None):
+    """Verificação completa: pares (a, b, motivo, semelhança) de possíveis duplicatas
+
+    O MinHash dos nomes (a parte cara) é calculado em partes de
+    REGISTROS_POR_PARTE em um pool de 'processos' (None: um por CPU; 1: no
+    próprio processo). Os blocos são agrupados e conferidos aqui.
+    """
+    usuarios = list(usuarios)
+    if processos is None:
+        processos = os.cpu_count() or 1
+    campos = [campos_usuario(usuario) for usuario in usuarios]
+    partes = [campos[inicio:inicio + REGISTROS_POR_PARTE]
+              for inicio in range(0, len(campos), REGISTROS_POR_PARTE)]
+    if processos == 1 or len(partes) < 2:
+        chaves = map(_chaves_parte, partes)
+    else:
+        # Importado só aqui: a interface e a API usam apenas o índice
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(processos) as pool:
+            chaves = list(pool.map(_chaves_parte, partes))
+
+    blocos = {}
+    registros = iter(usuarios)
+    for parte in chaves:
+        for chaves_registro in parte:
+            usuario = next(registros)
+            for chave in chaves_registro:
+                _incluir(blocos, chave, usuario)
+    return verificar(grupo for grupo in blocos.values() if grupo.__class__ is list)
+
+
+if __name__ == "__main__":
+    # A interface importa este módulo; o argparse e a leitura ficam só na linha de comando
+    import argparse
+    from time import perf_counter
+    from modelo import como_usuario
+    from persistencia import ArmazenamentoDiario
+    parser = argparse.ArgumentParser(description="Relatório de possíveis usuários duplicados")
+    parser.add_argument('arquivo', help="snapshot do cadastro (JSON ou binário); o diário também é lido")
+    parser.add_argument('--processos', type=int, default=None,
+                        help=f"processos da verificação (padrão: {os.cpu_count()}, um por CPU)")
+    args = parser.parse_args()
+
+    usuarios = [como_usuario(usuario) for usuario in ArmazenamentoDiario(args.arquivo).iterar()]
+    inicio = perf_counter()
+    pares = procurar_duplicatas(usuarios, args.processos)
+    for usuario, outro, motivo, semelhanca in pares:
+        print(f"{motivo} ({semelhanca:.0%}): {usuario['nome']} <{usuario['email']}> "
+              f"[{usuario['cpf']}] x {outro['nome']} <{outro['email']}> [{outro['cpf']}]")
+    print(f"{len(pares)} possíveis duplicatas entre {len(usuarios)} usuários "
+          f"({perf_counter() - inicio:.1f} s)")
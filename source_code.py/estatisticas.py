@@ -0,0 +1,131 @@
+"""Estatísticas do cadastro mantidas a cada alteração: faixas etárias, regiões do CEP e cadastros por dia"""
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+from indices import Indice
+from modelo import epoca_agora, texto_epoca
+from validacao import apenas_digitos
+
+# Idade em que começa cada faixa etária, a partir da segunda (a primeira começa em 0)
+LIMITES_FAIXAS = (18, 25, 35, 45, 60)
+FAIXAS_ETARIAS = ('0-17', '18-24', '25-34', '35-44', '45-59', '60+')
+
+# Região postal de cada primeiro dígito do CEP
+REGIOES_CEP = ('Grande São Paulo', 'Interior de SP', 'RJ e ES', 'MG', 'BA e SE',
+               'PE, AL, PB e RN', 'CE, PI, MA, PA, AM, AC, AP e RR',
+               'DF, GO, TO, MT, MS e RO', 'PR e SC', 'RS')
+
+# Rótulo das contagens de registros sem o dado (idade, CEP ou data em outro formato)
+SEM_INFORMACAO = 'Não informado'
+
+_SEGUNDOS_DIA = 86400
+
+
+def faixa_etaria(usuario):
+    """Posição da faixa etária do usuário em FAIXAS_ETARIAS, ou None se a idade não for um número"""
+    idade = usuario.idade
+    if idade.__class__ is not int:
+        try:
+            idade = int(idade)
+        except (TypeError, ValueError):
+            return None
+    return bisect_right(LIMITES_FAIXAS, idade)
+
+
+def sub_regiao(usuario):
+    """Dois primeiros dígitos do CEP (região e sub-região postal), ou None se não tiver 8 dígitos"""
+    cep = usuario.cep_numero
+    if cep.__class__ is not int:
+        digitos = apenas_digitos(str(cep))
+        if len(digitos) != 8:
+            return None
+        cep = int(digitos)
+    return cep // 1000000
+
+
+def dia_cadastro(usuario):
+    """Dia do cadastro (dias desde 01/01/1970), ou None se a data não estiver no formato"""
+    cadastro = usuario.cadastro
+    return cadastro // _SEGUNDOS_DIA if cadastro.__class__ is int else None
+
+
+def _texto_dia(dia):
+    return SEM_INFORMACAO if dia is None else texto_epoca(dia * _SEGUNDOS_DIA)[:10]
+
+
+class IndiceEstatisticas(Indice):
+    """Contagens por faixa etária, sub-região do CEP e dia de cadastro
+
+    Cada inclusão, edição ou exclusão soma ou subtrai 1 nas contagens do
+    registro, então as consultas (resumo) nunca percorrem os usuários.
+    'alteracoes' muda a cada atualização, para quem exibe saber quando
+    redesenhar.
+    """
+
+    def __init__(self):
+        self.alteracoes = 0
+        self.reconstruir([])
+
+    def reconstruir(self, usuarios):
+        """Recalcula as contagens a partir da lista completa"""
+        self.total = 0
+        self.por_faixa = Counter()
+        self.por_sub_regiao = Counter()
+        self.por_dia = Counter()
+        self.adicionar_lote(usuarios)
+
+    def _contar(self, usuario, passo):
+        self.total += passo
+        for contagem, chave in ((self.por_faixa, faixa_etaria(usuario)),
+                                (self.por_sub_regiao, sub_regiao(usuario)),
+                                (self.por_dia, dia_cadastro(usuario))):
+            quantidade = contagem[chave] + passo
+            if quantidade:
+                contagem[chave] = quantidade
+            else:
+                del contagem[chave]
+        self.alteracoes += 1
+
+    def adicionar(self, usuario):
+        """Conta um novo registro"""
+        self._contar(usuario, 1)
+
+    def adicionar_lote(self, usuarios):
+        """Conta vários registros novos (carga em páginas, importação)"""
+        self.total += len(usuarios)
+        self.por_faixa.update(map(faixa_etaria, usuarios))
+        self.por_sub_regiao.update(map(sub_regiao, usuarios))
+        self.por_dia.update(map(dia_cadastro, usuarios))
+        self.alteracoes += 1
+
+    def remover(self, usuario):
+        """Desconta um registro retirado"""
+        self._contar(usuario, -1)
+
+    def regioes(self):
+        """Usuários por região postal (primeiro dígito do CEP), somando as sub-regiões"""
+        regioes = Counter()
+        for prefixo, quantidade in self.por_sub_regiao.items():
+            regioes[None if prefixo is None else prefixo // 10] += quantidade
+        return regioes
+
+    def resumo(self, dias=None):
+        """Contagens no formato da API (rótulos como texto); 'dias' limita aos últimos dias do calendário, com hoje"""
+        faixas = {rotulo: self.por_faixa[posicao] for posicao, rotulo in enumerate(FAIXAS_ETARIAS)}
+        regioes = self.regioes()
+        por_regiao = {str(digito): regioes[digito] for digito in range(len(REGIOES_CEP))}
+        sub_regioes = {f'{prefixo:02d}': self.por_sub_regiao[prefixo]
+                       for prefixo in sorted(p for p in self.por_sub_regiao if p is not None)}
+        datados = sorted(dia for dia in self.por_dia if dia is not None)
+        if dias is not None:
+            # Dias sem cadastro não estão em por_dia, então o corte é pela data
+            primeiro = epoca_agora() // _SEGUNDOS_DIA - dias + 1
+            datados = datados[bisect_left(datados, primeiro):] if dias > 0 else []
+        por_dia = {_texto_dia(dia): self.por_dia[dia] for dia in datados}
+
+        for contagem, saida in ((self.por_faixa, faixas), (regioes, por_regiao),
+                                (self.por_sub_regiao, sub_regioes), (self.por_dia, por_dia)):
+            if contagem[None]:
+                saida[SEM_INFORMACAO] = contagem[None]
+        return {'total': self.total, 'faixas_etarias': faixas, 'regioes_cep': por_regiao,
+                'sub_regioes_cep': sub_regioes, 'cadastros_por_dia': por_dia}
@@ -0,0 +1,195 @@
+"""Exportação em fluxo dos usuários para CSV, JSON Lines ou formato colunar binário"""
+import argparse
+import csv
+import json
+import os
+import struct
+from array import array
+
+from persistencia import criar_armazenamento, paginar
+
+# Campos disponíveis para exportação, na ordem padrão
+CAMPOS = ('id', 'nome', 'cpf', 'idade', 'email', 'cep', 'data_cadastro', 'data_atualizacao')
+
+# Campos inteiros (no formato colunar viram arrays de int32)
+CAMPOS_INTEIROS = ('idade',)
+
+# Registros escritos por bloco (e por grupo de linhas no formato colunar)
+TAMANHO_BLOCO_EXPORTACAO = 5000
+
+# Formato colunar: assinatura, cabeçalho JSON e grupos de linhas até um grupo vazio
+ASSINATURA_COLUNAR = b'CADCOL1\n'
+
+FORMATOS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.col': 'colunar'}
+
+_u32 = struct.Struct('<I')
+
+
+def formato_por_extensao(caminho):
+    """Deduz o formato pela extensão do arquivo ('csv' quando desconhecida)"""
+    return FORMATOS.get(os.path.splitext(caminho)[1].lower(), 'csv')
+
+
+def filtrar(usuarios, idade_min=None, idade_max=None, prefixo_cep=None):
+    """Filtra por faixa de idade e prefixo do CEP (comparado só pelos dígitos)"""
+    if prefixo_cep:
+        prefixo_cep = prefixo_cep.replace('-', '')
+    for usuario in usuarios:
+        idade = int(usuario['idade'])
+        if idade_min is not None and idade < idade_min:
+            continue
+        if idade_max is not None and idade > idade_max:
+            continue
+        if prefixo_cep and not usuario['cep'].replace('-', '').startswith(prefixo_cep):
+            continue
+        yield usuario
+
+
+def projetar(usuarios, campos):
+    """Gera tuplas só com os campos pedidos (campos ausentes viram '')"""
+    for usuario in usuarios:
+        yield tuple(usuario.get(campo, '') for campo in campos)
+
+
+def _escrever_csv(arquivo, campos, linhas, tamanho):
+    escritor = csv.writer(arquivo, delimiter=';')
+    escritor.writerow(campos)
+    for bloco in paginar(linhas, tamanho):
+        escritor.writerows(bloco)
+        yield len(bloco)
+
+
+def _escrever_jsonl(arquivo, campos, linhas, tamanho):
+    # Um único codificador: json.dumps com opções cria um novo a cada chamada
+    codificar = json.JSONEncoder(ensure_ascii=False).encode
+    for bloco in paginar(linhas, tamanho):
+        arquivo.write(''.join(codificar(dict(zip(campos, linha))) + '\n' for linha in bloco))
+        yield len(bloco)
+
+
+def _escrever_colunar(arquivo, campos, linhas, tamanho):
+    """Cada grupo: quantidade de linhas e, por campo, um bloco com tamanho em bytes
+
+    Campos inteiros são arrays int32; campos de texto são os deslocamentos
+    (uint32, quantidade + 1) seguidos do texto UTF-8 concatenado.
+    """
+    cabecalho = json.dumps({'campos': [{'nome': campo,
+                                        'tipo': 'int32' if campo in CAMPOS_INTEIROS else 'texto'}
+                                       for campo in campos]}).encode('utf-8')
+    arquivo.write(ASSINATURA_COLUNAR + _u32.pack(len(cabecalho)) + cabecalho)
+    for bloco in paginar(linhas, tamanho):
+        arquivo.write(_u32.pack(len(bloco)))
+        for i, campo in enumerate(campos):
+            valores = [linha[i] for linha in bloco]
+            if campo in CAMPOS_INTEIROS:
+                dados = array('i', map(int, valores)).tobytes()
+            else:
+                textos = [str(valor).encode('utf-8') for valor in valores]
+                deslocamentos = array('I', [0])
+                total = 0
+                for texto in textos:
+                    total += len(texto)
+                    deslocamentos.append(total)
+                dados = deslocamentos.tobytes() + b''.join(textos)
+            arquivo.write(_u32.pack(len(dados)) + dados)
+        yield len(bloco)
+    arquivo.write(_u32.pack(0))
+
+
+def ler_colunar(caminho):
+    """Lê um arquivo colunar gerando um dicionário por registro, grupo a grupo"""
+    with open(caminho, 'rb') as f:
+        if f.read(len(ASSINATURA_COLUNAR)) != ASSINATURA_COLUNAR:
+            raise ValueError(f"{caminho} não é um arquivo colunar de usuários")
+        cabecalho = json.loads(f.read(_u32.unpack(f.read(4))[0]))
+        campos = [(campo['nome'], campo['tipo']) for campo in cabecalho['campos']]
+        while True:
+            quantidade = _u32.unpack(f.read(4))[0]
+            if quantidade == 0:
+                return
+            colunas = []
+            for nome, tipo in campos:
+                dados = f.read(_u32.unpack(f.read(4))[0])
+                if tipo == 'int32':
+                    colunas.append(array('i', dados).tolist())
+                    continue
+                deslocamentos = array('I', dados[:4 * (quantidade + 1)])
+                texto = dados[4 * (quantidade + 1):]
+                colunas.append([texto[deslocamentos[j]:deslocamentos[j + 1]].decode('utf-8')
+                                for j in range(quantidade)])
+            nomes = [nome for nome, _ in campos]
+            for valores in zip(*colunas):
+                yield dict(zip(nomes, valores))
+
+
+_escritores = {'csv': _escrever_csv, 'jsonl': _escrever_jsonl, 'colunar': _escrever_colunar}
+
+
+def exportar_em_etapas(usuarios, caminho, formato=None, campos=CAMPOS,
+                       tamanho=TAMANHO_BLOCO_EXPORTACAO, **filtros):
+    """Grava os usuários (qualquer iterável) e gera o total exportado a cada bloco
+
+    A memória usada não depende da quantidade de registros: os usuários
+    passam por filtrar -> projetar -> escritor, um bloco por vez. O
+    arquivo só substitui o destino quando a exportação termina.
+    """
+    formato = formato or formato_por_extensao(caminho)
+    if formato not in _escritores:
+        raise ValueError(f"Formato de exportação desconhecido: {formato}")
+    desconhecidos = [campo for campo in campos if campo not in CAMPOS]
+    if desconhecidos:
+        raise ValueError(f"Campos desconhecidos: {', '.join(desconhecidos)}")
+
+    linhas = projetar(filtrar(usuarios, **filtros), campos)
+    temporario = caminho + '.tmp'
+    total = 0
+    try:
+        if formato == 'colunar':
+            arquivo = open(temporario, 'wb')
+        else:
+            arquivo = open(temporario, 'w', encoding='utf-8', newline='')
+        with arquivo:
+            for quantidade in _escritores[formato](arquivo, campos, linhas, tamanho):
+                total += quantidade
+                yield total
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def exportar(usuarios, caminho, formato=None, campos=CAMPOS, **filtros):
+    """Exporta de uma vez; retorna a quantidade de registros gravados"""
+    total = 0
+    for total in exportar_em_etapas(usuarios, caminho, formato, campos, **filtros):
+        pass
+    return total
+
+
+def exportar_armazenamento(caminho, tipo_armazenamento='diario', formato=None,
+                           campos=CAMPOS, **filtros):
+    """Exportação sem interface, lendo direto do armazenamento em fluxo"""
+    armazenamento = criar_armazenamento(tipo_armazenamento)
+    try:
+        return exportar(armazenamento.iterar(), caminho, formato, campos, **filtros)
+    finally:
+        armazenamento.fechar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta os usuários cadastrados")
+    parser.add_argument('saida', help="arquivo .csv, .jsonl ou .col")
+    parser.add_argument('--formato', choices=sorted(_escritores))
+    parser.add_argument('--armazenamento', choices=('diario', 'json', 'binario', 'sqlite'),
+                        default=os.environ.get('CADASTRO_ARMAZENAMENTO', 'diario'))
+    parser.add_argument('--campos', help="lista separada por vírgulas (padrão: todos)")
+    parser.add_argument('--idade-min', type=int)
+    parser.add_argument('--idade-max', type=int)
+    parser.add_argument('--cep-prefixo')
+    args = parser.parse_args()
+
+    campos = tuple(args.campos.split(',')) if args.campos else CAMPOS
+    total = exportar_armazenamento(args.saida, args.armazenamento, args.formato, campos,
+                                   idade_min=args.idade_min, idade_max=args.idade_max,
+                                   prefixo_cep=args.cep_prefixo)
+    print(f"{total} usuários exportados para {args.saida}")
@@ -0,0 +1,206 @@
+"""Importação em lote de usuários a partir de CSV ou JSON Lines"""
+import argparse
+import csv
+import json
+import os
+from datetime import datetime
+
+import validacao
+from indices import IndiceUsuarios, normalizar_cpf, normalizar_email
+from persistencia import criar_armazenamento, gerar_id, OP_INSERIR
+
+# Quantidade de linhas validadas e gravadas por vez
+TAMANHO_LOTE = 5000
+
+CAMPOS = ('nome', 'cpf', 'idade', 'email', 'cep')
+
+
+def ler_csv(caminho):
+    """Gera (número da linha, registro) de um CSV com cabeçalho (separador ',' ou ';')"""
+    with open(caminho, 'r', encoding='utf-8-sig', newline='') as f:
+        amostra = f.read(4096)
+        f.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=',;')
+        except csv.Error:
+            dialeto = csv.excel
+        leitor = csv.DictReader(f, dialect=dialeto)
+        for registro in leitor:
+            yield leitor.line_num, registro
+
+
+def ler_jsonl(caminho):
+    """Gera (número da linha, registro) de um arquivo JSON Lines (None se a linha for inválida)"""
+    with open(caminho, 'r', encoding='utf-8-sig') as f:
+        for numero, linha in enumerate(f, 1):
+            if not linha.strip():
+                continue
+            try:
+                registro = json.loads(linha)
+            except ValueError:
+                registro = None
+            yield numero, registro if isinstance(registro, dict) else None
+
+
+def ler_registros(caminho, formato=None):
+    """Escolhe o leitor pelo formato informado ou pela extensão do arquivo"""
+    if formato is None:
+        formato = 'csv' if caminho.lower().endswith('.csv') else 'jsonl'
+    if formato == 'csv':
+        return ler_csv(caminho)
+    if formato == 'jsonl':
+        return ler_jsonl(caminho)
+    raise ValueError(f"Formato de importação desconhecido: {formato}")
+
+
+def _texto(registro, campo):
+    valor = registro.get(campo)
+    return '' if valor is None else str(valor).strip()
+
+
+class Importacao:
+    """Valida e confirma usuários em lotes, gravando um relatório das linhas rejeitadas
+
+    'indice' (IndiceUsuarios) é usado para recusar CPF ou e-mail que já
+    existem no cadastro; 'confirmar' recebe a lista de usuários aceitos de
+    cada lote e deve incluí-los no cadastro (e no índice) de uma só vez.
+    """
+
+    def __init__(self, caminho, indice, confirmar, formato=None,
+                 caminho_relatorio=None, tamanho_lote=TAMANHO_LOTE):
+        self.caminho = caminho
+        self.indice = indice
+        self.confirmar = confirmar
+        self.formato = formato
+        self.caminho_relatorio = caminho_relatorio or os.path.splitext(caminho)[0] + '_rejeitados.csv'
+        self.tamanho_lote = tamanho_lote
+        self.lidos = 0
+        self.aceitos = 0
+        self.rejeitados = 0
+
+    def executar(self):
+        """Importa o arquivo inteiro; retorna (lidos, aceitos, rejeitados)"""
+        for _ in self.lotes():
+            pass
+        return self.lidos, self.aceitos, self.rejeitados
+
+    def lotes(self):
+        """Processa um lote por iteração (para a interface intercalar com os eventos do Tk)"""
+        with open(self.caminho_relatorio, 'w', encoding='utf-8', newline='') as f:
+            relatorio = csv.writer(f, delimiter=';')
+            relatorio.writerow(('linha', 'motivo') + CAMPOS)
+
+            lote = []
+            for numero, registro in ler_registros(self.caminho, self.formato):
+                lote.append((numero, registro))
+                if len(lote) >= self.tamanho_lote:
+                    self._processar(lote, relatorio)
+                    lote = []
+                    yield self.lidos, self.aceitos, self.rejeitados
+            if lote:
+                self._processar(lote, relatorio)
+                yield self.lidos, self.aceitos, self.rejeitados
+
+    def _processar(self, lote, relatorio):
+        self.lidos += len(lote)
+        registros = [registro or {} for _, registro in lote]
+        nomes = [_texto(r, 'nome') for r in registros]
+        cpfs = [_texto(r, 'cpf') for r in registros]
+        idades = [_texto(r, 'idade') for r in registros]
+        emails = [_texto(r, 'email') for r in registros]
+        ceps = [_texto(r, 'cep') for r in registros]
+
+        # Cada regra é aplicada à coluna inteira do lote
+        cpfs_ok = validacao.validar_cpfs(cpfs)
+        idades_ok = validacao.validar_idades(idades)
+        emails_ok = validacao.validar_emails(emails)
+        ceps_ok = validacao.validar_ceps(ceps)
+
+        agora = datetime.now().strftime('%d/%m/%Y %H:%M:%S')
+        aceitos = []
+        cpfs_lote = set()
+        emails_lote = set()
+        for i, (numero, registro) in enumerate(lote):
+            motivo = None
+            if registro is None:
+                motivo = "Linha inválida"
+            elif len(nomes[i]) < 2:
+                motivo = "Nome deve ter pelo menos 2 caracteres"
+            elif not cpfs_ok[i]:
+                motivo = "CPF inválido"
+            elif not idades_ok[i]:
+                motivo = (f"Idade deve estar entre {validacao.IDADE_MINIMA} "
+                          f"e {validacao.IDADE_MAXIMA} anos")
+            elif not emails_ok[i]:
+                motivo = "E-mail inválido"
+            elif not ceps_ok[i]:
+                motivo = "CEP inválido"
+            else:
+                cpf = normalizar_cpf(cpfs[i])
+                email = normalizar_email(emails[i])
+                if cpf in cpfs_lote or self.indice.cpf_em_uso(cpf):
+                    motivo = "CPF já cadastrado"
+                elif email in emails_lote or self.indice.email_em_uso(email):
+                    motivo = "E-mail já cadastrado"
+                else:
+                    cpfs_lote.add(cpf)
+                    emails_lote.add(email)
+
+            if motivo:
+                self.rejeitados += 1
+                relatorio.writerow((numero, motivo, nomes[i], cpfs[i], idades[i], emails[i], ceps[i]))
+                continue
+
+            aceitos.append({
+                'nome': nomes[i],
+                'cpf': validacao.formatar_cpf(cpfs[i]),
+                'idade': int(idades[i]),
+                'email': emails[i],
+                'cep': validacao.formatar_cep(ceps[i]),
+                'id': gerar_id(),
+                'data_cadastro': agora,
+                'versao': 1,
+            })
+
+        if aceitos:
+            self.confirmar(aceitos)
+            self.aceitos += len(aceitos)
+
+
+def importar_arquivo(caminho, tipo_armazenamento='diario', formato=None,
+                     caminho_relatorio=None, tamanho_lote=TAMANHO_LOTE):
+    """Importação sem interface: carrega o cadastro, importa e grava um lote por vez"""
+    armazenamento = criar_armazenamento(tipo_armazenamento)
+    try:
+        usuarios = armazenamento.carregar()
+        indice = IndiceUsuarios()
+        indice.reconstruir(usuarios)
+
+        def confirmar(aceitos):
+            usuarios.extend(aceitos)
+            indice.adicionar_lote(aceitos)
+            armazenamento.aplicar([(OP_INSERIR, usuario) for usuario in aceitos], usuarios)
+
+        importacao = Importacao(caminho, indice, confirmar, formato,
+                                caminho_relatorio, tamanho_lote)
+        resultado = importacao.executar()
+    finally:
+        armazenamento.fechar()
+    return resultado + (importacao.caminho_relatorio,)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa usuários de um arquivo CSV ou JSON Lines")
+    parser.add_argument('arquivo')
+    parser.add_argument('--formato', choices=('csv', 'jsonl'))
+    parser.add_argument('--armazenamento', choices=('diario', 'json', 'binario', 'sqlite'),
+                        default=os.environ.get('CADASTRO_ARMAZENAMENTO', 'diario'))
+    parser.add_argument('--relatorio', help="CSV com as linhas rejeitadas")
+    parser.add_argument('--lote', type=int, default=TAMANHO_LOTE)
+    args = parser.parse_args()
+
+    lidos, aceitos, rejeitados, relatorio = importar_arquivo(
+        args.arquivo, args.armazenamento, args.formato, args.relatorio, args.lote)
+    print(f"{lidos} linhas lidas, {aceitos} usuários importados, {rejeitados} rejeitados")
+    if rejeitados:
+        print(f"Relatório de rejeitados: {relatorio}")
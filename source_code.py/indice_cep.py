@@ -0,0 +1,154 @@
+"""Consulta local de CEP (cidade e UF) em um índice binário lido com mmap
+
+Uso: python indice_cep.py base_ceps.csv [--saida ceps.idx]
+
+A base é um CSV com cabeçalho: 'cep' (um CEP por linha) ou 'cep_inicial'
+e 'cep_final' (faixas, como a tabela de faixas de CEP por localidade),
+mais 'cidade' (ou 'localidade') e 'uf'. O índice tem registros de
+tamanho fixo ordenados pelo início da faixa; a consulta abre o arquivo
+com mmap na primeira busca e faz busca binária sobre ele, sem carregar a
+base na memória.
+"""
+import mmap
+import os
+import struct
+
+from validacao import apenas_digitos
+
+ARQUIVO_INDICE_CEP = 'ceps.idx'
+
+# Cabeçalho: identificação e quantidade de registros
+_CABECALHO = struct.Struct('>4sI')
+_MARCA = b'CEP1'
+
+# Bytes (UTF-8) guardados do nome da cidade
+TAMANHO_CIDADE = 40
+
+# Registro: CEP inicial, CEP final, UF e cidade
+_REGISTRO = struct.Struct(f'>II2s{TAMANHO_CIDADE}s')
+_INICIO = struct.Struct('>I')
+
+
+def _cidade_fixa(cidade):
+    """Nome em UTF-8 cortado em TAMANHO_CIDADE bytes sem partir um caractere"""
+    dados = cidade.encode('utf-8')[:TAMANHO_CIDADE]
+    return dados.decode('utf-8', 'ignore').encode('utf-8')
+
+
+def _faixa(registro):
+    """(início, fim, uf, cidade) de uma linha da base, ou None se estiver incompleta"""
+    inicio = apenas_digitos(registro.get('cep_inicial') or registro.get('cep') or '')
+    fim = apenas_digitos(registro.get('cep_final') or '') or inicio
+    cidade = (registro.get('cidade') or registro.get('localidade') or '').strip()
+    uf = (registro.get('uf') or '').strip().upper()
+    if len(inicio) != 8 or len(fim) != 8 or not cidade or len(uf) != 2:
+        return None
+    return int(inicio), int(fim), uf.encode('ascii', 'replace'), _cidade_fixa(cidade)
+
+
+def construir_indice(origem, destino=ARQUIVO_INDICE_CEP):
+    """Gera o índice binário a partir da base em CSV; retorna (faixas gravadas, linhas ignoradas)"""
+    # Só a geração lê CSV; a consulta (usada pela interface) não importa a importação
+    from importacao import ler_csv
+    faixas = []
+    ignoradas = 0
+    for _, registro in ler_csv(origem):
+        faixa = _faixa(registro)
+        if faixa is None:
+            ignoradas += 1
+        else:
+            faixas.append(faixa)
+    faixas.sort()
+
+    temporario = destino + '.tmp'
+    with open(temporario, 'wb') as f:
+        f.write(_CABECALHO.pack(_MARCA, len(faixas)))
+        for faixa in faixas:
+            f.write(_REGISTRO.pack(*faixa))
+    os.replace(temporario, destino)
+    return len(faixas), ignoradas
+
+
+class IndiceCep:
+    """Busca de cidade e UF por CEP; o arquivo só é aberto na primeira consulta
+
+    Sem o arquivo do índice, buscar() sempre devolve None.
+    """
+
+    def __init__(self, caminho=ARQUIVO_INDICE_CEP):
+        self.caminho = caminho
+        self._mapa = None
+        self._quantidade = 0
+        self._aberto = False
+
+    def _abrir(self):
+        self._aberto = True
+        try:
+            with open(self.caminho, 'rb') as f:
+                mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Arquivo inexistente ou vazio: consulta desativada
+            return
+        if len(mapa) < _CABECALHO.size:
+            # Truncado antes do fim do cabeçalho
+            mapa.close()
+            return
+        marca, quantidade = _CABECALHO.unpack_from(mapa)
+        if marca != _MARCA or len(mapa) < _CABECALHO.size + quantidade * _REGISTRO.size:
+            mapa.close()
+            return
+        self._mapa = mapa
+        self._quantidade = quantidade
+
+    @property
+    def disponivel(self):
+        """True se o índice existe e é válido"""
+        if not self._aberto:
+            self._abrir()
+        return self._mapa is not None
+
+    def buscar(self, cep):
+        """(cidade, uf) do CEP, ou None se não estiver na base"""
+        digitos = apenas_digitos(cep)
+        if len(digitos) != 8 or not self.disponivel:
+            return None
+        numero = int(digitos)
+        mapa = self._mapa
+        tamanho = _REGISTRO.size
+        base = _CABECALHO.size
+
+        # Última faixa que começa até o CEP procurado
+        baixo, alto = 0, self._quantidade
+        while baixo < alto:
+            meio = (baixo + alto) // 2
+            if _INICIO.unpack_from(mapa, base + meio * tamanho)[0] <= numero:
+                baixo = meio + 1
+            else:
+                alto = meio
+        if not baixo:
+            return None
+        _, fim, uf, cidade = _REGISTRO.unpack_from(mapa, base + (baixo - 1) * tamanho)
+        if numero > fim:
+            return None
+        return cidade.rstrip(b'\0').decode('utf-8'), uf.decode('ascii')
+
+    def fechar(self):
+        """Libera o mapeamento do arquivo"""
+        if self._mapa is not None:
+            self._mapa.close()
+            self._mapa = None
+        self._aberto = False
+
+
+if __name__ == "__main__":
+    # A interface importa este módulo; o argparse fica só na linha de comando
+    import argparse
+    parser = argparse.ArgumentParser(description="Gera o índice local de CEPs a partir de um CSV")
+    parser.add_argument('base', help="CSV com cep (ou cep_inicial e cep_final), cidade e uf")
+    parser.add_argument('--saida', default=ARQUIVO_INDICE_CEP)
+    args = parser.parse_args()
+
+    gravadas, ignoradas = construir_indice(args.base, args.saida)
+    print(f"{gravadas} faixas de CEP gravadas em {args.saida}")
+    if ignoradas:
+        print(f"{ignoradas} linhas ignoradas (CEP, cidade ou UF ausentes)")
@@ -0,0 +1,133 @@
+"""Índice por data de cadastro e de alteração, para consultas de período (auditoria)"""
+from bisect import bisect_left
+from operator import attrgetter
+
+from indices import Indice
+from modelo import para_epoca
+from ordenacao import intercalar, retirar
+
+_SEGUNDOS_DIA = 86400
+
+
+def _alteracao(usuario):
+    return usuario.cadastro if usuario.atualizacao is None else usuario.atualizacao
+
+
+# Data de cada ordem: a do cadastro e a da última alteração (atualização ou, sem ela, cadastro)
+_DATAS = {'cadastro': attrgetter('cadastro'), 'alteracao': _alteracao}
+CAMPOS_PERIODO = tuple(_DATAS)
+
+
+def epoca_data(texto, fim=False):
+    """'dd/mm/aaaa' ou 'dd/mm/aaaa hh:mm:ss' -> segundos (como modelo.para_epoca)
+
+    Com fim=True o valor é o limite exclusivo que inclui a data: o dia
+    seguinte, ou o segundo seguinte se houver horário. Levanta ValueError
+    se a data for inválida.
+    """
+    texto = texto.strip()
+    dia = len(texto) == 10
+    epoca = para_epoca(texto + ' 00:00:00' if dia else texto)
+    if epoca.__class__ is not int:
+        raise ValueError(f"Data inválida: {texto} (use dd/mm/aaaa)")
+    if fim:
+        epoca += _SEGUNDOS_DIA if dia else 1
+    return epoca
+
+
+def _itens(campo, usuarios):
+    """Itens (segundos, chave, usuario) dos usuários com a data do campo em segundos"""
+    data = _DATAS[campo]
+    itens = [(data(usuario), usuario.id, usuario) for usuario in usuarios]
+    return [item for item in itens if item[0].__class__ is int]
+
+
+class Periodo:
+    """Fatia somente leitura de uma ordem por data (os usuários entre dois instantes), sem cópia"""
+
+    def __init__(self, itens, inicio, fim):
+        self.itens = itens
+        self.inicio = inicio
+        self.fim = fim
+
+    def __len__(self):
+        return self.fim - self.inicio
+
+    def __iter__(self):
+        for posicao in range(self.inicio, self.fim):
+            yield self.itens[posicao][2]
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            inicio, fim, passo = indice.indices(len(self))
+            return [item[2] for item in
+                    self.itens[self.inicio + inicio:self.inicio + fim:passo]]
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError(indice)
+        return self.itens[self.inicio + indice][2]
+
+
+class IndiceTempo(Indice):
+    """Usuários ordenados pela data de cadastro e pela da última alteração
+
+    Como no IndiceOrdenacao, cada ordem só é montada (uma vez, com sorted)
+    na primeira consulta e a partir daí é mantida com busca binária a cada
+    inclusão, edição ou exclusão (lotes grandes são intercalados). Os itens são
+    tuplas (segundos, chave estável, usuario), então um período é
+    localizado em O(log n). Registros sem a data, ou com data fora do
+    formato, não entram na ordem.
+    """
+
+    def __init__(self, obter_usuarios):
+        self.obter_usuarios = obter_usuarios
+        self.reconstruir([])
+
+    def reconstruir(self, usuarios):
+        """Descarta as ordens em cache (montadas de novo na próxima consulta)"""
+        self.cache = {}
+
+    def adicionar(self, usuario):
+        """Insere o usuário nas ordens em cache"""
+        self.adicionar_lote((usuario,))
+
+    def remover(self, usuario):
+        """Retira o usuário das ordens em cache"""
+        self.remover_lote((usuario,))
+
+    def adicionar_lote(self, usuarios):
+        """Intercala vários usuários novos nas ordens em cache"""
+        for campo, itens in self.cache.items():
+            intercalar(itens, _itens(campo, usuarios))
+
+    def remover_lote(self, usuarios):
+        """Retira vários usuários das ordens em cache"""
+        for campo, itens in self.cache.items():
+            retirar(itens, [item[:2] for item in _itens(campo, usuarios)])
+
+    def substituir_lote(self, pares):
+        """Reposiciona vários usuários editados nas ordens em cache"""
+        self.remover_lote([antigo for antigo, _ in pares])
+        self.adicionar_lote([novo for _, novo in pares])
+
+    def ordem(self, campo):
+        """Itens (segundos, chave, usuario) de todos os usuários com a data do campo, em ordem"""
+        itens = self.cache.get(campo)
+        if itens is None:
+            itens = self.cache[campo] = sorted(_itens(campo, self.obter_usuarios()))
+        return itens
+
+    def periodo(self, campo, inicio=None, fim=None):
+        """Usuários com a data do campo ('cadastro' ou 'alteracao') em [inicio, fim), em ordem de data
+
+        Os limites são segundos (epoca_data); None deixa o lado aberto.
+        """
+        itens = self.ordem(campo)
+        primeiro = 0 if inicio is None else bisect_left(itens, (inicio,))
+        ultimo = len(itens) if fim is None else bisect_left(itens, (fim,))
+        return Periodo(itens, primeiro, max(primeiro, ultimo))
+
+    def alterados_desde(self, momento):
+        """Usuários cadastrados ou alterados a partir do instante (segundos), do mais antigo ao mais recente"""
+        return self.periodo('alteracao', momento)
@@ -0,0 +1,95 @@
+"""Índices em memória para busca de usuários por chave, CPF e e-mail"""
+import re
+
+# Padrão pré-compilado para remover a formatação do CPF
+_nao_digitos = re.compile(r'[^0-9]')
+
+
+def normalizar_cpf(cpf):
+    """Remove a formatação do CPF, mantendo apenas os dígitos"""
+    return _nao_digitos.sub('', cpf)
+
+
+def normalizar_email(email):
+    """Normaliza o e-mail para comparação sem diferenciar maiúsculas"""
+    return email.lower()
+
+
+class Indice:
+    """Interface dos índices mantidos em sincronia com a lista de usuários"""
+
+    def reconstruir(self, usuarios):
+        """Reconstrói o índice a partir da lista completa"""
+        raise NotImplementedError
+
+    def adicionar(self, usuario):
+        """Indexa um novo registro"""
+        raise NotImplementedError
+
+    def adicionar_lote(self, usuarios):
+        """Indexa vários registros novos de uma vez"""
+        for usuario in usuarios:
+            self.adicionar(usuario)
+
+    def remover(self, usuario):
+        """Remove um registro do índice"""
+        raise NotImplementedError
+
+    def remover_lote(self, usuarios):
+        """Remove vários registros de uma vez"""
+        for usuario in usuarios:
+            self.remover(usuario)
+
+    def substituir(self, antigo, novo):
+        """Atualiza o índice quando um registro é editado"""
+        self.remover(antigo)
+        self.adicionar(novo)
+
+    def substituir_lote(self, pares):
+        """Atualiza o índice para vários registros editados, em pares (antigo, novo)"""
+        for antigo, novo in pares:
+            self.substituir(antigo, novo)
+
+
+class IndiceUsuarios(Indice):
+    """Mapeia chave estável, CPF normalizado e e-mail em minúsculas para o registro"""
+
+    def __init__(self):
+        self.por_id = {}
+        self.por_cpf = {}
+        self.por_email = {}
+
+    def reconstruir(self, usuarios):
+        """Reconstrói os índices a partir da lista completa (usado no carregamento)"""
+        self.por_id = {}
+        self.por_cpf = {}
+        self.por_email = {}
+        for usuario in usuarios:
+            self.adicionar(usuario)
+
+    def adicionar(self, usuario):
+        """Indexa um novo registro"""
+        self.por_id[usuario['id']] = usuario
+        self.por_cpf[normalizar_cpf(usuario['cpf'])] = usuario
+        self.por_email[normalizar_email(usuario['email'])] = usuario
+
+    def remover(self, usuario):
+        """Remove um registro dos índices"""
+        if self.por_id.get(usuario['id']) is usuario:
+            del self.por_id[usuario['id']]
+        cpf = normalizar_cpf(usuario['cpf'])
+        if self.por_cpf.get(cpf) is usuario:
+            del self.por_cpf[cpf]
+        email = normalizar_email(usuario['email'])
+        if self.por_email.get(email) is usuario:
+            del self.por_email[email]
+
+    def cpf_em_uso(self, cpf, ignorar=None):
+        """Verifica se o CPF já pertence a outro registro"""
+        usuario = self.por_cpf.get(normalizar_cpf(cpf))
+        return usuario is not None and usuario is not ignorar
+
+    def email_em_uso(self, email, ignorar=None):
+        """Verifica se o e-mail já pertence a outro registro"""
+        usuario = self.por_email.get(normalizar_email(email))
+        return usuario is not None and usuario is not ignorar
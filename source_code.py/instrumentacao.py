@@ -0,0 +1,214 @@
+"""Medições de desempenho baratas: histogramas de latência, contadores e perfil opcional
+
+As funções decoradas com cronometrar (callbacks da interface, na thread
+principal) têm cada duração registrada em um histograma; contar() soma
+quantidades como os bytes lidos e gravados. O painel de depuração
+(painel_desempenho.py) mostra o resumo. Com a variável de ambiente
+CADASTRO_PERFIL=arquivo.prof a sessão inteira é gravada pelo cProfile.
+"""
+import json
+import os
+import threading
+from functools import wraps
+from time import perf_counter
+
+# Variável de ambiente com o arquivo do perfil (cProfile) da sessão
+VARIAVEL_PERFIL = 'CADASTRO_PERFIL'
+
+# Faixas do histograma: 8 exatas (0 a 7 µs) e 4 por potência de 2 acima disso
+SUBFAIXAS = 4
+FAIXAS = 8 + 40 * SUBFAIXAS
+
+# Nomes dos contadores de E/S de arquivo
+LIDOS = 'io.bytes_lidos'
+GRAVADOS = 'io.bytes_gravados'
+
+
+def _faixa(micro):
+    if micro < 8:
+        return micro
+    bits = micro.bit_length()
+    return min(8 + (bits - 4) * SUBFAIXAS + ((micro >> (bits - 3)) & 3), FAIXAS - 1)
+
+
+def _limite(faixa):
+    """Maior duração (µs) que cai na faixa"""
+    if faixa < 8:
+        return faixa
+    potencia, sub = divmod(faixa - 8, SUBFAIXAS)
+    return ((5 + sub) << (potencia + 1)) - 1
+
+
+class Histograma:
+    """Durações em faixas logarítmicas: registrar é O(1) e a memória é fixa
+
+    Os percentis são estimados pelo limite da faixa (erro máximo de 25%).
+    """
+
+    __slots__ = ('faixas', 'quantidade', 'total', 'maximo')
+
+    def __init__(self):
+        self.faixas = [0] * FAIXAS
+        self.quantidade = 0
+        self.total = 0.0
+        self.maximo = 0.0
+
+    def registrar(self, segundos):
+        """Acrescenta uma duração em segundos"""
+        self.faixas[_faixa(int(segundos * 1_000_000))] += 1
+        self.quantidade += 1
+        self.total += segundos
+        if segundos > self.maximo:
+            self.maximo = segundos
+
+    def percentil(self, p):
+        """Duração (s) abaixo da qual estão p% das medições"""
+        if not self.quantidade:
+            return 0.0
+        alvo = self.quantidade * p / 100
+        acumulado = 0
+        for faixa, contagem in enumerate(self.faixas):
+            acumulado += contagem
+            if contagem and acumulado >= alvo:
+                return min(_limite(faixa) / 1_000_000, self.maximo)
+        return self.maximo
+
+
+class Metricas:
+    """Histogramas por nome de medição e contadores acumulados"""
+
+    def __init__(self):
+        self.histogramas = {}
+        self.contadores = {}
+        self._trava = threading.Lock()
+
+    def histograma(self, nome):
+        """Histograma da medição (criado na primeira vez)"""
+        histograma = self.histogramas.get(nome)
+        if histograma is None:
+            histograma = self.histogramas.setdefault(nome, Histograma())
+        return histograma
+
+    def registrar(self, nome, segundos):
+        """Registra uma duração na medição 'nome'"""
+        self.histograma(nome).registrar(segundos)
+
+    def contar(self, nome, quantidade=1):
+        """Soma ao contador (pode ser chamado de qualquer thread)"""
+        with self._trava:
+            self.contadores[nome] = self.contadores.get(nome, 0) + quantidade
+
+    def resumo(self):
+        """Medições (chamadas, p50, p99, máximo e média em ms) e contadores"""
+        medicoes = {}
+        for nome, histograma in sorted(self.histogramas.items()):
+            if not histograma.quantidade:
+                continue
+            medicoes[nome] = {
+                'chamadas': histograma.quantidade,
+                'p50_ms': round(histograma.percentil(50) * 1000, 3),
+                'p99_ms': round(histograma.percentil(99) * 1000, 3),
+                'max_ms': round(histograma.maximo * 1000, 3),
+                'media_ms': round(histograma.total * 1000 / histograma.quantidade, 3),
+            }
+        with self._trava:
+            contadores = dict(self.contadores)
+        return {'medicoes': medicoes, 'contadores': contadores}
+
+
+# Métricas do processo, usadas pela interface e pela persistência
+metricas = Metricas()
+
+# Medições em andamento na thread principal: [início, tempo descontado]
+_ativas = []
+
+
+def cronometrar(funcao):
+    """Decorador: registra a duração de cada chamada no histograma com o nome da função"""
+    histograma = metricas.histograma(funcao.__name__)
+
+    @wraps(funcao)
+    def cronometrada(*args, **kwargs):
+        quadro = [perf_counter(), 0.0]
+        _ativas.append(quadro)
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            _ativas.pop()
+            histograma.registrar(perf_counter() - quadro[0] - quadro[1])
+    return cronometrada
+
+
+def descontado(funcao):
+    """Envolve uma função que espera o usuário: seu tempo sai das medições em andamento"""
+    @wraps(funcao)
+    def envolvida(*args, **kwargs):
+        inicio = perf_counter()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            espera = perf_counter() - inicio
+            for quadro in _ativas:
+                quadro[1] += espera
+    return envolvida
+
+
+class Dialogos:
+    """Acesso a um módulo de diálogos (messagebox, filedialog) com as funções descontadas
+
+    Sem isso, um callback que mostra uma mensagem mediria o tempo até o
+    usuário clicar em OK.
+    """
+
+    def __init__(self, modulo):
+        self._modulo = modulo
+
+    def __getattr__(self, nome):
+        funcao = descontado(getattr(self._modulo, nome))
+        setattr(self, nome, funcao)
+        return funcao
+
+
+class MonitorLaco:
+    """Mede o atraso do laço de eventos do Tk (medição 'tk.atraso')
+
+    Um after() é agendado a cada 'intervalo' ms; a diferença entre a hora
+    em que ele deveria rodar e a hora em que rodou é o tempo em que a
+    interface ficou sem responder.
+    """
+
+    def __init__(self, root, intervalo=100):
+        self.root = root
+        self.intervalo = intervalo
+        self.histograma = metricas.histograma('tk.atraso')
+        self._esperado = perf_counter() + intervalo / 1000
+        root.after(intervalo, self._verificar)
+
+    def _verificar(self):
+        agora = perf_counter()
+        self.histograma.registrar(max(0.0, agora - self._esperado))
+        self._esperado = agora + self.intervalo / 1000
+        self.root.after(self.intervalo, self._verificar)
+
+
+def iniciar_perfil():
+    """Liga o cProfile se CADASTRO_PERFIL indicar um arquivo; retorna (perfil, caminho) ou None"""
+    caminho = os.environ.get(VARIAVEL_PERFIL)
+    if not caminho:
+        return None
+    # Importado só quando o perfil é pedido
+    import cProfile
+    perfil = cProfile.Profile()
+    perfil.enable()
+    return perfil, caminho
+
+
+def encerrar_perfil(sessao):
+    """Grava o perfil (para pstats/snakeviz) e, ao lado, o resumo das métricas em JSON"""
+    if sessao is None:
+        return
+    perfil, caminho = sessao
+    perfil.disable()
+    perfil.dump_stats(caminho)
+    with open(caminho + '.json', 'w', encoding='utf-8') as f:
+        json.dump(metricas.resumo(), f, ensure_ascii=False, indent=2)
@@ -0,0 +1,191 @@
+"""Treeview virtualizada: mantém itens do Tk apenas para as linhas visíveis"""
+from bisect import bisect_left
+
+# Linhas extras renderizadas abaixo da área visível
+BUFFER = 5
+
+# Altura aproximada do cabeçalho da Treeview, em pixels
+ALTURA_CABECALHO = 32
+
+
+class ListaVirtual:
+    """Exibe uma fatia de uma lista grande mantendo no Tk só as linhas da janela
+
+    A barra de rolagem não controla a Treeview diretamente: a posição da
+    rolagem é convertida em um deslocamento na lista de dados e apenas as
+    linhas da janela [inicio, inicio + visiveis + BUFFER) existem no Tk.
+    O ID de cada item da Treeview é a chave estável ('id') do registro.
+    """
+
+    def __init__(self, tree, scrollbar, formatar, altura_linha=30, buffer=BUFFER):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.formatar = formatar
+        self.altura_linha = altura_linha
+        self.buffer = buffer
+        self.dados = []
+        self.inicio = 0
+        self.visiveis = int(tree.cget('height'))
+        self.selecionados = set()
+        self._correcao_agendada = False
+
+        scrollbar.configure(command=self.rolar)
+        tree.configure(yscrollcommand=self._rolagem_interna)
+        tree.bind('<Configure>', self._redimensionar)
+        tree.bind('<MouseWheel>', self._roda_mouse)
+        tree.bind('<Button-4>', lambda e: self.rolar('scroll', -3, 'units') or 'break')
+        tree.bind('<Button-5>', lambda e: self.rolar('scroll', 3, 'units') or 'break')
+        tree.bind('<<TreeviewSelect>>', self._selecao_alterada)
+        tree.bind('<Control-a>', lambda e: self.selecionar_todos() or 'break')
+
+    def definir_dados(self, dados):
+        """Define a lista exibida e redesenha apenas a janela visível (limpa a seleção)"""
+        self.dados = dados
+        self.selecionados = set()
+        self._renderizar()
+
+    def chave_selecionada(self):
+        """Retorna a chave do registro selecionado, ou None"""
+        selecao = self.tree.selection()
+        if selecao:
+            return selecao[0]
+        # A linha selecionada pode ter saído da janela pela rolagem
+        return next(iter(self.selecionados), None)
+
+    def chaves_selecionadas(self):
+        """Chaves de todos os registros selecionados, inclusive os fora da janela"""
+        return list(self.selecionados | set(self.tree.selection()))
+
+    def selecionar_todos(self):
+        """Seleciona todos os registros da visão atual (não só os da janela)"""
+        self.selecionados = {registro['id'] for registro in self.dados}
+        self._renderizar()
+
+    def acrescentados(self):
+        """Registros acrescentados em lote ao final: redesenha só se a janela não estiver cheia"""
+        if len(self.tree.get_children()) < self.visiveis + self.buffer:
+            self._renderizar()
+        else:
+            self._atualizar_barra()
+
+    def inserido(self, registro):
+        """Registro acrescentado ao final dos dados: cria o item só se cair na janela"""
+        posicao = len(self.dados) - 1
+        if posicao < self.inicio + self.visiveis + self.buffer:
+            self.tree.insert('', posicao - self.inicio, iid=registro['id'],
+                             values=self.formatar(registro))
+        self._atualizar_barra()
+
+    def atualizado(self, registro):
+        """Registro alterado no lugar: atualiza apenas o item correspondente, se visível"""
+        if self.tree.exists(registro['id']):
+            self.tree.item(registro['id'], values=self.formatar(registro))
+
+    def removido(self, registro, posicao):
+        """Registro retirado da posição informada dos dados"""
+        self.selecionados.discard(registro['id'])
+        if posicao < self.inicio:
+            # As linhas da janela continuam as mesmas, apenas deslocadas
+            self.inicio -= 1
+            self._atualizar_barra()
+        elif self.tree.exists(registro['id']):
+            self.tree.delete(registro['id'])
+            self._renderizar()
+        else:
+            self._atualizar_barra()
+
+    def removidos_em_lote(self, chaves, posicoes):
+        """Vários registros retirados dos dados (posições antigas, em ordem): redesenha uma vez"""
+        self.selecionados.difference_update(chaves)
+        self.inicio -= bisect_left(posicoes, self.inicio)
+        self._renderizar()
+
+    def redesenhar(self):
+        """Registros trocados no lugar (edição em lote): atualiza só as linhas da janela"""
+        self._renderizar()
+
+    def rolar(self, *args):
+        """Comando da barra de rolagem ('moveto' ou 'scroll')"""
+        if args[0] == 'moveto':
+            novo = int(float(args[1]) * len(self.dados))
+        else:
+            passo = int(args[1])
+            if args[2] == 'pages':
+                passo *= self.visiveis
+            novo = self.inicio + passo
+        self._ir_para(novo)
+
+    def _ir_para(self, inicio):
+        maximo = max(0, len(self.dados) - self.visiveis)
+        inicio = min(max(0, inicio), maximo)
+        if inicio != self.inicio:
+            self.inicio = inicio
+            self._renderizar()
+
+    def _renderizar(self):
+        """Sincroniza os itens da Treeview com a fatia atual (diferença por chave)"""
+        total = len(self.dados)
+        self.inicio = min(self.inicio, max(0, total - self.visiveis))
+        fatia = self.dados[self.inicio:self.inicio + self.visiveis + self.buffer]
+        chaves = [registro['id'] for registro in fatia]
+
+        # Remove somente os itens que saíram da janela
+        na_janela = set(chaves)
+        atuais = self.tree.get_children()
+        sairam = [chave for chave in atuais if chave not in na_janela]
+        if sairam:
+            self.tree.delete(*sairam)
+        presentes = set(atuais).difference(sairam)
+
+        for posicao, (chave, registro) in enumerate(zip(chaves, fatia)):
+            if chave in presentes:
+                self.tree.move(chave, '', posicao)
+                self.tree.item(chave, values=self.formatar(registro))
+            else:
+                self.tree.insert('', posicao, iid=chave, values=self.formatar(registro))
+
+        # Reaplica a seleção das linhas que voltaram para a janela
+        selecao = [chave for chave in chaves if chave in self.selecionados]
+        self.tree.selection_set(selecao)
+        if selecao:
+            self.tree.focus(selecao[0])
+
+        self.tree.yview_moveto(0)
+        self._atualizar_barra()
+
+    def _atualizar_barra(self):
+        total = len(self.dados)
+        if total:
+            self.scrollbar.set(self.inicio / total,
+                               min(1.0, (self.inicio + self.visiveis) / total))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _selecao_alterada(self, event):
+        na_janela = set(self.tree.get_children())
+        self.selecionados = (self.selecionados - na_janela) | set(self.tree.selection())
+
+    def _redimensionar(self, event):
+        visiveis = max(1, (event.height - ALTURA_CABECALHO) // self.altura_linha)
+        if visiveis != self.visiveis:
+            self.visiveis = visiveis
+            self._renderizar()
+
+    def _roda_mouse(self, event):
+        # delta positivo rola para cima (Windows usa múltiplos de 120, macOS valores menores)
+        self.rolar('scroll', -3 if event.delta > 0 else 3, 'units')
+        return 'break'
+
+    def _rolagem_interna(self, primeiro, ultimo):
+        # A navegação pelo teclado pode rolar a Treeview para dentro do buffer;
+        # o deslocamento é convertido em mudança de janela
+        if float(primeiro) > 0 and not self._correcao_agendada:
+            self._correcao_agendada = True
+            self.tree.after_idle(self._corrigir_rolagem)
+
+    def _corrigir_rolagem(self):
+        self._correcao_agendada = False
+        primeiro = self.tree.yview()[0]
+        deslocamento = round(primeiro * len(self.tree.get_children()))
+        self.tree.yview_moveto(0)
+        self._ir_para(self.inicio + deslocamento)
@@ -0,0 +1,125 @@
+"""Máscaras de digitação (CPF, CEP, idade, data) para os campos Entry do formulário
+
+A formatação não roda a cada tecla solta: o validatecommand do Tk recusa
+as teclas que não cabem na máscara, e um trace na StringVar do campo só
+reescreve o texto quando ele não está no formato da máscara, trocando
+apenas os caracteres diferentes e mantendo o cursor no lugar.
+"""
+import re
+import tkinter as tk
+
+from instrumentacao import cronometrar
+
+DIGITOS = frozenset('0123456789')
+
+
+class Mascara:
+    """Máscara pré-compilada: '0' é a posição de um dígito, o resto são literais
+
+    O formato canônico de um valor parcial só mostra um literal quando há
+    dígito depois dele ('123.4', nunca '123.').
+    """
+
+    def __init__(self, padrao):
+        self.padrao = padrao
+        # Posição de cada dígito no texto formatado
+        self.posicoes = [i for i, c in enumerate(padrao) if c == '0']
+        self.tamanho = len(self.posicoes)
+        self.literais = frozenset(c for c in padrao if c != '0')
+
+        # Regex do formato canônico para qualquer quantidade de dígitos
+        grupos = [len(g) for g in re.findall('0+', padrao)]
+        separadores = [re.escape(s) for s in re.findall('[^0]+', padrao.strip('0'))]
+        alternativas = [f'[0-9]{{0,{grupos[0]}}}']
+        prefixo = f'[0-9]{{{grupos[0]}}}'
+        for separador, grupo in zip(separadores, grupos[1:]):
+            alternativas.append(f'{prefixo}{separador}[0-9]{{1,{grupo}}}')
+            prefixo += f'{separador}[0-9]{{{grupo}}}'
+        self._canonico = re.compile('|'.join(alternativas))
+
+    def canonico(self, texto):
+        """True se o texto já está no formato da máscara (sem criar strings)"""
+        return self._canonico.fullmatch(texto) is not None
+
+    def formatar(self, digitos):
+        """Aplica a máscara a uma sequência de até 'tamanho' dígitos"""
+        if not digitos:
+            return ''
+        fim = self.posicoes[len(digitos) - 1] + 1
+        partes = []
+        proximo = 0
+        for c in self.padrao[:fim]:
+            if c == '0':
+                partes.append(digitos[proximo])
+                proximo += 1
+            else:
+                partes.append(c)
+        return ''.join(partes)
+
+    def cursor(self, digitos_antes):
+        """Posição do cursor no texto formatado depois de 'digitos_antes' dígitos"""
+        if digitos_antes <= 0:
+            return 0
+        return self.posicoes[min(digitos_antes, self.tamanho) - 1] + 1
+
+
+MASCARA_CPF = Mascara('000.000.000-00')
+MASCARA_CEP = Mascara('00000-000')
+MASCARA_IDADE = Mascara('000')
+MASCARA_DATA = Mascara('00/00/0000')
+
+
+class CampoMascarado:
+    """Liga uma Mascara a um Entry (validatecommand + trace da StringVar)
+
+    O texto igual ao 'placeholder' é deixado como está.
+    """
+
+    def __init__(self, entry, mascara, placeholder=None):
+        self.entry = entry
+        self.mascara = mascara
+        self.placeholder = placeholder
+        self._editando = False
+        self.variavel = tk.StringVar(entry, value=entry.get())
+        entry.config(textvariable=self.variavel, validate='key',
+                     validatecommand=(entry.register(self.validar), '%d', '%S', '%P'))
+        self.variavel.trace_add('write', self.formatar_mascara)
+
+    def validar(self, acao, inserido, proposto):
+        """Recusa inserções sem nenhum dígito ou que passariam do tamanho da máscara"""
+        if self._editando or acao != '1':
+            return True
+        if DIGITOS.isdisjoint(inserido):
+            return False
+        return sum(c in DIGITOS for c in proposto) <= self.mascara.tamanho
+
+    @cronometrar
+    def formatar_mascara(self, *args):
+        """Reescreve só os caracteres que diferem do formato canônico"""
+        if self._editando:
+            return
+        texto = self.variavel.get()
+        if texto == self.placeholder or self.mascara.canonico(texto):
+            return
+
+        entry = self.entry
+        cursor = entry.index('insert')
+        digitos_antes = sum(c in DIGITOS for c in texto[:cursor])
+        novo = self.mascara.formatar(''.join(c for c in texto if c in DIGITOS)[:self.mascara.tamanho])
+
+        # Prefixo e sufixo comuns ficam intactos no widget
+        inicio = 0
+        limite = min(len(texto), len(novo))
+        while inicio < limite and texto[inicio] == novo[inicio]:
+            inicio += 1
+        fim = 0
+        while fim < limite - inicio and texto[-1 - fim] == novo[-1 - fim]:
+            fim += 1
+
+        self._editando = True
+        try:
+            entry.delete(inicio, len(texto) - fim)
+            entry.insert(inicio, novo[inicio:len(novo) - fim])
+        finally:
+            self._editando = False
+        entry.icursor(self.mascara.cursor(digitos_antes))
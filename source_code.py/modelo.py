@@ -0,0 +1,220 @@
+"""Registro compacto de usuário e conversão de/para o esquema JSON do cadastro"""
+import re
+from collections.abc import Mapping
+from datetime import date, datetime
+from functools import lru_cache
+from operator import attrgetter
+
+# Campos do esquema JSON, na ordem em que são gravados
+CAMPOS = ('id', 'nome', 'cpf', 'idade', 'email', 'cep',
+          'data_cadastro', 'data_atualizacao', 'versao')
+
+_cpf_formatado = re.compile(r'[0-9]{3}\.[0-9]{3}\.[0-9]{3}-[0-9]{2}')
+_cep_formatado = re.compile(r'[0-9]{5}-[0-9]{3}')
+_data_formatada = re.compile(r'([0-9]{2}/[0-9]{2}/[0-9]{4}) ([0-9]{2}):([0-9]{2}):([0-9]{2})')
+_nao_digitos = re.compile(r'[^0-9]')
+
+_ORDINAL_1970 = date(1970, 1, 1).toordinal()
+
+
+def empacotar_cpf(cpf):
+    """'000.000.000-00' -> inteiro; qualquer outro formato fica como está"""
+    if isinstance(cpf, str) and _cpf_formatado.fullmatch(cpf):
+        return int(cpf[:3] + cpf[4:7] + cpf[8:11] + cpf[12:])
+    return cpf
+
+
+def texto_cpf(cpf):
+    """Inverso de empacotar_cpf"""
+    if cpf.__class__ is not int:
+        return cpf
+    digitos = f'{cpf:011d}'
+    return f'{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}'
+
+
+def empacotar_cep(cep):
+    """'00000-000' -> inteiro; qualquer outro formato fica como está"""
+    if isinstance(cep, str) and _cep_formatado.fullmatch(cep):
+        return int(cep[:5] + cep[6:])
+    return cep
+
+
+def texto_cep(cep):
+    """Inverso de empacotar_cep"""
+    if cep.__class__ is not int:
+        return cep
+    digitos = f'{cep:08d}'
+    return f'{digitos[:5]}-{digitos[5:]}'
+
+
+@lru_cache(maxsize=4096)
+def _dias(data):
+    # Os cadastros se concentram em poucos dias: o cache evita refazer a conversão
+    return date(int(data[6:]), int(data[3:5]), int(data[:2])).toordinal() - _ORDINAL_1970
+
+
+@lru_cache(maxsize=4096)
+def _data(dias):
+    return date.fromordinal(dias + _ORDINAL_1970).strftime('%d/%m/%Y')
+
+
+def para_epoca(texto):
+    """'dd/mm/aaaa hh:mm:ss' -> segundos desde 01/01/1970 no horário local (sem fuso)
+
+    O valor não depende do fuso nem do horário de verão, então volta
+    exatamente ao mesmo texto; datas fora do formato ficam como estão.
+    """
+    if not isinstance(texto, str):
+        return texto
+    partes = _data_formatada.fullmatch(texto)
+    if partes is None:
+        return texto
+    data, horas, minutos, segundos = partes.groups()
+    horas, minutos, segundos = int(horas), int(minutos), int(segundos)
+    if horas > 23 or minutos > 59 or segundos > 59:
+        return texto
+    try:
+        dias = _dias(data)
+    except ValueError:
+        return texto
+    return dias * 86400 + horas * 3600 + minutos * 60 + segundos
+
+
+def epoca_agora():
+    """Instante atual no mesmo formato de para_epoca (segundos no horário local, sem fuso)"""
+    agora = datetime.now()
+    return ((agora.toordinal() - _ORDINAL_1970) * 86400
+            + agora.hour * 3600 + agora.minute * 60 + agora.second)
+
+
+def texto_epoca(segundos):
+    """Inverso de para_epoca"""
+    if segundos.__class__ is not int:
+        return segundos
+    dias, resto = divmod(segundos, 86400)
+    horas, resto = divmod(resto, 3600)
+    minutos, segundos = divmod(resto, 60)
+    return f'{_data(dias)} {horas:02d}:{minutos:02d}:{segundos:02d}'
+
+
+class Usuario(Mapping):
+    """Usuário com os campos empacotados em __slots__, lido como o dicionário do JSON
+
+    CPF e CEP ficam como inteiros e as datas como segundos (para_epoca);
+    usuario['cpf'] continua devolvendo '000.000.000-00'. Como os dicionários
+    de antes, o registro nunca é alterado no lugar: uma edição cria outro.
+    A igualdade é por identidade (list.index continua rápido); para
+    comparar o conteúdo use mesmos_dados.
+    """
+
+    __slots__ = ('id', 'nome', 'cpf_numero', 'idade', 'email', 'cep_numero',
+                 'cadastro', 'atualizacao', 'versao')
+
+    def __init__(self, id, nome, cpf, idade, email, cep,
+                 data_cadastro=None, data_atualizacao=None, versao=None):
+        self.id = id
+        self.nome = nome
+        self.cpf_numero = empacotar_cpf(cpf)
+        self.idade = idade
+        self.email = email
+        self.cep_numero = empacotar_cep(cep)
+        self.cadastro = para_epoca(data_cadastro)
+        self.atualizacao = para_epoca(data_atualizacao)
+        self.versao = versao
+
+    @classmethod
+    def de_dict(cls, dados):
+        """Cria o registro a partir de um dicionário no esquema JSON"""
+        return cls(dados['id'], dados['nome'], dados['cpf'], dados['idade'], dados['email'],
+                   dados['cep'], dados.get('data_cadastro'), dados.get('data_atualizacao'),
+                   dados.get('versao'))
+
+    def para_dict(self):
+        """Dicionário no esquema JSON (campos vazios são omitidos)"""
+        dados = {'id': self.id, 'nome': self.nome, 'cpf': texto_cpf(self.cpf_numero),
+                 'idade': self.idade, 'email': self.email, 'cep': texto_cep(self.cep_numero)}
+        if self.cadastro is not None:
+            dados['data_cadastro'] = texto_epoca(self.cadastro)
+        if self.atualizacao is not None:
+            dados['data_atualizacao'] = texto_epoca(self.atualizacao)
+        if self.versao is not None:
+            dados['versao'] = self.versao
+        return dados
+
+    def mesmos_dados(self, outro):
+        """Compara o conteúdo de dois registros"""
+        return all(getattr(self, campo) == getattr(outro, campo) for campo in self.__slots__)
+
+    def numero_cpf(self):
+        """CPF como inteiro, também para os registros antigos com outra formatação"""
+        if self.cpf_numero.__class__ is int:
+            return self.cpf_numero
+        return int(_nao_digitos.sub('', self.cpf_numero) or 0)
+
+    def numero_cep(self):
+        """CEP como inteiro, também para os registros antigos com outra formatação"""
+        if self.cep_numero.__class__ is int:
+            return self.cep_numero
+        return int(_nao_digitos.sub('', self.cep_numero) or 0)
+
+    def __getitem__(self, campo):
+        try:
+            valor = _leitores[campo](self)
+        except KeyError:
+            raise KeyError(campo) from None
+        if valor is None:
+            raise KeyError(campo)
+        return valor
+
+    def __iter__(self):
+        for campo in CAMPOS:
+            if _leitores[campo](self) is not None:
+                yield campo
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f'Usuario({self.para_dict()!r})'
+
+    __eq__ = object.__eq__
+    __ne__ = object.__ne__
+    __hash__ = object.__hash__
+
+
+# Campo do esquema JSON -> função que o lê do registro empacotado
+_leitores = {
+    'id': attrgetter('id'),
+    'nome': attrgetter('nome'),
+    'cpf': lambda usuario: texto_cpf(usuario.cpf_numero),
+    'idade': attrgetter('idade'),
+    'email': attrgetter('email'),
+    'cep': lambda usuario: texto_cep(usuario.cep_numero),
+    'data_cadastro': lambda usuario: texto_epoca(usuario.cadastro),
+    'data_atualizacao': lambda usuario: texto_epoca(usuario.atualizacao),
+    'versao': attrgetter('versao'),
+}
+
+
+def usuarios_empacotados(linhas):
+    """Gera registros a partir de tuplas já empacotadas, na ordem de Usuario.__slots__, sem conversões"""
+    novo = Usuario.__new__
+    for linha in linhas:
+        usuario = novo(Usuario)
+        (usuario.id, usuario.nome, usuario.cpf_numero, usuario.idade, usuario.email,
+         usuario.cep_numero, usuario.cadastro, usuario.atualizacao, usuario.versao) = linha
+        yield usuario
+
+
+def como_usuario(registro):
+    """Usuario a partir de um dicionário do armazenamento (ou o próprio Usuario)"""
+    if isinstance(registro, Usuario):
+        return registro
+    return Usuario.de_dict(registro)
+
+
+def para_json(objeto):
+    """Hook 'default' dos codificadores JSON: grava o Usuario no esquema do arquivo"""
+    if isinstance(objeto, Usuario):
+        return objeto.para_dict()
+    raise TypeError(f"Objeto do tipo {type(objeto).__name__} não é serializável em JSON")
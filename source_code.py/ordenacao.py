@@ -0,0 +1,165 @@
+"""Ordenação da lista por coluna com chaves pré-calculadas e ordens em cache"""
+from bisect import bisect_left, insort
+
+from busca import normalizar_texto
+from indices import Indice
+
+# Colunas da Treeview, na mesma ordem das chaves de ordenação
+COLUNAS = ('Nome', 'CPF', 'Idade', 'E-mail', 'CEP')
+
+# Acima deste tamanho um lote entra nas (ou sai das) ordens em cache de uma
+# vez só, com uma ordenação ou uma filtragem, em vez de item a item
+LIMITE_INSERCAO_ORDENADA = 1000
+
+
+def chaves_ordenacao(usuario):
+    """Chaves de cada coluna de um modelo.Usuario: nome sem acentos, CPF/CEP e idade inteiros"""
+    return (normalizar_texto(usuario.nome),
+            usuario.numero_cpf(),
+            int(usuario.idade),
+            usuario.email.lower(),
+            usuario.numero_cep())
+
+
+def intercalar(itens, novos):
+    """Insere os itens novos na lista ordenada, no lugar
+
+    Os novos são anexados e a lista é reordenada: o sort do Python
+    reconhece a parte já ordenada e só intercala os novos com ela.
+    """
+    if len(novos) <= LIMITE_INSERCAO_ORDENADA:
+        for item in novos:
+            insort(itens, item)
+    else:
+        itens.extend(novos)
+        itens.sort()
+
+
+def retirar(itens, chaves):
+    """Retira da lista ordenada, no lugar, os itens que começam por cada chave (valor, desempate)
+
+    O desempate identifica o item; lotes grandes filtram a lista de uma vez.
+    """
+    if len(chaves) <= LIMITE_INSERCAO_ORDENADA:
+        for chave in chaves:
+            posicao = bisect_left(itens, chave)
+            if posicao < len(itens) and itens[posicao][1] == chave[1]:
+                del itens[posicao]
+    else:
+        desempates = {chave[1] for chave in chaves}
+        itens[:] = [item for item in itens if item[1] not in desempates]
+
+
+class VisaoOrdenada:
+    """Sequência somente leitura sobre uma ordem em cache, crescente ou decrescente"""
+
+    def __init__(self, itens, decrescente=False):
+        self.itens = itens
+        self.decrescente = decrescente
+
+    def __len__(self):
+        return len(self.itens)
+
+    def __getitem__(self, indice):
+        total = len(self.itens)
+        if isinstance(indice, slice):
+            inicio, fim, _ = indice.indices(total)
+            if self.decrescente:
+                fatia = self.itens[total - fim:total - inicio][::-1]
+            else:
+                fatia = self.itens[inicio:fim]
+            return [item[2] for item in fatia]
+        if indice < 0:
+            indice += total
+        if self.decrescente:
+            indice = total - 1 - indice
+        return self.itens[indice][2]
+
+
+class IndiceOrdenacao(Indice):
+    """Mantém as chaves de ordenação de cada usuário e as ordens já calculadas
+
+    A ordem de uma coluna só é calculada (uma vez, com sorted) quando é
+    pedida; a partir daí ela fica em cache como uma lista de tuplas
+    (chave, ordem de cadastro, usuario) e é atualizada com busca binária a
+    cada inserção, edição ou exclusão (lotes grandes: intercalar e retirar).
+    """
+
+    def __init__(self):
+        self.reconstruir([])
+
+    def reconstruir(self, usuarios):
+        """Recalcula as chaves e descarta as ordens em cache
+
+        'chaves' mapeia a chave estável para (ordem de cadastro, chaves, usuario).
+        """
+        self.chaves = {}
+        self.cache = {}
+        self.proxima_ordem = 0
+        self.adicionar_lote(usuarios)
+
+    def adicionar(self, usuario):
+        """Calcula as chaves do novo usuário e o insere nas ordens em cache"""
+        self.adicionar_lote((usuario,))
+
+    def adicionar_lote(self, usuarios):
+        """Calcula as chaves de vários usuários novos e os intercala nas ordens em cache"""
+        inicio = self.proxima_ordem
+        self.proxima_ordem += len(usuarios)
+        self._inserir_lote(zip(usuarios, range(inicio, self.proxima_ordem)))
+
+    def remover(self, usuario):
+        """Retira o usuário das ordens em cache"""
+        self.remover_lote((usuario,))
+
+    def remover_lote(self, usuarios):
+        """Retira vários usuários das ordens em cache"""
+        retirados = []
+        for usuario in usuarios:
+            encontrado = self.chaves.pop(usuario.id, None)
+            if encontrado is not None:
+                retirados.append(encontrado)
+        for coluna, itens in self.cache.items():
+            retirar(itens, [(chaves[coluna], ordem) for ordem, chaves, _ in retirados])
+
+    def substituir(self, antigo, novo):
+        """Reposiciona o usuário editado, mantendo a ordem de cadastro como desempate"""
+        self.substituir_lote(((antigo, novo),))
+
+    def substituir_lote(self, pares):
+        """Reposiciona vários usuários editados, cada um com a ordem de cadastro do antigo"""
+        novos = []
+        for antigo, novo in pares:
+            encontrado = self.chaves.get(antigo.id)
+            if encontrado is None:
+                novos.append((novo, self.proxima_ordem))
+                self.proxima_ordem += 1
+            else:
+                novos.append((novo, encontrado[0]))
+        self.remover_lote([antigo for antigo, _ in pares])
+        self._inserir_lote(novos)
+
+    def ordenados(self, coluna, decrescente=False):
+        """Todos os usuários ordenados pela coluna (índice em COLUNAS)"""
+        itens = self.cache.get(coluna)
+        if itens is None:
+            itens = sorted((chaves[coluna], ordem, usuario)
+                           for ordem, chaves, usuario in self.chaves.values())
+            self.cache[coluna] = itens
+        return VisaoOrdenada(itens, decrescente)
+
+    def ordenar(self, usuarios, coluna, decrescente=False):
+        """Ordena um subconjunto (ex.: resultado de busca) usando as chaves pré-calculadas"""
+        chaves = self.chaves
+
+        def chave(usuario):
+            ordem, valores, _ = chaves[usuario.id]
+            return valores[coluna], ordem
+        return sorted(usuarios, key=chave, reverse=decrescente)
+
+    def _inserir_lote(self, pares):
+        # pares (usuario, ordem de cadastro)
+        novos = [(ordem, chaves_ordenacao(usuario), usuario) for usuario, ordem in pares]
+        self.chaves.update((usuario.id, (ordem, chaves, usuario)) for ordem, chaves, usuario in novos)
+        for coluna, itens in self.cache.items():
+            intercalar(itens, [(chaves[coluna], ordem, usuario) for ordem, chaves, usuario in novos])
@@ -0,0 +1,62 @@
+"""Painel de depuração com as latências das medições, o atraso do Tk e a E/S de arquivos"""
+import tkinter as tk
+from tkinter import ttk
+
+from instrumentacao import metricas, LIDOS, GRAVADOS
+
+# Intervalo (ms) de atualização do painel aberto
+INTERVALO_PAINEL = 1000
+
+COLUNAS_PAINEL = ('Medição', 'Chamadas', 'p50 (ms)', 'p99 (ms)', 'Máx (ms)')
+
+
+def _megabytes(quantidade):
+    return f"{quantidade / (1024 * 1024):.2f} MB"
+
+
+class PainelDesempenho:
+    """Janela oculta, aberta e fechada por uma tecla (F12 na interface)"""
+
+    def __init__(self, root):
+        self.root = root
+        self.janela = None
+        self._agendado = None
+
+    def alternar(self, event=None):
+        """Abre o painel, ou fecha se já estiver aberto"""
+        if self.janela is not None:
+            self.fechar()
+            return
+        self.janela = tk.Toplevel(self.root)
+        self.janela.title("Desempenho")
+        self.janela.geometry("640x420")
+        self.janela.protocol("WM_DELETE_WINDOW", self.fechar)
+
+        self.tree = ttk.Treeview(self.janela, columns=COLUNAS_PAINEL, show='headings')
+        for coluna in COLUNAS_PAINEL:
+            self.tree.heading(coluna, text=coluna)
+            self.tree.column(coluna, width=200 if coluna == 'Medição' else 100,
+                             anchor='w' if coluna == 'Medição' else 'e')
+        self.tree.pack(fill='both', expand=True, padx=10, pady=(10, 5))
+
+        self.io_label = tk.Label(self.janela, anchor='w')
+        self.io_label.pack(fill='x', padx=10, pady=(0, 10))
+        self._atualizar()
+
+    def fechar(self):
+        """Fecha o painel (as medições continuam)"""
+        if self.janela is not None:
+            self.root.after_cancel(self._agendado)
+            self.janela.destroy()
+            self.janela = None
+
+    def _atualizar(self):
+        resumo = metricas.resumo()
+        self.tree.delete(*self.tree.get_children())
+        for nome, medicao in resumo['medicoes'].items():
+            self.tree.insert('', 'end', values=(nome, medicao['chamadas'], medicao['p50_ms'],
+                                                medicao['p99_ms'], medicao['max_ms']))
+        contadores = resumo['contadores']
+        self.io_label.config(text=f"E/S de arquivos: {_megabytes(contadores.get(LIDOS, 0))} lidos, "
+                                  f"{_megabytes(contadores.get(GRAVADOS, 0))} gravados")
+        self._agendado = self.root.after(INTERVALO_PAINEL, self._atualizar)
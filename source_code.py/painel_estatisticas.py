@@ -0,0 +1,98 @@
+"""Painel com as estatísticas do cadastro: faixas etárias, regiões do CEP e cadastros por dia"""
+import tkinter as tk
+from tkinter import ttk
+
+from estatisticas import REGIOES_CEP, SEM_INFORMACAO
+
+# Intervalo (ms) de verificação de mudanças com o painel aberto
+INTERVALO_PAINEL = 500
+
+# Dias de cadastro mais recentes exibidos
+DIAS_PAINEL = 30
+
+
+def _percentual(quantidade, total):
+    return f"{100 * quantidade / total:.1f}%" if total else "-"
+
+
+def _tabela(pai, titulo, colunas):
+    quadro = tk.LabelFrame(pai, text=titulo, padx=5, pady=5)
+    quadro.pack(side='left', fill='both', expand=True, padx=5)
+    tree = ttk.Treeview(quadro, columns=colunas, show='headings')
+    for posicao, coluna in enumerate(colunas):
+        tree.heading(coluna, text=coluna)
+        tree.column(coluna, width=180 if posicao == 0 else 80,
+                    anchor='w' if posicao == 0 else 'e')
+    tree.pack(fill='both', expand=True)
+    return tree
+
+
+class PainelEstatisticas:
+    """Janela com as contagens do IndiceEstatisticas, aberta pelo botão "📊 Estatísticas"
+
+    As contagens já são mantidas a cada alteração; o painel só as lê e
+    redesenha quando elas mudam.
+    """
+
+    def __init__(self, root, estatisticas):
+        self.root = root
+        self.estatisticas = estatisticas
+        self.janela = None
+        self._agendado = None
+        self._exibidas = None
+
+    def alternar(self, event=None):
+        """Abre o painel, ou fecha se já estiver aberto"""
+        if self.janela is not None:
+            self.fechar()
+            return
+        self.janela = tk.Toplevel(self.root)
+        self.janela.title("Estatísticas")
+        self.janela.geometry("960x460")
+        self.janela.protocol("WM_DELETE_WINDOW", self.fechar)
+
+        self.total_label = tk.Label(self.janela, anchor='w', font=('Segoe UI', 12, 'bold'))
+        self.total_label.pack(fill='x', padx=10, pady=(10, 5))
+        quadro = tk.Frame(self.janela)
+        quadro.pack(fill='both', expand=True, padx=5, pady=(0, 10))
+        self.faixas = _tabela(quadro, "Faixa etária", ('Idade', 'Usuários', '%'))
+        self.regioes = _tabela(quadro, "Região do CEP", ('Região', 'Usuários', '%'))
+        self.dias = _tabela(quadro, f"Cadastros por dia (últimos {DIAS_PAINEL})",
+                            ('Dia', 'Cadastros'))
+        self._exibidas = None
+        self._atualizar()
+
+    def fechar(self):
+        """Fecha o painel"""
+        if self.janela is not None:
+            self.root.after_cancel(self._agendado)
+            self.janela.destroy()
+            self.janela = None
+
+    def _atualizar(self):
+        if self.estatisticas.alteracoes != self._exibidas:
+            self._exibidas = self.estatisticas.alteracoes
+            self._desenhar(self.estatisticas.resumo(DIAS_PAINEL))
+        self._agendado = self.root.after(INTERVALO_PAINEL, self._atualizar)
+
+    def _desenhar(self, resumo):
+        total = resumo['total']
+        self.total_label.config(text=f"Total de usuários: {total}")
+
+        self.faixas.delete(*self.faixas.get_children())
+        for faixa, quantidade in resumo['faixas_etarias'].items():
+            self.faixas.insert('', 'end', values=(faixa, quantidade, _percentual(quantidade, total)))
+
+        self.regioes.delete(*self.regioes.get_children())
+        for digito, quantidade in resumo['regioes_cep'].items():
+            nome = f"{digito} - {REGIOES_CEP[int(digito)]}" if digito.isdigit() else digito
+            self.regioes.insert('', 'end', values=(nome, quantidade, _percentual(quantidade, total)))
+
+        # Dia mais recente primeiro; os cadastros sem data no fim
+        self.dias.delete(*self.dias.get_children())
+        por_dia = dict(resumo['cadastros_por_dia'])
+        sem_data = por_dia.pop(SEM_INFORMACAO, None)
+        for dia, quantidade in reversed(por_dia.items()):
+            self.dias.insert('', 'end', values=(dia, quantidade))
+        if sem_data:
+            self.dias.insert('', 'end', values=(SEM_INFORMACAO, sem_data))
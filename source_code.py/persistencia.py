@@ -0,0 +1,852 @@
+"""Persistência dos usuários: snapshot (JSON ou binário) e diário (journal) de operações"""
+import io
+import json
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from itertools import chain
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: travas de byte do msvcrt
+    fcntl = None
+    import msvcrt
+
+from indices import normalizar_cpf, normalizar_email
+from instrumentacao import metricas, LIDOS, GRAVADOS
+from modelo import Usuario, para_json
+from snapshot_binario import (EXTENSAO_BINARIA, SnapshotCorrompido, blocos_binario, eh_binario,
+                              gravar_binario, ler_binario)
+
+# Arquivo principal (snapshot) com a lista completa de usuários
+ARQUIVO_DADOS = 'usuarios_cadastrados.json'
+
+# Snapshot no formato binário (armazenamento 'binario')
+ARQUIVO_BINARIO = 'usuarios_cadastrados' + EXTENSAO_BINARIA
+
+# Tamanho do diário (em bytes) a partir do qual ele é compactado no snapshot
+LIMITE_DIARIO = 1024 * 1024
+
+# Quantidade de usuários entregue por página no carregamento incremental
+TAMANHO_PAGINA = 2000
+
+# Tamanho do bloco lido do arquivo pelo leitor incremental de JSON
+TAMANHO_BLOCO = 64 * 1024
+
+# Tempo (em segundos) que a thread de persistência espera para agrupar gravações
+JANELA_AGRUPAMENTO = 0.05
+
+# Operações registradas no diário
+OP_INSERIR = 'ins'
+OP_ATUALIZAR = 'upd'
+OP_REMOVER = 'del'
+
+
+def gerar_id():
+    """Gera uma chave estável para um novo registro"""
+    return uuid.uuid4().hex
+
+
+def id_legado(posicao, usuario):
+    """Chave determinística para registros antigos sem 'id'
+
+    Depende apenas da posição no snapshot e dos dados do registro, então
+    é a mesma a cada carregamento até o snapshot ser regravado com as
+    chaves, e as operações do diário continuam apontando para o registro.
+    """
+    origem = f"{posicao}|{usuario.get('cpf')}|{usuario.get('email')}"
+    return uuid.uuid5(uuid.NAMESPACE_OID, origem).hex
+
+
+def garantir_ids(usuarios):
+    """Atribui chave aos registros antigos que ainda não possuem; retorna True se alterou algum"""
+    alterou = False
+    for posicao, usuario in enumerate(usuarios):
+        if 'id' not in usuario:
+            usuario['id'] = id_legado(posicao, usuario)
+            alterou = True
+    return alterou
+
+
+def paginar(iteravel, tamanho):
+    """Agrupa os itens de um iterável em listas de até 'tamanho' itens"""
+    pagina = []
+    for item in iteravel:
+        pagina.append(item)
+        if len(pagina) >= tamanho:
+            yield pagina
+            pagina = []
+    if pagina:
+        yield pagina
+
+
+def repaginar(paginas, tamanho):
+    """Reagrupa listas de tamanhos quaisquer em listas de 'tamanho' itens (a última pode ser menor)
+
+    Como paginar, mas por fatias: não passa item a item.
+    """
+    pagina = []
+    for proxima in paginas:
+        pagina += proxima
+        while len(pagina) >= tamanho:
+            yield pagina[:tamanho]
+            pagina = pagina[tamanho:]
+    if pagina:
+        yield pagina
+
+
+def gravar_snapshot(caminho, usuarios):
+    """Grava os usuários (qualquer iterável) de forma atômica (arquivo temporário + os.replace)
+
+    Os registros são escritos um a um, no mesmo formato de json.dump com
+    indent=2, sem montar o texto do arquivo inteiro na memória. Caminhos
+    terminados em EXTENSAO_BINARIA são gravados no formato binário.
+    """
+    if caminho.endswith(EXTENSAO_BINARIA):
+        gravar_binario(caminho, usuarios)
+        return
+    temporario = caminho + '.tmp'
+    codificar = json.JSONEncoder(ensure_ascii=False, indent=2, default=para_json).encode
+    with open(temporario, 'w', encoding='utf-8') as f:
+        separador = '[\n  '
+        for usuario in usuarios:
+            f.write(separador + codificar(usuario).replace('\n', '\n  '))
+            separador = ',\n  '
+        f.write('[]' if separador == '[\n  ' else '\n]')
+        f.flush()
+        os.fsync(f.fileno())
+        metricas.contar(GRAVADOS, os.fstat(f.fileno()).st_size)
+    os.replace(temporario, caminho)
+
+
+def ler_snapshot(caminho):
+    """Lê a lista completa do snapshot, JSON ou binário (lista vazia se não existir)"""
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho, 'rb') as f:
+        if eh_binario(f):
+            return list(ler_binario(f))
+        metricas.contar(LIDOS, os.fstat(f.fileno()).st_size)
+        return json.load(f)
+
+
+_espacos = re.compile(r'[\s,]*')
+
+
+def iterar_snapshot(caminho, bloco=TAMANHO_BLOCO):
+    """Lê o snapshot registro a registro, sem decodificá-lo inteiro de uma vez"""
+    if not os.path.exists(caminho):
+        return
+    with open(caminho, 'rb') as f:
+        yield from registros_snapshot(f, bloco)
+
+
+def registros_snapshot(f, bloco=TAMANHO_BLOCO):
+    """Iterador dos registros de um snapshot aberto em modo binário
+
+    O formato é reconhecido pela marca no início: o snapshot binário é
+    lido de uma vez e decodificado por bloco; o JSON é lido em blocos de
+    texto.
+    """
+    if eh_binario(f):
+        return ler_binario(f)
+    return iterar_array(io.TextIOWrapper(f, encoding='utf-8'), bloco)
+
+
+def paginas_snapshot(f, tamanho=TAMANHO_PAGINA, bloco=TAMANHO_BLOCO):
+    """Iterador dos registros de um snapshot aberto em modo binário, em listas
+
+    As listas do snapshot binário são os seus blocos, decodificados de uma
+    vez; as do JSON têm até 'tamanho' registros.
+    """
+    if eh_binario(f):
+        return blocos_binario(f.read())
+    return paginar(iterar_array(io.TextIOWrapper(f, encoding='utf-8'), bloco), tamanho)
+
+
+def _ler_bloco(f, bloco):
+    texto = f.read(bloco)
+    # isascii é O(1): só o texto com acentos precisa ser codificado para contar os bytes
+    metricas.contar(LIDOS, len(texto) if texto.isascii() else len(texto.encode('utf-8')))
+    return texto
+
+
+def iterar_array(f, bloco=TAMANHO_BLOCO):
+    """Lê um array JSON de um arquivo já aberto, registro a registro"""
+    decodificador = json.JSONDecoder()
+    buffer = _ler_bloco(f, bloco).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError("Arquivo de dados inválido: esperado um array JSON")
+    pos = 1
+    while True:
+        pos = _espacos.match(buffer, pos).end()
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        try:
+            if pos == len(buffer):
+                raise ValueError
+            registro, pos = decodificador.raw_decode(buffer, pos)
+        except ValueError:
+            # Registro incompleto no fim do bloco: lê mais e tenta de novo
+            mais = _ler_bloco(f, bloco)
+            if not mais:
+                raise ValueError("Arquivo de dados truncado")
+            buffer = buffer[pos:] + mais
+            pos = 0
+            continue
+        yield registro
+
+
+class ErroConflito(Exception):
+    """Alteração recusada porque outra instância já alterou o mesmo registro
+
+    'operacoes' são as operações (op, usuario) descartadas.
+    """
+
+    def __init__(self, mensagem, operacoes=()):
+        super().__init__(mensagem)
+        self.operacoes = list(operacoes)
+
+
+class TravaArquivo:
+    """Trava exclusiva entre processos sobre um arquivo '.lock' (fcntl, ou msvcrt no Windows)
+
+    É reentrante e também serializa as threads do próprio processo. Usada
+    com 'with'.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._local = threading.RLock()
+        self._arquivo = None
+        self._nivel = 0
+
+    def __enter__(self):
+        self._local.acquire()
+        if self._nivel == 0:
+            arquivo = open(self.caminho, 'a+b')
+            try:
+                if fcntl is not None:
+                    fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX)
+                else:
+                    arquivo.seek(0)
+                    while True:
+                        try:
+                            # LK_LOCK desiste após ~10 s; continua esperando
+                            msvcrt.locking(arquivo.fileno(), msvcrt.LK_LOCK, 1)
+                            break
+                        except OSError:
+                            pass
+            except BaseException:
+                arquivo.close()
+                self._local.release()
+                raise
+            self._arquivo = arquivo
+        self._nivel += 1
+        return self
+
+    def __exit__(self, *excecao):
+        self._nivel -= 1
+        if self._nivel == 0:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self._arquivo.fileno(), fcntl.LOCK_UN)
+                else:
+                    self._arquivo.seek(0)
+                    msvcrt.locking(self._arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+            finally:
+                self._arquivo.close()
+                self._arquivo = None
+        self._local.release()
+
+
+class Armazenamento:
+    """Interface comum dos meios de armazenamento de usuários"""
+
+    # True quando aplicar() precisa da lista completa (e não só das operações)
+    regrava_tudo = False
+
+    def carregar(self):
+        """Retorna a lista de usuários persistida, na ordem de cadastro"""
+        raise NotImplementedError
+
+    def carregar_paginas(self, tamanho=TAMANHO_PAGINA):
+        """Gera os usuários em páginas (listas), na ordem de cadastro"""
+        yield from paginar(self.carregar(), tamanho)
+
+    def iterar(self):
+        """Percorre os usuários um a um, sem montar a lista nem alterar os arquivos"""
+        for pagina in self.carregar_paginas():
+            yield from pagina
+
+    def aplicar(self, operacoes, usuarios):
+        """Persiste uma lista de operações (op, usuario) como uma única gravação
+
+        'usuarios' é a lista completa em memória, usada pelos meios que
+        precisam regravar tudo.
+        """
+        raise NotImplementedError
+
+    def novidades(self):
+        """Alterações gravadas por outras instâncias desde a última chamada
+
+        Retorna uma lista de (chave, registro), com registro None para
+        exclusões, ou None quando é preciso recarregar tudo.
+        """
+        return []
+
+    def fechar(self):
+        """Libera arquivos e conexões abertos"""
+
+
+class ArmazenamentoJSON(Armazenamento):
+    """Modo tradicional: regrava o arquivo JSON inteiro a cada alteração"""
+
+    regrava_tudo = True
+
+    def __init__(self, caminho=ARQUIVO_DADOS):
+        self.caminho = caminho
+        self.trava = TravaArquivo(caminho + '.lock')
+
+    def carregar(self):
+        """Carrega todos os usuários do arquivo"""
+        usuarios = ler_snapshot(self.caminho)
+        garantir_ids(usuarios)
+        return usuarios
+
+    def carregar_paginas(self, tamanho=TAMANHO_PAGINA):
+        """Lê o arquivo de forma incremental, página a página"""
+        yield from paginar(self._com_ids(iterar_snapshot(self.caminho)), tamanho)
+
+    def _com_ids(self, usuarios):
+        for posicao, usuario in enumerate(usuarios):
+            if 'id' not in usuario:
+                usuario['id'] = id_legado(posicao, usuario)
+            yield usuario
+
+    def aplicar(self, operacoes, usuarios):
+        """Persiste as operações regravando a lista completa"""
+        with self.trava:
+            gravar_snapshot(self.caminho, usuarios)
+
+
+def _chaves_unicas(usuario):
+    """CPF e e-mail normalizados, que não podem se repetir entre usuários"""
+    return ('cpf:' + normalizar_cpf(usuario['cpf']),
+            'email:' + normalizar_email(usuario['email']))
+
+
+class ArmazenamentoDiario(Armazenamento):
+    """Modo diário: cada alteração é anexada como uma linha JSON compacta
+
+    Várias instâncias podem usar os mesmos arquivos. Toda gravação é feita
+    sob uma trava de arquivo ('.lock'): antes de anexar, a instância lê o
+    que as outras anexaram desde a sua última leitura e recusa (ErroConflito)
+    as operações sobre registros que mudaram de versão nesse meio tempo ou
+    que repetiriam CPF/e-mail. As outras instâncias acompanham o diário
+    pelo deslocamento já lido (novidades()) e recebem só o que mudou.
+
+    Quando o diário passa de LIMITE_DIARIO ele é compactado: o snapshot é
+    regravado a partir dos arquivos, o diário vira '.anterior' e um novo
+    começa com a geração seguinte no cabeçalho. Quem ficou para trás lê o
+    restante do '.anterior'; quem perdeu mais de uma geração recarrega tudo.
+    """
+
+    def __init__(self, caminho=ARQUIVO_DADOS, limite=LIMITE_DIARIO):
+        self.caminho = caminho
+        self.caminho_diario = caminho + '.journal'
+        self.caminho_anterior = self.caminho_diario + '.anterior'
+        # Diário deixado por versões antigas durante a compactação
+        self.caminho_compactando = self.caminho_diario + '.compactando'
+        self.limite = limite
+        self.trava = TravaArquivo(caminho + '.lock')
+        # Protege o estado abaixo entre a thread de persistência e a interface
+        self._estado = threading.Lock()
+        self._compactacao = None
+        self._reiniciar_estado()
+
+    def _reiniciar_estado(self):
+        self.geracao = 0
+        self._lido = 0
+        self._identidade = None
+        self._adiar_compactacao = 0
+        # Último estado gravado (por qualquer instância) das chaves alteradas desde a carga
+        self._conhecidos = {}
+        self._donos = {}
+        self._novidades = []
+        self._recarregar = False
+
+    def carregar(self):
+        """Carrega o snapshot e reaplica os diários pendentes"""
+        return [usuario for pagina in self.carregar_paginas() for usuario in pagina]
+
+    def carregar_paginas(self, tamanho=TAMANHO_PAGINA):
+        """Lê o snapshot de forma incremental aplicando as operações pendentes dos diários
+
+        Os diários (limitados a LIMITE_DIARIO) são lidos primeiro; cada
+        registro do snapshot é então substituído ou descartado conforme a
+        última operação registrada para a sua chave, e as inserções novas
+        vêm no final. Ao terminar, tudo é consolidado em segundo plano.
+        """
+        with self.trava, self._estado:
+            self._reiniciar_estado()
+            pendentes, precisa_gravar, posicao = self._ler_diarios()
+            self.geracao, self._lido, self._identidade = posicao
+            snapshot = self._abrir_snapshot()
+        legados, falhas = [], []
+        yield from repaginar(self._mesclar(pendentes, legados, snapshot, falhas), tamanho)
+
+        if falhas:
+            # Nada é compactado: a compactação regravaria o snapshot sem os blocos perdidos
+            raise falhas[0]
+        if precisa_gravar or legados:
+            # Grava as chaves novas e esvazia os diários já reaplicados
+            self.compactar()
+
+    def iterar(self):
+        """Percorre snapshot + diários sem guardar a lista e sem disparar a compactação"""
+        with self.trava:
+            pendentes, _, _ = self._ler_diarios()
+            snapshot = self._abrir_snapshot()
+        for pagina in self._mesclar(pendentes, [], snapshot):
+            yield from pagina
+
+    def _abrir_snapshot(self):
+        """Abre o snapshot (None se não existir); aberto sob a trava, é o par dos diários lidos"""
+        if not os.path.exists(self.caminho):
+            return None
+        return open(self.caminho, 'rb')
+
+    def _ler_diarios(self):
+        """Retorna (operações pendentes por chave, se havia alguma, posição no diário atual)
+
+        A posição (geração, deslocamento lido, identidade do arquivo) é o
+        ponto de partida das leituras incrementais.
+        """
+        pendentes = {}
+
+        def anotar(chave, registro):
+            _anotar(pendentes, chave, registro)
+
+        geracao, lido = 0, 0
+        if os.path.exists(self.caminho_compactando):
+            self._ler_diario(self.caminho_compactando, 0, anotar)
+        if os.path.exists(self.caminho_diario):
+            geracao, inicio = self._cabecalho(self.caminho_diario)
+            lido = self._ler_diario(self.caminho_diario, inicio, anotar)
+        elif os.path.exists(self.caminho_anterior):
+            # Queda no meio da troca de diários: o próximo será da geração seguinte
+            geracao = self._cabecalho(self.caminho_anterior)[0] + 1
+        return pendentes, bool(pendentes), (geracao, lido, self._identificar())
+
+    def _mesclar(self, pendentes, legados, snapshot, falhas=None):
+        """Gera os registros do snapshot em listas, com as operações pendentes aplicadas
+
+        Consome 'pendentes' e fecha 'snapshot' (arquivo aberto ou None);
+        registros sem chave recebem uma e são anotados em 'legados'. Só as
+        listas com alguma chave pendente são percorridas registro a registro.
+        Com a lista 'falhas', um snapshot binário corrompido não interrompe
+        a leitura: o erro é anotado nela (os blocos íntegros já foram
+        entregues) e seguem os registros dos diários.
+        """
+        posicao = 0
+        try:
+            paginas = paginas_snapshot(snapshot) if snapshot is not None else ()
+            for pagina in paginas:
+                chaves = list(map(_chave, pagina))
+                if None in chaves:
+                    for i, chave in enumerate(chaves):
+                        if chave is None:
+                            usuario = pagina[i]
+                            usuario['id'] = chaves[i] = id_legado(posicao + i, usuario)
+                            legados.append(usuario['id'])
+                posicao += len(pagina)
+                if not pendentes.keys().isdisjoint(chaves):
+                    pagina = [usuario for usuario in map(pendentes.pop, chaves, pagina)
+                              if usuario is not None]
+                yield pagina
+        except SnapshotCorrompido as erro:
+            if falhas is None:
+                raise
+            falhas.append(erro)
+        finally:
+            if snapshot is not None:
+                snapshot.close()
+        restantes = [usuario for usuario in pendentes.values() if usuario is not None]
+        if restantes:
+            yield restantes
+
+    def _cabecalho(self, caminho):
+        """Retorna (geração, tamanho do cabeçalho) de um diário; sem cabeçalho é a geração 0"""
+        with open(caminho, 'rb') as f:
+            linha = f.readline()
+        try:
+            registro = json.loads(linha)
+        except ValueError:
+            return 0, 0
+        if 'geracao' in registro:
+            return registro['geracao'], len(linha)
+        return 0, 0
+
+    def _ler_diario(self, caminho, inicio, receber):
+        """Entrega (chave, registro) de cada operação a partir de 'inicio'; retorna até onde leu
+
+        Só linhas completas são consumidas: uma última linha sem '\\n' é de
+        uma escrita em andamento ou interrompida por queda.
+        """
+        partida = inicio
+        with open(caminho, 'rb') as f:
+            f.seek(inicio)
+            for linha in f:
+                if not linha.endswith(b'\n'):
+                    break
+                try:
+                    registro = json.loads(linha)
+                except ValueError:
+                    # Linha corrompida: o restante é descartado
+                    break
+                inicio += len(linha)
+                if 'op' in registro:
+                    receber(registro['id'], registro.get('dados'))
+        metricas.contar(LIDOS, inicio - partida)
+        return inicio
+
+    def _identificar(self):
+        """Identidade do diário atual (arquivo e tamanho), para detectar mudanças sem lê-lo"""
+        try:
+            info = os.stat(self.caminho_diario)
+        except FileNotFoundError:
+            return None
+        return info.st_ino, info.st_size
+
+    def _sincronizar(self):
+        """Lê o que outras instâncias anexaram desde a última leitura (com self._estado)"""
+        identidade = self._identificar()
+        if identidade is None or identidade == self._identidade:
+            return
+        geracao, inicio = self._cabecalho(self.caminho_diario)
+        if geracao == self.geracao + 1 and os.path.exists(self.caminho_anterior) \
+                and self._cabecalho(self.caminho_anterior)[0] == self.geracao:
+            # Outra instância compactou: termina de ler o diário da geração anterior
+            self._ler_diario(self.caminho_anterior, self._lido, self._registrar_externa)
+            self.geracao, self._lido = geracao, inicio
+        elif geracao != self.geracao:
+            # Ficou mais de uma geração para trás: o diário atual é lido (até onde
+            # estiver íntegro, para _anexar nunca cortar linhas de outras instâncias),
+            # mas só uma recarga completa traz o estado certo
+            self.geracao = geracao
+            self._lido = self._ler_diario(self.caminho_diario, inicio, _ignorar)
+            self._conhecidos, self._donos = {}, {}
+            self._recarregar = True
+            self._identidade = identidade
+            return
+        self._lido = self._ler_diario(self.caminho_diario, self._lido, self._registrar_externa)
+        self._identidade = identidade
+
+    def _registrar_externa(self, chave, registro):
+        self._registrar(chave, registro)
+        self._novidades.append((chave, registro))
+
+    def _registrar(self, chave, registro):
+        """Anota o último estado gravado de uma chave e os CPF/e-mail que ela ocupa"""
+        anterior = self._conhecidos.get(chave)
+        if anterior is not None:
+            for unica in _chaves_unicas(anterior):
+                if self._donos.get(unica) == chave:
+                    del self._donos[unica]
+        self._conhecidos[chave] = registro
+        if registro is not None:
+            for unica in _chaves_unicas(registro):
+                self._donos[unica] = chave
+
+    def _em_conflito(self, op, usuario):
+        """True se a operação parte de uma versão que já não é a gravada"""
+        chave = usuario['id']
+        if op != OP_INSERIR and chave in self._conhecidos:
+            atual = self._conhecidos[chave]
+            if op == OP_ATUALIZAR:
+                base = usuario.get('versao', 0) - 1
+            else:
+                base = usuario.get('versao', 0)
+            if atual is None or atual.get('versao', 0) != base:
+                return True
+        if op != OP_REMOVER:
+            for unica in _chaves_unicas(usuario):
+                if self._donos.get(unica, chave) != chave:
+                    return True
+        return False
+
+    def novidades(self):
+        """Alterações de outras instâncias (não bloqueia: se estiver ocupado, fica para a próxima)
+
+        Retorna None enquanto for preciso recarregar tudo (carregar_paginas).
+        """
+        if not self._estado.acquire(blocking=False):
+            return []
+        try:
+            self._sincronizar()
+            if self._recarregar:
+                self._novidades = []
+                return None
+            novidades, self._novidades = self._novidades, []
+            return novidades
+        finally:
+            self._estado.release()
+
+    def aplicar(self, operacoes, usuarios):
+        """Anexa as operações ao diário sob a trava, recusando as que estão em conflito"""
+        with self.trava, self._estado:
+            self._sincronizar()
+            if self._recarregar:
+                # Sem o estado das outras instâncias não há como conferir versões
+                raise ErroConflito(f"{len(operacoes)} alteração(ões) recusada(s): os dados foram "
+                                   f"compactados por outras instâncias e serão recarregados",
+                                   operacoes)
+
+            aceitas, recusadas, desfazer = [], [], []
+            for op, usuario in operacoes:
+                chave = usuario['id']
+                desfazer.append((chave, chave in self._conhecidos, self._conhecidos.get(chave)))
+                if self._em_conflito(op, usuario):
+                    recusadas.append((op, usuario))
+                    if op == OP_INSERIR:
+                        # O registro nunca chegou ao disco
+                        self._registrar(chave, None)
+                    continue
+                aceitas.append((op, usuario))
+                self._registrar(chave, None if op == OP_REMOVER else usuario)
+
+            try:
+                if aceitas:
+                    self._anexar(aceitas)
+            except OSError:
+                for chave, existia, registro in reversed(desfazer):
+                    self._registrar(chave, registro)
+                    if not existia:
+                        del self._conhecidos[chave]
+                raise
+
+            # A interface desfaz as recusadas com o estado que está no disco
+            for op, usuario in recusadas:
+                self._novidades.append((usuario['id'], self._conhecidos.get(usuario['id'])))
+
+            if self._lido >= self._adiar_compactacao + self.limite:
+                self._compactar()
+
+        if recusadas:
+            raise ErroConflito(f"{len(recusadas)} alteração(ões) recusada(s): o registro foi "
+                               f"alterado por outra instância", recusadas)
+
+    def _anexar(self, operacoes):
+        """Grava as linhas no fim do diário (com fsync); desfaz uma escrita parcial"""
+        linhas = []
+        for op, usuario in operacoes:
+            registro = {'op': op, 'id': usuario['id']}
+            if op != OP_REMOVER:
+                registro['dados'] = usuario
+            linhas.append(json.dumps(registro, ensure_ascii=False, separators=(',', ':'),
+                                 default=para_json))
+        dados = ('\n'.join(linhas) + '\n').encode('utf-8')
+
+        novo = not os.path.exists(self.caminho_diario)
+        with open(self.caminho_diario, 'ab') as arquivo:
+            if novo:
+                cabecalho = json.dumps({'geracao': self.geracao}).encode('utf-8') + b'\n'
+                arquivo.write(cabecalho)
+                self._lido = len(cabecalho)
+            # Descarta o fim de uma escrita interrompida por queda de outra instância
+            arquivo.truncate(self._lido)
+            try:
+                arquivo.write(dados)
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+            except OSError:
+                arquivo.truncate(self._lido)
+                raise
+        metricas.contar(GRAVADOS, len(dados))
+        self._lido += len(dados)
+        self._identidade = self._identificar()
+
+    def compactar(self):
+        """Compacta o diário no snapshot em uma thread de fundo"""
+        if self._compactacao is not None and self._compactacao.is_alive():
+            return
+        self._compactacao = threading.Thread(target=self._compactar_travado)
+        self._compactacao.start()
+
+    def _compactar_travado(self):
+        with self.trava, self._estado:
+            self._sincronizar()
+            self._compactar()
+
+    def _compactar(self):
+        """Regrava o snapshot a partir dos arquivos e inicia um diário da próxima geração
+
+        Chamado com a trava e self._estado. Uma queda entre as etapas é
+        segura: reaplicar um diário já incluído no snapshot não muda nada.
+        """
+        try:
+            pendentes, _, _ = self._ler_diarios()
+            gravar_snapshot(self.caminho,
+                            chain.from_iterable(self._mesclar(pendentes, [], self._abrir_snapshot())))
+
+            novo = self.caminho_diario + '.novo'
+            cabecalho = json.dumps({'geracao': self.geracao + 1}).encode('utf-8') + b'\n'
+            with open(novo, 'wb') as f:
+                f.write(cabecalho)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(self.caminho_diario):
+                os.replace(self.caminho_diario, self.caminho_anterior)
+            os.replace(novo, self.caminho_diario)
+            if os.path.exists(self.caminho_compactando):
+                os.remove(self.caminho_compactando)
+        except OSError:
+            # Arquivo em uso por outra instância (Windows) ou disco cheio: tenta mais adiante
+            self._adiar_compactacao = self._lido
+            return
+        self.geracao += 1
+        self._lido = len(cabecalho)
+        self._identidade = self._identificar()
+        self._adiar_compactacao = 0
+
+    def fechar(self):
+        """Aguarda a compactação em andamento"""
+        if self._compactacao is not None:
+            self._compactacao.join()
+
+
+def _ignorar(chave, registro):
+    pass
+
+
+def _chave(registro):
+    # Usuario (snapshot binário) ou dicionário (JSON); None se ainda não tiver chave
+    return registro.id if registro.__class__ is Usuario else registro.get('id')
+
+
+def _anotar(pendentes, chave, registro):
+    """Guarda a última operação da chave; inserção e exclusão a levam para o fim, como em um dict"""
+    if chave in pendentes and registro is not None:
+        pendentes[chave] = registro
+    else:
+        pendentes.pop(chave, None)
+        pendentes[chave] = registro
+
+
+class TrabalhadorPersistencia:
+    """Thread que grava as operações fora do loop do Tk
+
+    As operações enviadas em rajada (dentro de JANELA_AGRUPAMENTO) são
+    gravadas juntas em uma única chamada a aplicar(). O resultado de cada
+    gravação fica em uma fila lida pela interface com resultados(). Se uma
+    gravação falha, as operações são mantidas e reenviadas na próxima;
+    operações recusadas por conflito (ErroConflito) não são reenviadas.
+    """
+
+    def __init__(self, armazenamento, obter_usuarios, janela=JANELA_AGRUPAMENTO):
+        self.armazenamento = armazenamento
+        self.obter_usuarios = obter_usuarios
+        self.janela = janela
+        self._fila = queue.Queue()
+        self._resultados = queue.Queue()
+        self._pendentes = []
+        self._thread = threading.Thread(target=self._executar, name='persistencia',
+                                        daemon=True)
+        self._thread.start()
+
+    def enviar(self, operacoes):
+        """Agenda a gravação de uma lista de operações (op, usuario)"""
+        self._fila.put(list(operacoes))
+
+    def resultados(self):
+        """Retorna as gravações concluídas desde a última chamada: (ok, quantidade, erro)"""
+        concluidas = []
+        while True:
+            try:
+                concluidas.append(self._resultados.get_nowait())
+            except queue.Empty:
+                return concluidas
+
+    def descarregar(self):
+        """Grava tudo o que está na fila e aguarda; retorna as operações que falharam"""
+        sinal = threading.Event()
+        self._fila.put(sinal)
+        sinal.wait()
+        return list(self._pendentes)
+
+    def parar(self):
+        """Grava o que falta e encerra a thread"""
+        self._fila.put(None)
+        self._thread.join()
+        return list(self._pendentes)
+
+    def _executar(self):
+        while True:
+            item = self._fila.get()
+            lote, sinais, parar = [], [], False
+            prazo = time.monotonic() + self.janela
+            while True:
+                if item is None:
+                    parar = True
+                elif isinstance(item, threading.Event):
+                    sinais.append(item)
+                else:
+                    lote.extend(item)
+                if parar or sinais:
+                    break
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    item = self._fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+            self._gravar(lote)
+            for sinal in sinais:
+                sinal.set()
+            if parar:
+                return
+
+    def _gravar(self, lote):
+        operacoes = self._pendentes + lote
+        if not operacoes:
+            return
+        inicio = time.perf_counter()
+        try:
+            usuarios = self.obter_usuarios()
+            if self.armazenamento.regrava_tudo:
+                # Cópia rasa atômica: a thread principal pode continuar alterando a lista
+                usuarios = list(usuarios)
+            self.armazenamento.aplicar(operacoes, usuarios)
+        except ErroConflito as e:
+            # As demais operações foram gravadas
+            self._pendentes = []
+            self._resultados.put((False, len(e.operacoes), e))
+        except Exception as e:
+            self._pendentes = operacoes
+            self._resultados.put((False, len(operacoes), e))
+        else:
+            self._pendentes = []
+            self._resultados.put((True, len(operacoes), None))
+        finally:
+            metricas.registrar('persistencia.aplicar', time.perf_counter() - inicio)
+
+
+def criar_armazenamento(tipo, caminho=None):
+    """Cria o meio de armazenamento pelo nome: 'json', 'diario', 'binario' ou 'sqlite'"""
+    if tipo == 'json':
+        return ArmazenamentoJSON(caminho or ARQUIVO_DADOS)
+    if tipo == 'diario':
+        return ArmazenamentoDiario(caminho or ARQUIVO_DADOS)
+    if tipo == 'binario':
+        # Diário de operações em JSON Lines sobre o snapshot binário
+        return ArmazenamentoDiario(caminho or ARQUIVO_BINARIO)
+    if tipo == 'sqlite':
+        from armazenamento_sqlite import ArmazenamentoSQLite, ARQUIVO_BANCO
+        return ArmazenamentoSQLite(caminho or ARQUIVO_BANCO)
+    raise ValueError(f"Tipo de armazenamento desconhecido: {tipo}")
@@ -0,0 +1,128 @@
+"""Lista dos usuários na ordem de cadastro, com troca e exclusão de um registro sem percorrer a lista"""
+from bisect import bisect_left, insort
+from collections.abc import Sequence
+from functools import partial
+from operator import is_not
+
+_presente = partial(is_not, None)
+
+
+class ListaRegistros(Sequence):
+    """Sequência dos registros na ordem de cadastro (o mesmo objeto que a interface exibe)
+
+    Cada registro sabe a sua casa (dicionário registro -> casa), então uma
+    edição troca a casa em O(1). Uma exclusão só esvazia a casa (None) e
+    anota o número dela em uma lista ordenada: a posição visível de uma casa
+    é o número dela menos as casas vazias antes dela, achadas por busca
+    binária. As casas vazias são descartadas de uma vez quando passam de
+    1/8 da lista.
+    """
+
+    def __init__(self, registros=()):
+        self._casas = list(registros)
+        self._casa = {registro: casa for casa, registro in enumerate(self._casas)}
+        self._vazias = []
+
+    def __len__(self):
+        return len(self._casas) - len(self._vazias)
+
+    def __iter__(self):
+        if not self._vazias:
+            return iter(self._casas)
+        return filter(_presente, self._casas)
+
+    def __contains__(self, registro):
+        return registro in self._casa
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            inicio, fim, passo = indice.indices(len(self))
+            if not self._vazias:
+                return self._casas[inicio:fim:passo]
+            if passo != 1:
+                return list(self)[indice]
+            if inicio >= fim:
+                return []
+            return list(filter(_presente, self._casas[self._casa_da_posicao(inicio):
+                                                      self._casa_da_posicao(fim - 1) + 1]))
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError('índice fora da lista')
+        if not self._vazias:
+            return self._casas[indice]
+        return self._casas[self._casa_da_posicao(indice)]
+
+    def _casa_da_posicao(self, posicao):
+        # A j-ésima casa vazia tem vazias[j] - j casas ocupadas antes dela (valor
+        # que não diminui com j); as que ficam antes da casa procurada são as
+        # com esse valor <= posicao, contadas por uma busca binária
+        vazias = self._vazias
+        inicio, fim = 0, len(vazias)
+        while inicio < fim:
+            meio = (inicio + fim) // 2
+            if vazias[meio] - meio <= posicao:
+                inicio = meio + 1
+            else:
+                fim = meio
+        return posicao + inicio
+
+    def posicao(self, registro):
+        """Posição do registro na sequência (ValueError se não estiver nela)"""
+        try:
+            casa = self._casa[registro]
+        except KeyError:
+            raise ValueError('registro fora da lista') from None
+        return casa - bisect_left(self._vazias, casa)
+
+    def append(self, registro):
+        """Acrescenta um registro no fim"""
+        self._casa[registro] = len(self._casas)
+        self._casas.append(registro)
+
+    def extend(self, registros):
+        """Acrescenta vários registros no fim"""
+        inicio = len(self._casas)
+        self._casas.extend(registros)
+        self._casa.update(zip(self._casas[inicio:], range(inicio, len(self._casas))))
+
+    def trocar(self, antigo, novo):
+        """Põe 'novo' na casa de 'antigo'"""
+        try:
+            casa = self._casa.pop(antigo)
+        except KeyError:
+            raise ValueError('registro fora da lista') from None
+        self._casas[casa] = novo
+        self._casa[novo] = casa
+
+    def remover(self, registro):
+        """Retira o registro; retorna a posição que ele ocupava"""
+        posicao = self.posicao(registro)
+        casa = self._casa.pop(registro)
+        self._casas[casa] = None
+        insort(self._vazias, casa)
+        self._talvez_compactar()
+        return posicao
+
+    def trocar_lote(self, pares):
+        """Põe cada 'novo' na casa do seu 'antigo' (pares antigo, novo)"""
+        for antigo, novo in pares:
+            self.trocar(antigo, novo)
+
+    def remover_lote(self, registros):
+        """Retira vários registros; retorna, em ordem, as posições que ocupavam"""
+        casas = sorted(self._casa.pop(registro) for registro in registros if registro in self._casa)
+        posicoes = [casa - bisect_left(self._vazias, casa) for casa in casas]
+        for casa in casas:
+            self._casas[casa] = None
+        # Junção de duas sequências já ordenadas: o sort só as intercala
+        self._vazias.extend(casas)
+        self._vazias.sort()
+        self._talvez_compactar()
+        return posicoes
+
+    def _talvez_compactar(self):
+        if len(self._vazias) * 8 > len(self._casas):
+            self._casas = list(filter(_presente, self._casas))
+            self._casa = {registro: casa for casa, registro in enumerate(self._casas)}
+            self._vazias = []
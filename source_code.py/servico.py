@@ -0,0 +1,390 @@
+"""Núcleo do cadastro independente da interface: repositório em memória e regras de negócio
+
+Usado tanto pela aplicação Tkinter quanto pela API HTTP (api.py).
+"""
+import validacao
+from busca import IndiceBusca
+from duplicatas import IndiceDuplicatas, cep_numerico
+from estatisticas import IndiceEstatisticas
+from indice_tempo import IndiceTempo
+from indices import IndiceUsuarios
+from modelo import como_usuario, epoca_agora
+from ordenacao import IndiceOrdenacao
+from persistencia import gerar_id, ErroConflito, OP_INSERIR, OP_ATUALIZAR, OP_REMOVER
+from registros import ListaRegistros
+
+# Operações aceitas por executar_lote
+OPERACOES_LOTE = ('inserir', 'atualizar', 'excluir')
+
+# Campos que podem receber o mesmo valor em vários usuários (CPF e e-mail são únicos)
+CAMPOS_LOTE = ('nome', 'idade', 'cep')
+
+
+class ErroValidacao(ValueError):
+    """Dados inválidos; 'campo' indica qual campo deve ser corrigido"""
+
+    def __init__(self, mensagem, campo=None):
+        super().__init__(mensagem)
+        self.campo = campo
+
+
+class ErroDuplicado(ErroValidacao):
+    """CPF ou e-mail já usado por outro usuário"""
+
+
+class UsuarioNaoEncontrado(LookupError):
+    """Nenhum usuário com a chave informada"""
+
+
+def conferir_versao(usuario, versao):
+    """Levanta ErroConflito se o usuário já não está na versão que foi editada"""
+    if versao is not None and usuario.get('versao', 0) != versao:
+        raise ErroConflito("Este usuário foi alterado em outra instância! "
+                           "Confira os dados atuais e tente novamente.")
+
+
+class RepositorioUsuarios:
+    """Lista de usuários em memória, na ordem de cadastro, com todos os índices em sincronia
+
+    Os registros são guardados como modelo.Usuario; dicionários vindos do
+    armazenamento ou da importação são convertidos na entrada. A lista é uma
+    ListaRegistros: editar ou excluir um registro não percorre a lista.
+    """
+
+    def __init__(self):
+        self.usuarios = ListaRegistros()
+        self.indice = IndiceUsuarios()
+        self.busca = IndiceBusca()
+        self.ordenacao = IndiceOrdenacao()
+        self.estatisticas = IndiceEstatisticas()
+        self.tempo = IndiceTempo(lambda: self.usuarios)
+        self.duplicatas = IndiceDuplicatas()
+        self.indices = [self.indice, self.busca, self.ordenacao, self.estatisticas, self.tempo,
+                        self.duplicatas]
+
+    def __len__(self):
+        return len(self.usuarios)
+
+    def obter(self, chave):
+        """Usuário pela chave estável (None se não existir)"""
+        return self.indice.por_id.get(chave)
+
+    def limpar(self):
+        """Esvazia a lista e os índices"""
+        self.usuarios = ListaRegistros()
+        for indice in self.indices:
+            indice.reconstruir(self.usuarios)
+
+    def inserir(self, usuario):
+        """Acrescenta um usuário no fim da lista; retorna o registro guardado"""
+        usuario = como_usuario(usuario)
+        self.usuarios.append(usuario)
+        for indice in self.indices:
+            indice.adicionar(usuario)
+        return usuario
+
+    def inserir_lote(self, usuarios):
+        """Acrescenta vários usuários (carga em páginas, importação); retorna os registros guardados"""
+        usuarios = [como_usuario(usuario) for usuario in usuarios]
+        self.usuarios.extend(usuarios)
+        for indice in self.indices:
+            indice.adicionar_lote(usuarios)
+        return usuarios
+
+    def substituir(self, antigo, novo):
+        """Troca o registro na mesma posição (os registros nunca são alterados no lugar)"""
+        novo = como_usuario(novo)
+        self.usuarios.trocar(antigo, novo)
+        for indice in self.indices:
+            indice.substituir(antigo, novo)
+        return novo
+
+    def remover(self, usuario):
+        """Retira o usuário; retorna a posição que ele ocupava"""
+        posicao = self.usuarios.remover(usuario)
+        for indice in self.indices:
+            indice.remover(usuario)
+        return posicao
+
+    def remover_lote(self, usuarios):
+        """Retira vários usuários sem percorrer a lista; retorna as posições que ocupavam, em ordem"""
+        usuarios = list(dict.fromkeys(usuarios))
+        posicoes = self.usuarios.remover_lote(usuarios)
+        for indice in self.indices:
+            indice.remover_lote(usuarios)
+        return posicoes
+
+    def substituir_lote(self, pares):
+        """Troca vários registros (pares antigo, novo) nas mesmas posições; retorna os novos"""
+        novos = {antigo: como_usuario(novo) for antigo, novo in pares}
+        pares = list(novos.items())
+        self.usuarios.trocar_lote(pares)
+        for indice in self.indices:
+            indice.substituir_lote(pares)
+        return list(novos.values())
+
+    def sincronizar(self, alteracoes):
+        """Aplica alterações gravadas por outras instâncias (chave, registro ou None)
+
+        Retorna (op, usuario, posicao) de cada mudança efetiva, para a
+        interface refletir só as linhas afetadas.
+        """
+        aplicadas = []
+        for chave, registro in alteracoes:
+            atual = self.obter(chave)
+            if registro is None:
+                if atual is not None:
+                    aplicadas.append((OP_REMOVER, atual, self.remover(atual)))
+            elif atual is None:
+                aplicadas.append((OP_INSERIR, self.inserir(registro), None))
+            else:
+                registro = como_usuario(registro)
+                if not atual.mesmos_dados(registro):
+                    self.substituir(atual, registro)
+                    aplicadas.append((OP_ATUALIZAR, registro, None))
+        return aplicadas
+
+    def visao(self, consulta='', coluna=None, decrescente=False, periodo=None):
+        """Sequência filtrada pela busca e/ou pelo período, ordenada pela coluna (índice em COLUNAS)
+
+        'periodo' é (campo, início, fim) como em IndiceTempo.periodo; sem
+        coluna, o período vem em ordem de data.
+        """
+        if periodo is not None:
+            dados = self.tempo.periodo(*periodo)
+            if consulta:
+                encontrados = set(self.busca.buscar(consulta))
+                dados = [usuario for usuario in dados if usuario in encontrados]
+            if coluna is not None:
+                dados = self.ordenacao.ordenar(dados, coluna, decrescente)
+            return dados
+        if consulta:
+            dados = self.busca.buscar(consulta)
+            if coluna is not None:
+                dados = self.ordenacao.ordenar(dados, coluna, decrescente)
+            return dados
+        if coluna is not None:
+            return self.ordenacao.ordenados(coluna, decrescente)
+        return self.usuarios
+
+
+def _texto(dados, campo):
+    valor = dados.get(campo)
+    return '' if valor is None else str(valor).strip()
+
+
+class ServicoUsuarios:
+    """Regras do cadastro: validação, duplicidade, datas e envio para gravação
+
+    'gravar' recebe a lista de operações (op, usuario) de cada alteração;
+    na interface é a thread de persistência, na API também.
+    """
+
+    def __init__(self, repositorio, gravar):
+        self.repositorio = repositorio
+        self.gravar = gravar
+
+    def validar(self, dados, chave=None):
+        """Valida e normaliza os campos; 'chave' é o usuário em edição (ignorado na duplicidade)
+
+        Retorna um novo dicionário só com os campos do cadastro ou levanta
+        ErroValidacao com a primeira mensagem encontrada.
+        """
+        nome = _texto(dados, 'nome')
+        cpf = _texto(dados, 'cpf')
+        idade = _texto(dados, 'idade')
+        email = _texto(dados, 'email')
+        cep = _texto(dados, 'cep')
+
+        if not nome:
+            raise ErroValidacao("Nome não pode estar vazio!", 'nome')
+        if len(nome) < 2:
+            raise ErroValidacao("Nome deve ter pelo menos 2 caracteres!", 'nome')
+
+        if not cpf:
+            raise ErroValidacao("CPF não pode estar vazio!", 'cpf')
+        if not validacao.validar_cpf(cpf):
+            if len(validacao.apenas_digitos(cpf)) != 11:
+                raise ErroValidacao("CPF inválido! Deve ter exatamente 11 dígitos.", 'cpf')
+            raise ErroValidacao("CPF inválido! Verifique os dígitos.", 'cpf')
+
+        if not idade:
+            raise ErroValidacao("Idade não pode estar vazia!", 'idade')
+        try:
+            idade = int(idade)
+        except ValueError:
+            raise ErroValidacao("Idade deve ser um número válido!", 'idade')
+        if not validacao.validar_idade(idade):
+            raise ErroValidacao(f"Idade deve estar entre {validacao.IDADE_MINIMA} e "
+                                f"{validacao.IDADE_MAXIMA} anos!", 'idade')
+
+        if not email:
+            raise ErroValidacao("E-mail não pode estar vazio!", 'email')
+        if not validacao.validar_email(email):
+            raise ErroValidacao("E-mail inválido! Verifique o formato.", 'email')
+
+        if not cep:
+            raise ErroValidacao("CEP não pode estar vazio!", 'cep')
+        if not validacao.validar_cep(cep):
+            if len(validacao.apenas_digitos(cep)) != 8:
+                raise ErroValidacao("CEP inválido! Deve ter exatamente 8 dígitos.", 'cep')
+            raise ErroValidacao("CEP inválido! O menor CEP é 01000-000.", 'cep')
+
+        # Duplicidade pelos índices (durante a edição ignora o próprio registro)
+        indice = self.repositorio.indice
+        atual = self.repositorio.obter(chave)
+        if indice.cpf_em_uso(cpf, ignorar=atual):
+            raise ErroDuplicado("Este CPF já está cadastrado!", 'cpf')
+        if indice.email_em_uso(email, ignorar=atual):
+            raise ErroDuplicado("Este e-mail já está cadastrado!", 'email')
+
+        return {
+            'nome': nome,
+            'cpf': validacao.formatar_cpf(cpf),
+            'idade': idade,
+            'email': email,
+            'cep': validacao.formatar_cep(cep),
+        }
+
+    def possiveis_duplicatas(self, dados, chave=None):
+        """Cadastros que parecem a mesma pessoa (nome parecido no mesmo CEP, e-mail equivalente)
+
+        Só um aviso, antes de salvar: não impede o cadastro. Valida os dados
+        como validar (ErroValidacao) e retorna [(usuario, motivo, semelhança)].
+        """
+        usuario = self.validar(dados, chave)
+        return self.repositorio.duplicatas.semelhantes(
+            usuario['nome'], usuario['email'], cep_numerico(usuario['cep']),
+            ignorar=self.repositorio.obter(chave))
+
+    def cadastrar(self, dados):
+        """Valida e cadastra um novo usuário; retorna o registro criado"""
+        operacao = self._cadastrar(dados)
+        self.gravar([operacao])
+        return operacao[1]
+
+    def atualizar(self, chave, dados, versao=None):
+        """Valida e substitui os dados do usuário; retorna o novo registro
+
+        'versao' é a versão que foi editada: se o registro mudou desde
+        então (outra instância), levanta ErroConflito.
+        """
+        operacao = self._atualizar(chave, dados, versao)
+        self.gravar([operacao])
+        return operacao[1]
+
+    def excluir(self, chave, versao=None):
+        """Exclui o usuário; retorna (registro removido, posição que ocupava)"""
+        operacao, posicao = self._excluir(chave, versao)
+        self.gravar([operacao])
+        return operacao[1], posicao
+
+    def excluir_lote(self, chaves):
+        """Exclui vários usuários com uma única gravação; retorna (removidos, posições que ocupavam)
+
+        Chaves que não existem mais são ignoradas.
+        """
+        usuarios = [usuario for usuario in map(self.repositorio.obter, dict.fromkeys(chaves))
+                    if usuario is not None]
+        if not usuarios:
+            return [], []
+        posicoes = self.repositorio.remover_lote(usuarios)
+        self.gravar([(OP_REMOVER, usuario) for usuario in usuarios])
+        return usuarios, posicoes
+
+    def atualizar_lote(self, chaves, campos):
+        """Aplica os mesmos valores de 'campos' a vários usuários, todos ou nenhum
+
+        Todos são validados antes de qualquer alteração: um erro levanta
+        ErroValidacao com o nome do usuário e nada é alterado. Retorna os
+        novos registros (gravados de uma vez).
+        """
+        for campo in campos:
+            if campo not in CAMPOS_LOTE:
+                raise ErroValidacao("Só nome, idade e CEP podem ser alterados em lote!", campo)
+        agora = epoca_agora()
+        pares = []
+        for chave in dict.fromkeys(chaves):
+            antigo = self.repositorio.obter(chave)
+            if antigo is None:
+                continue
+            try:
+                usuario = self.validar(dict(antigo, **campos), chave)
+            except ErroValidacao as e:
+                raise ErroValidacao(f"{antigo['nome']}: {e}", e.campo)
+            usuario['id'] = antigo['id']
+            usuario['data_cadastro'] = antigo.cadastro
+            usuario['data_atualizacao'] = agora
+            usuario['versao'] = antigo.get('versao', 0) + 1
+            pares.append((antigo, usuario))
+        if not pares:
+            return []
+        novos = self.repositorio.substituir_lote(pares)
+        self.gravar([(OP_ATUALIZAR, usuario) for usuario in novos])
+        return novos
+
+    def executar_lote(self, pedidos):
+        """Executa vários pedidos {'op', 'id', 'dados', 'versao'} e grava tudo de uma vez
+
+        Cada pedido é independente: os que falham não impedem os demais.
+        Retorna um resultado por pedido, {'ok': True, 'usuario': ...} ou
+        {'ok': False, 'erro': mensagem, 'campo': campo}.
+        """
+        operacoes = []
+        resultados = []
+        for pedido in pedidos:
+            try:
+                if not isinstance(pedido, dict):
+                    raise ErroValidacao("Pedido inválido!")
+                op = pedido.get('op')
+                if op == 'inserir':
+                    operacao = self._cadastrar(pedido.get('dados') or {})
+                elif op == 'atualizar':
+                    operacao = self._atualizar(pedido.get('id'), pedido.get('dados') or {},
+                                               pedido.get('versao'))
+                elif op == 'excluir':
+                    operacao, _ = self._excluir(pedido.get('id'), pedido.get('versao'))
+                else:
+                    raise ErroValidacao(f"Operação desconhecida: {op}", 'op')
+            except ErroValidacao as e:
+                resultados.append({'ok': False, 'erro': str(e), 'campo': e.campo})
+                continue
+            except UsuarioNaoEncontrado:
+                resultados.append({'ok': False, 'erro': "Usuário não encontrado!", 'campo': 'id'})
+                continue
+            except ErroConflito as e:
+                resultados.append({'ok': False, 'erro': str(e), 'campo': 'versao'})
+                continue
+            operacoes.append(operacao)
+            resultados.append({'ok': True, 'usuario': operacao[1]})
+        if operacoes:
+            self.gravar(operacoes)
+        return resultados
+
+    def _cadastrar(self, dados):
+        usuario = self.validar(dados)
+        usuario['id'] = gerar_id()
+        # Datas em segundos (modelo.para_epoca); os arquivos continuam com 'dd/mm/aaaa hh:mm:ss'
+        usuario['data_cadastro'] = epoca_agora()
+        usuario['versao'] = 1
+        return OP_INSERIR, self.repositorio.inserir(usuario)
+
+    def _atualizar(self, chave, dados, versao=None):
+        antigo = self.repositorio.obter(chave)
+        if antigo is None:
+            raise UsuarioNaoEncontrado(chave)
+        conferir_versao(antigo, versao)
+        usuario = self.validar(dados, chave)
+        usuario['id'] = antigo['id']
+        usuario['data_cadastro'] = antigo.cadastro
+        usuario['data_atualizacao'] = epoca_agora()
+        usuario['versao'] = antigo.get('versao', 0) + 1
+        return OP_ATUALIZAR, self.repositorio.substituir(antigo, usuario)
+
+    def _excluir(self, chave, versao=None):
+        usuario = self.repositorio.obter(chave)
+        if usuario is None:
+            raise UsuarioNaoEncontrado(chave)
+        conferir_versao(usuario, versao)
+        posicao = self.repositorio.remover(usuario)
+        return (OP_REMOVER, usuario), posicao
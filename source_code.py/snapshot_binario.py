@@ -0,0 +1,266 @@
+"""Snapshot binário do cadastro: colunas numéricas de tamanho fixo, tabela de textos e CRC por bloco
+
+Uso: python snapshot_binario.py usuarios_cadastrados.json usuarios_cadastrados.bin
+(converte nos dois sentidos: o destino é binário se terminar em .bin)
+
+Formato (inteiros little-endian):
+
+    cabeçalho  marca 'CADB', versão do formato, quantidade de usuários e
+               de blocos, seguidos do CRC32 desses campos
+    bloco      quantidade de usuários, bytes do texto, bytes dos extras e
+               CRC32 (cabeçalho do bloco + conteúdo), seguidos do conteúdo:
+                 ausentes             um H por usuário; o bit i marca o
+                                      campo i de Usuario.__slots__ vazio
+                 cpf, cadastro, atualização   um q por usuário
+                 idade, cep, versão           um i por usuário
+                 texto                id, nome e e-mail de cada usuário, em
+                                      UTF-8, separados por NUL
+                 extras               JSON {posição: {campo: valor}}
+
+Os valores que não cabem nas colunas (CPF ou data em outro formato,
+idade em texto, texto com NUL, ...) vão inteiros para os extras, então
+a conversão JSON <-> binário não perde nada. O arquivo é lido de uma vez e cada bloco
+é conferido pelo CRC e decodificado, inteiro, só quando a leitura chega nele.
+"""
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+from itertools import islice
+from operator import attrgetter
+
+from instrumentacao import metricas, LIDOS, GRAVADOS
+from modelo import Usuario, como_usuario, usuarios_empacotados
+
+# Arquivos com esta extensão são gravados no formato binário
+EXTENSAO_BINARIA = '.bin'
+
+MARCA = b'CADB'
+VERSAO_FORMATO = 1
+
+# Usuários por bloco (cada bloco tem o próprio CRC)
+REGISTROS_POR_BLOCO = 4096
+
+# Cabeçalho: marca, versão, reservado, usuários, blocos (+ CRC32)
+_CABECALHO = struct.Struct('<4sHHQI')
+# Bloco: usuários, bytes do texto, bytes dos extras (+ CRC32)
+_BLOCO = struct.Struct('<III')
+_CRC = struct.Struct('<I')
+
+# Campos de texto e colunas numéricas (slot, código do array), na ordem do arquivo
+_TEXTOS = ('id', 'nome', 'email')
+_NUMERICOS = (('cpf_numero', 'q'), ('cadastro', 'q'), ('atualizacao', 'q'),
+              ('idade', 'i'), ('cep_numero', 'i'), ('versao', 'i'))
+
+_BITS = {slot: 1 << i for i, slot in enumerate(Usuario.__slots__)}
+_POSICOES = {slot: i for i, slot in enumerate(Usuario.__slots__)}
+_valores = attrgetter(*Usuario.__slots__)
+
+# Bytes de colunas por usuário: campos vazios e colunas numéricas
+_BYTES_POR_USUARIO = array('H').itemsize + sum(array(tipo).itemsize for _, tipo in _NUMERICOS)
+
+_SEPARADOR = '\0'
+
+# O array usa a ordem de bytes da máquina; o arquivo é sempre little-endian
+_INVERTER = sys.byteorder == 'big'
+
+
+class SnapshotCorrompido(ValueError):
+    """Snapshot binário truncado ou com CRC que não confere"""
+
+
+def eh_binario(f):
+    """True se o arquivo (aberto em modo binário) começa com a marca do formato; não move a posição"""
+    inicio = f.tell()
+    marca = f.read(len(MARCA))
+    f.seek(inicio)
+    return marca == MARCA
+
+
+def _limites(tipo):
+    bits = array(tipo).itemsize * 8
+    return -(1 << (bits - 1)), (1 << (bits - 1)) - 1
+
+
+def _para_bytes(coluna):
+    if _INVERTER:
+        coluna.byteswap()
+    return coluna.tobytes()
+
+
+def _codificar_bloco(usuarios):
+    """Cabeçalho e conteúdo de um bloco"""
+    quantidade = len(usuarios)
+    ausentes = array('H', [0]) * quantidade
+    colunas = [(_POSICOES[slot], _BITS[slot], array(tipo, [0]) * quantidade) + _limites(tipo)
+               for slot, tipo in _NUMERICOS]
+    textos_slots = [(_POSICOES[slot], _BITS[slot]) for slot in _TEXTOS]
+    textos = []
+    extras = {}
+
+    for i, valores in enumerate(map(_valores, usuarios)):
+        for posicao, bit in textos_slots:
+            valor = valores[posicao]
+            if valor.__class__ is not str or _SEPARADOR in valor:
+                if valor is None:
+                    ausentes[i] |= bit
+                else:
+                    extras.setdefault(str(i), {})[Usuario.__slots__[posicao]] = valor
+                valor = ''
+            textos.append(valor)
+        for posicao, bit, coluna, minimo, maximo in colunas:
+            valor = valores[posicao]
+            if valor.__class__ is int and minimo <= valor <= maximo:
+                coluna[i] = valor
+            elif valor is None:
+                ausentes[i] |= bit
+            else:
+                extras.setdefault(str(i), {})[Usuario.__slots__[posicao]] = valor
+
+    texto = _SEPARADOR.join(textos).encode('utf-8')
+    extras = json.dumps(extras, ensure_ascii=False).encode('utf-8') if extras else b''
+    conteudo = b''.join([_para_bytes(ausentes)]
+                        + [_para_bytes(coluna) for _, _, coluna, _, _ in colunas]
+                        + [texto, extras])
+    cabecalho = _BLOCO.pack(quantidade, len(texto), len(extras))
+    return cabecalho + _CRC.pack(zlib.crc32(conteudo, zlib.crc32(cabecalho))) + conteudo
+
+
+def gravar_binario(caminho, usuarios, por_bloco=REGISTROS_POR_BLOCO):
+    """Grava os usuários (Usuario ou dicionários, qualquer iterável) de forma atômica"""
+    temporario = caminho + '.tmp'
+    registros = map(como_usuario, usuarios)
+    total = blocos = 0
+    with open(temporario, 'wb') as f:
+        # O cabeçalho é preenchido no fim, quando as quantidades são conhecidas
+        f.write(bytes(_CABECALHO.size + _CRC.size))
+        while True:
+            bloco = list(islice(registros, por_bloco))
+            if not bloco:
+                break
+            f.write(_codificar_bloco(bloco))
+            total += len(bloco)
+            blocos += 1
+        cabecalho = _CABECALHO.pack(MARCA, VERSAO_FORMATO, 0, total, blocos)
+        f.seek(0)
+        f.write(cabecalho + _CRC.pack(zlib.crc32(cabecalho)))
+        f.flush()
+        os.fsync(f.fileno())
+        metricas.contar(GRAVADOS, os.fstat(f.fileno()).st_size)
+    os.replace(temporario, caminho)
+
+
+def _coluna(conteudo, inicio, tipo, quantidade):
+    coluna = array(tipo)
+    fim = inicio + quantidade * coluna.itemsize
+    coluna.frombytes(conteudo[inicio:fim])
+    if _INVERTER:
+        coluna.byteswap()
+    return coluna, fim
+
+
+def _decodificar_bloco(conteudo, quantidade, tamanho_texto, tamanho_extras):
+    """Gerador dos usuários de um bloco já conferido"""
+    ausentes, pos = _coluna(conteudo, 0, 'H', quantidade)
+    colunas = {}
+    for slot, tipo in _NUMERICOS:
+        coluna, pos = _coluna(conteudo, pos, tipo, quantidade)
+        colunas[slot] = coluna.tolist()
+    textos = str(conteudo[pos:pos + tamanho_texto], 'utf-8').split(_SEPARADOR)
+    pos += tamanho_texto
+    if len(textos) != quantidade * len(_TEXTOS):
+        raise SnapshotCorrompido("Snapshot binário corrompido: textos não conferem com o bloco")
+    for n, slot in enumerate(_TEXTOS):
+        colunas[slot] = textos[n::len(_TEXTOS)]
+
+    # Campos vazios (data de atualização, em geral) são tratados por coluna;
+    # vazio em todo o bloco não precisa passar registro a registro
+    marcados, todos = 0, -1
+    for bits in set(ausentes):
+        marcados |= bits
+        todos &= bits
+    for slot, bit in _BITS.items():
+        if todos & bit:
+            colunas[slot] = [None] * quantidade
+        elif marcados & bit:
+            colunas[slot] = [None if bits & bit else valor
+                             for bits, valor in zip(ausentes, colunas[slot])]
+    if tamanho_extras:
+        extras = json.loads(str(conteudo[pos:pos + tamanho_extras], 'utf-8'))
+        for i, valores in extras.items():
+            for slot, valor in valores.items():
+                colunas[slot][int(i)] = valor
+
+    return usuarios_empacotados(zip(*[colunas[slot] for slot in Usuario.__slots__]))
+
+
+def iterar_binario(dados):
+    """Gera os usuários de um snapshot binário já lido (bytes ou mmap), um a um (ver blocos_binario)"""
+    for bloco in blocos_binario(dados):
+        yield from bloco
+
+
+def blocos_binario(dados):
+    """Gera a lista de usuários de cada bloco de um snapshot binário já lido (bytes ou mmap)
+
+    Levanta SnapshotCorrompido se o arquivo estiver truncado ou algum
+    bloco não conferir com o CRC; os blocos anteriores já terão sido
+    entregues.
+    """
+    visao = memoryview(dados)
+    tamanho_cabecalho = _CABECALHO.size + _CRC.size
+    if len(visao) < tamanho_cabecalho:
+        raise SnapshotCorrompido("Snapshot binário truncado no cabeçalho")
+    marca, versao, _, total, blocos = _CABECALHO.unpack_from(visao)
+    if marca != MARCA:
+        raise SnapshotCorrompido("Arquivo de dados inválido: não é um snapshot binário")
+    if _CRC.unpack_from(visao, _CABECALHO.size)[0] != zlib.crc32(visao[:_CABECALHO.size]):
+        raise SnapshotCorrompido("Snapshot binário corrompido: cabeçalho não confere com o CRC")
+    if versao != VERSAO_FORMATO:
+        raise ValueError(f"Versão do snapshot binário não suportada: {versao}")
+    metricas.contar(LIDOS, tamanho_cabecalho)
+
+    pos = tamanho_cabecalho
+    lidos = 0
+    for numero in range(1, blocos + 1):
+        inicio = pos + _BLOCO.size + _CRC.size
+        if inicio > len(visao):
+            raise SnapshotCorrompido(f"Snapshot binário truncado no bloco {numero} de {blocos}")
+        quantidade, tamanho_texto, tamanho_extras = _BLOCO.unpack_from(visao, pos)
+        crc, = _CRC.unpack_from(visao, pos + _BLOCO.size)
+        fim = inicio + quantidade * _BYTES_POR_USUARIO + tamanho_texto + tamanho_extras
+        if fim > len(visao):
+            raise SnapshotCorrompido(f"Snapshot binário truncado no bloco {numero} de {blocos}")
+        conteudo = visao[inicio:fim]
+        if zlib.crc32(conteudo, zlib.crc32(visao[pos:pos + _BLOCO.size])) != crc:
+            raise SnapshotCorrompido(
+                f"Snapshot binário corrompido: bloco {numero} de {blocos} não confere com o CRC")
+        metricas.contar(LIDOS, fim - pos)
+        yield list(_decodificar_bloco(conteudo, quantidade, tamanho_texto, tamanho_extras))
+        lidos += quantidade
+        pos = fim
+
+    if lidos != total or pos != len(visao):
+        raise SnapshotCorrompido("Snapshot binário corrompido: tamanho não confere com o cabeçalho")
+
+
+def ler_binario(f):
+    """Lê o arquivo aberto inteiro agora (uma leitura) e retorna o gerador dos usuários"""
+    return iterar_binario(f.read())
+
+
+if __name__ == "__main__":
+    # A interface importa este módulo; o argparse e a conversão ficam só na linha de comando
+    import argparse
+    from persistencia import ArmazenamentoDiario, gravar_snapshot
+    parser = argparse.ArgumentParser(description="Converte o cadastro entre os snapshots JSON e binário")
+    parser.add_argument('origem', help="snapshot atual (JSON ou binário); o diário dele também é lido")
+    parser.add_argument('destino', help=f"novo snapshot: binário se terminar em {EXTENSAO_BINARIA}, "
+                                         "senão JSON")
+    args = parser.parse_args()
+
+    usuarios = list(ArmazenamentoDiario(args.origem).iterar())
+    gravar_snapshot(args.destino, usuarios)
+    print(f"{len(usuarios)} usuários gravados em {args.destino}")
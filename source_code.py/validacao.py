@@ -0,0 +1,150 @@
+"""Regras de validação dos campos do cadastro, usadas pelo formulário e pela importação
+
+As funções de um valor guardam os resultados recentes (lru_cache), já que
+o mesmo CPF ou e-mail costuma ser validado mais de uma vez. As funções de
+lote validam a coluna inteira; com o NumPy instalado, os dígitos
+verificadores dos CPFs são calculados de uma vez para todas as linhas.
+"""
+import re
+from functools import lru_cache
+
+# Padrões pré-compilados
+_nao_digitos = re.compile(r'[^0-9]')
+_padrao_email = re.compile(r'[a-zA-Z0-9_%+-]+(?:\.[a-zA-Z0-9_%+-]+)*'
+                           r'@(?:[a-zA-Z0-9](?:[a-zA-Z0-9-]*[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}')
+
+# Faixa de idade aceita
+IDADE_MINIMA = 1
+IDADE_MAXIMA = 150
+
+# Menor CEP existente (01000-000), só dígitos
+CEP_MINIMO = '01000000'
+
+# Tamanhos máximos do e-mail (RFC 5321)
+TAMANHO_MAXIMO_EMAIL = 254
+TAMANHO_MAXIMO_LOCAL = 64
+
+# Valores guardados por função de validação
+TAMANHO_CACHE = 4096
+
+# Abaixo disto um lote de CPFs não compensa a conversão para o NumPy
+LOTE_MINIMO_NUMPY = 256
+
+# Pesos dos dois dígitos verificadores do CPF (módulo 11)
+_PESOS_CPF = (tuple(range(10, 1, -1)), tuple(range(11, 1, -1)))
+
+
+def apenas_digitos(valor):
+    """Remove tudo que não for número"""
+    return _nao_digitos.sub('', valor)
+
+
+def digitos_verificadores(base):
+    """Os dois dígitos verificadores (texto) dos 9 primeiros dígitos do CPF"""
+    digitos = [ord(c) - 48 for c in base]
+    for pesos in _PESOS_CPF:
+        digitos.append(sum(d * p for d, p in zip(digitos, pesos)) * 10 % 11 % 10)
+    return f'{digitos[9]}{digitos[10]}'
+
+
+def _cpf_valido(digitos):
+    return (len(digitos) == 11 and digitos != digitos[0] * 11
+            and digitos_verificadores(digitos[:9]) == digitos[9:])
+
+
+@lru_cache(maxsize=TAMANHO_CACHE)
+def validar_cpf(cpf):
+    """Valida CPF brasileiro: 11 dígitos, não repetidos, com os dígitos verificadores corretos"""
+    return _cpf_valido(apenas_digitos(cpf))
+
+
+@lru_cache(maxsize=TAMANHO_CACHE)
+def validar_email(email):
+    """Valida formato e tamanho do e-mail"""
+    if not email or len(email) > TAMANHO_MAXIMO_EMAIL:
+        return False
+    local, arroba, _ = email.partition('@')
+    if not arroba or len(local) > TAMANHO_MAXIMO_LOCAL:
+        return False
+    return _padrao_email.fullmatch(email) is not None
+
+
+@lru_cache(maxsize=TAMANHO_CACHE)
+def validar_cep(cep):
+    """Valida CEP brasileiro: 8 dígitos a partir de 01000-000"""
+    digitos = apenas_digitos(cep)
+    return len(digitos) == 8 and digitos >= CEP_MINIMO
+
+
+def validar_idade(idade):
+    """Valida a idade (inteiro entre IDADE_MINIMA e IDADE_MAXIMA)"""
+    try:
+        idade = int(idade)
+    except (TypeError, ValueError):
+        return False
+    return IDADE_MINIMA <= idade <= IDADE_MAXIMA
+
+
+def formatar_cpf(cpf):
+    """Formata um CPF válido como 000.000.000-00"""
+    d = apenas_digitos(cpf)
+    return f"{d[:3]}.{d[3:6]}.{d[6:9]}-{d[9:]}"
+
+
+def formatar_cep(cep):
+    """Formata um CEP válido como 00000-000"""
+    d = apenas_digitos(cep)
+    return f"{d[:5]}-{d[5:]}"
+
+
+# Validação em lote: cada função recebe a coluna inteira e devolve uma lista de bool
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """Módulo numpy, importado só no primeiro lote grande (None se não estiver instalado)"""
+    try:
+        import numpy
+    except ImportError:
+        # Sem NumPy os lotes usam as funções de um valor
+        return None
+    return numpy
+
+
+def _cpfs_numpy(numpy, digitos):
+    """Dígitos verificadores de todos os CPFs com 11 dígitos calculados em matriz"""
+    resultado = [False] * len(digitos)
+    linhas = [i for i, d in enumerate(digitos) if len(d) == 11]
+    if not linhas:
+        return resultado
+    texto = ''.join([digitos[i] for i in linhas]).encode('ascii')
+    matriz = numpy.frombuffer(texto, dtype=numpy.uint8).reshape(-1, 11).astype(numpy.int32) - 48
+    primeiro = matriz[:, :9] @ numpy.array(_PESOS_CPF[0]) * 10 % 11 % 10
+    segundo = matriz[:, :10] @ numpy.array(_PESOS_CPF[1]) * 10 % 11 % 10
+    validos = ((primeiro == matriz[:, 9]) & (segundo == matriz[:, 10])
+               & (matriz != matriz[:, :1]).any(axis=1))
+    for i, valido in zip(linhas, validos.tolist()):
+        resultado[i] = valido
+    return resultado
+
+
+def validar_cpfs(cpfs):
+    """Valida uma coluna de CPFs"""
+    numpy = _numpy() if len(cpfs) >= LOTE_MINIMO_NUMPY else None
+    if numpy is None:
+        return [validar_cpf(cpf) for cpf in cpfs]
+    return _cpfs_numpy(numpy, [apenas_digitos(cpf) for cpf in cpfs])
+
+
+def validar_emails(emails):
+    """Valida uma coluna de e-mails"""
+    return [validar_email(email) for email in emails]
+
+
+def validar_ceps(ceps):
+    """Valida uma coluna de CEPs"""
+    return [validar_cep(cep) for cep in ceps]
+
+
+def validar_idades(idades):
+    """Valida uma coluna de idades"""
+    return [validar_idade(idade) for idade in idades]
@@ -0,0 +1,6 @@
+"""Os módulos da aplicação ficam em source_code.py/ e são importados pelo nome, como na aplicação"""
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(RAIZ, 'source_code.py'), os.path.join(RAIZ, 'benchmarks')]
@@ -0,0 +1,69 @@
+"""Busca por n-gramas montados sob demanda: mesmos resultados de uma conferência registro a registro"""
+import random
+
+import busca
+from busca import IndiceBusca, termos_consulta, texto_busca
+from dados_sinteticos import gerar_usuarios
+from modelo import como_usuario
+
+CONSULTAS = ['', 'a', 'si', 'silva', 'SILVA 1', 'joão', 'gmail', '123.4', '0', 'x', 'zzz', 'ana s']
+
+
+def esperado(usuarios, consulta):
+    termos = termos_consulta(consulta)
+
+    def contem(texto, termo):
+        if len(termo) >= busca.N:
+            return termo in texto
+        return any(palavra.startswith(termo) for palavra in texto.split())
+
+    return [usuario['id'] for usuario in usuarios
+            if all(contem(texto_busca(usuario), termo) for termo in termos)]
+
+
+def conferir(indice, usuarios):
+    for consulta in CONSULTAS:
+        assert [usuario['id'] for usuario in indice.buscar(consulta)] == esperado(usuarios, consulta), consulta
+
+
+def editado(usuario, sorteio):
+    return como_usuario(dict(usuario.para_dict(), nome=sorteio.choice(['Ana Silva', 'João Souza', 'Xavier Lima']),
+                             email=f"x{sorteio.randrange(1000)}@gmail.com"))
+
+
+def test_alteracoes_depois_das_listas_montadas(monkeypatch):
+    for limite in (busca.LIMITE_VARREDURA, 0):
+        # limite 0: registros novos entram extraindo as chaves de cada um
+        monkeypatch.setattr(busca, 'LIMITE_VARREDURA', limite)
+        sorteio = random.Random(limite)
+        usuarios = [como_usuario(usuario) for usuario in gerar_usuarios(800, semente=6)]
+        indice = IndiceBusca()
+        indice.adicionar_lote(usuarios[:500])
+        conferir(indice, usuarios[:500])
+
+        indice.adicionar_lote(usuarios[500:])
+        indice.adicionar(como_usuario(next(gerar_usuarios(1, semente=7, inicio=800))))
+        usuarios = [usuario for _, usuario in indice.registros.values()]
+        for _ in range(60):
+            posicao = sorteio.randrange(len(usuarios))
+            if sorteio.random() < 0.5:
+                indice.remover(usuarios.pop(posicao))
+            else:
+                novo = editado(usuarios[posicao], sorteio)
+                indice.substituir(usuarios[posicao], novo)
+                usuarios[posicao] = novo
+        conferir(indice, usuarios)
+
+
+def test_exclusoes_sem_listas_montadas_nao_contam_lixo():
+    usuarios = [como_usuario(usuario) for usuario in gerar_usuarios(300, semente=8)]
+    indice = IndiceBusca()
+    indice.adicionar_lote(usuarios)
+    for usuario in usuarios[:100]:
+        indice.remover(usuario)
+    assert indice.lixo == 0 and not indice.ocorrencias
+    conferir(indice, usuarios[100:])
+    for usuario in usuarios[100:200]:
+        indice.remover(usuario)
+    assert indice.lixo == 100
+    conferir(indice, usuarios[200:])
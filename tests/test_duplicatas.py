@@ -0,0 +1,37 @@
+"""Duplicatas: registros com blocos pendentes dão os mesmos resultados dos já calculados"""
+from dados_sinteticos import gerar_usuarios
+from duplicatas import IndiceDuplicatas, campos_usuario
+from modelo import como_usuario
+
+
+def resultados(indice, usuarios):
+    # Empates de semelhança podem vir em qualquer ordem
+    return [sorted((outro['id'], motivo) for outro, motivo, _ in indice.semelhantes(*campos_usuario(usuario)))
+            for usuario in usuarios]
+
+
+def test_pendentes_equivalem_aos_blocos_calculados():
+    usuarios = [como_usuario(usuario) for usuario in gerar_usuarios(1500, semente=11)]
+    # Cópias com o e-mail e o nome alterados, no mesmo CEP
+    copias = [como_usuario(dict(usuario.para_dict(), id=f'copia-{posicao}', email=usuario['email'].upper()))
+              for posicao, usuario in enumerate(usuarios[:40])]
+    copias += [como_usuario(dict(usuario.para_dict(), id=f'outra-{posicao}', email=f"outro{posicao}@x.com"))
+               for posicao, usuario in enumerate(usuarios[40:80])]
+    calculado = IndiceDuplicatas()
+    for usuario in usuarios + copias:
+        calculado.adicionar(usuario)
+    pendente = IndiceDuplicatas()
+    pendente.adicionar_lote(usuarios + copias)
+    assert len(pendente.pendentes) == len(usuarios) + len(copias) and not pendente.blocos
+
+    pendente.remover(usuarios[0])
+    calculado.remover(usuarios[0])
+    consultas = usuarios[:100] + copias
+    esperado = resultados(calculado, consultas)
+    assert sum(map(len, esperado)) >= len(copias)
+    assert resultados(pendente, consultas) == esperado
+
+    assert pendente.calcular_pendentes(500) == len(usuarios) + len(copias) - 501
+    assert resultados(pendente, consultas) == esperado
+    assert sorted(pendente.pares(), key=repr) == sorted(calculado.pares(), key=repr)
+    assert not pendente.pendentes
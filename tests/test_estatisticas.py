@@ -0,0 +1,24 @@
+"""Estatísticas: 'dias' conta dias do calendário, não dias que tiveram cadastro"""
+import estatisticas
+from dados_sinteticos import gerar_usuarios
+from estatisticas import IndiceEstatisticas
+from modelo import como_usuario, texto_epoca
+
+DIA = 86400
+
+
+def test_cadastros_dos_ultimos_dias_do_calendario(monkeypatch):
+    hoje = 20000
+    monkeypatch.setattr(estatisticas, 'epoca_agora', lambda: hoje * DIA + 3600)
+    base = [como_usuario(usuario) for usuario in gerar_usuarios(6, semente=12)]
+    # Cadastros há 0, 2, 2, 29, 30 e 90 dias
+    usuarios = [como_usuario(dict(usuario.para_dict(), data_cadastro=texto_epoca((hoje - atras) * DIA + 600)))
+                for usuario, atras in zip(base, (0, 2, 2, 29, 30, 90))]
+    indice = IndiceEstatisticas()
+    indice.adicionar_lote(usuarios)
+    rotulo = lambda atras: texto_epoca((hoje - atras) * DIA)[:10]
+
+    assert indice.resumo(30)['cadastros_por_dia'] == {rotulo(29): 1, rotulo(2): 2, rotulo(0): 1}
+    assert indice.resumo(1)['cadastros_por_dia'] == {rotulo(0): 1}
+    assert indice.resumo(0)['cadastros_por_dia'] == {}
+    assert len(indice.resumo()['cadastros_por_dia']) == 5
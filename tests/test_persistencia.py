@@ -0,0 +1,157 @@
+"""Diário compartilhado entre instâncias: conflitos, compactação e instâncias atrasadas"""
+import pytest
+
+from dados_sinteticos import gerar_usuarios
+from persistencia import ArmazenamentoDiario, ErroConflito, OP_INSERIR, OP_ATUALIZAR, OP_REMOVER
+
+
+def usuarios(quantidade, inicio=0):
+    return list(gerar_usuarios(quantidade, semente=1, inicio=inicio))
+
+
+def linhas_diario(armazenamento):
+    with open(armazenamento.caminho_diario, 'rb') as f:
+        return f.read().splitlines()
+
+
+def ids(armazenamento):
+    # iterar() não dispara a compactação, que mudaria a geração dos arquivos
+    return sorted(usuario['id'] for usuario in ArmazenamentoDiario(armazenamento.caminho).iterar())
+
+
+@pytest.fixture
+def caminho(tmp_path):
+    return str(tmp_path / 'usuarios.json')
+
+
+def inserir(armazenamento, lista):
+    armazenamento.aplicar([(OP_INSERIR, usuario) for usuario in lista], [])
+
+
+def test_recarga_mostra_o_que_outra_instancia_gravou(caminho):
+    a, b = ArmazenamentoDiario(caminho), ArmazenamentoDiario(caminho)
+    a.carregar(), b.carregar()
+    novos = usuarios(3)
+    inserir(b, novos)
+    assert [chave for chave, _ in a.novidades()] == [u['id'] for u in novos]
+    assert ids(a) == sorted(u['id'] for u in novos)
+
+
+def test_versao_desatualizada_e_recusada(caminho):
+    a, b = ArmazenamentoDiario(caminho), ArmazenamentoDiario(caminho)
+    usuario = usuarios(1)[0]
+    inserir(a, [usuario])
+    b.carregar()
+    a.aplicar([(OP_ATUALIZAR, dict(usuario, nome='Editado em A', versao=2))], [])
+
+    with pytest.raises(ErroConflito) as erro:
+        b.aplicar([(OP_ATUALIZAR, dict(usuario, nome='Editado em B', versao=2))], [])
+    assert len(erro.value.operacoes) == 1
+    # A interface desfaz a recusada com o estado gravado
+    assert b.novidades()[-1][1]['nome'] == 'Editado em A'
+    assert [u['nome'] for u in ArmazenamentoDiario(caminho).carregar()] == ['Editado em A']
+
+
+def test_exclusao_de_registro_alterado_e_recusada(caminho):
+    a, b = ArmazenamentoDiario(caminho), ArmazenamentoDiario(caminho)
+    usuario = usuarios(1)[0]
+    inserir(a, [usuario])
+    b.carregar()
+    a.aplicar([(OP_ATUALIZAR, dict(usuario, versao=2))], [])
+    with pytest.raises(ErroConflito):
+        b.aplicar([(OP_REMOVER, usuario)], [])
+    assert len(ids(a)) == 1
+
+
+def test_cpf_repetido_entre_instancias_e_recusado(caminho):
+    a, b = ArmazenamentoDiario(caminho), ArmazenamentoDiario(caminho)
+    a.carregar(), b.carregar()
+    primeiro, segundo = usuarios(2)
+    inserir(a, [primeiro])
+    with pytest.raises(ErroConflito):
+        inserir(b, [dict(segundo, cpf=primeiro['cpf'])])
+    assert ids(a) == [primeiro['id']]
+
+
+def test_compactacao_de_outra_instancia_entrega_o_diario_anterior(caminho):
+    a, b = ArmazenamentoDiario(caminho, limite=1000), ArmazenamentoDiario(caminho, limite=1000)
+    a.carregar(), b.carregar()
+    novos = usuarios(5)
+    for usuario in novos:
+        inserir(b, [usuario])
+    assert b.geracao == 1
+
+    assert [chave for chave, _ in a.novidades()] == [u['id'] for u in novos]
+    assert a.geracao == 1
+    extra = usuarios(1, inicio=5)
+    inserir(a, extra)
+    assert ids(b) == sorted(u['id'] for u in novos + extra)
+
+
+def test_instancia_duas_geracoes_atras_nao_apaga_o_diario(caminho):
+    a, b = ArmazenamentoDiario(caminho, limite=1000), ArmazenamentoDiario(caminho, limite=1000)
+    a.carregar(), b.carregar()
+    lista = iter(usuarios(30))
+    gravados = []
+    # B passa duas compactações e deixa linhas pendentes no diário da geração 2
+    while b.geracao < 2 or len(linhas_diario(b)) < 3:
+        gravados.append(next(lista))
+        inserir(b, gravados[-1:])
+    assert b.geracao == 2
+    antes = linhas_diario(b)
+    novo = next(lista)
+
+    with pytest.raises(ErroConflito) as erro:
+        inserir(a, [novo])
+    assert len(erro.value.operacoes) == 1
+    assert linhas_diario(b) == antes
+    assert ids(a) == sorted(u['id'] for u in gravados)
+
+    # Continua recusando até a recarga completa
+    assert a.novidades() is None
+    assert a.novidades() is None
+    with pytest.raises(ErroConflito):
+        inserir(a, [novo])
+
+    a.carregar()
+    # A recarga compacta em segundo plano (geração 3): B fica só uma geração atrás
+    a.fechar()
+    assert a.novidades() == []
+    inserir(a, [novo])
+    depois = [next(lista)]
+    inserir(b, depois)
+    assert ids(a) == sorted(u['id'] for u in gravados + [novo] + depois)
+
+
+def test_escrita_interrompida_e_descartada(caminho):
+    a = ArmazenamentoDiario(caminho)
+    a.carregar()
+    primeiro, segundo = usuarios(2)
+    inserir(a, [primeiro])
+    with open(a.caminho_diario, 'ab') as f:
+        f.write(b'{"op":"ins","id":"meia-lin')
+
+    b = ArmazenamentoDiario(caminho)
+    assert ids(b) == [primeiro['id']]
+    b.carregar()
+    inserir(b, [segundo])
+    assert ids(a) == sorted([primeiro['id'], segundo['id']])
+    assert all(linha.endswith(b'}') for linha in linhas_diario(a))
+
+
+def test_recarga_compacta_e_mantem_os_dados(caminho):
+    a = ArmazenamentoDiario(caminho, limite=1000)
+    a.carregar()
+    lista = usuarios(12)
+    for usuario in lista:
+        inserir(a, [usuario])
+    a.aplicar([(OP_REMOVER, lista[0])], [])
+    a.aplicar([(OP_ATUALIZAR, dict(lista[1], nome='Outro Nome', versao=2))], [])
+    a.fechar()
+
+    b = ArmazenamentoDiario(caminho, limite=1000)
+    carregados = {u['id']: u for u in b.carregar()}
+    b.fechar()
+    assert sorted(carregados) == sorted(u['id'] for u in lista[1:])
+    assert carregados[lista[1]['id']]['nome'] == 'Outro Nome'
+    assert ids(b) == sorted(carregados)
@@ -0,0 +1,90 @@
+"""ListaRegistros deve se comportar como uma lista comum sob trocas e exclusões"""
+import random
+
+import pytest
+
+from registros import ListaRegistros
+
+
+class Registro:
+    pass
+
+
+def conferir(lista, esperado):
+    assert len(lista) == len(esperado)
+    assert list(lista) == esperado
+    for posicao, registro in enumerate(esperado):
+        assert lista[posicao] is registro
+        assert lista.posicao(registro) == posicao
+    assert lista[-1:] == esperado[-1:]
+    for inicio, fim in [(0, 7), (3, 20), (len(esperado) - 5, len(esperado) + 3), (9, 2)]:
+        assert lista[inicio:fim] == esperado[inicio:fim]
+
+
+def test_trocas_e_exclusoes_equivalem_a_uma_lista():
+    sorteio = random.Random(3)
+    esperado = [Registro() for _ in range(200)]
+    lista = ListaRegistros(esperado)
+    for rodada in range(300):
+        acao = sorteio.random()
+        if acao < 0.1 and esperado:
+            registros = sorteio.sample(esperado, min(len(esperado), sorteio.randrange(1, 30)))
+            assert lista.remover_lote(registros) == sorted(map(esperado.index, registros))
+            esperado = [registro for registro in esperado if registro not in registros]
+        elif acao < 0.2 and esperado:
+            pares = [(antigo, Registro()) for antigo in sorteio.sample(esperado, min(len(esperado), 5))]
+            lista.trocar_lote(pares)
+            novos = dict(pares)
+            esperado = [novos.get(registro, registro) for registro in esperado]
+        elif acao < 0.4 and esperado:
+            registro = sorteio.choice(esperado)
+            assert lista.remover(registro) == esperado.index(registro)
+            esperado.remove(registro)
+        elif acao < 0.7 and esperado:
+            antigo, novo = sorteio.choice(esperado), Registro()
+            lista.trocar(antigo, novo)
+            esperado[esperado.index(antigo)] = novo
+        else:
+            novos = [Registro() for _ in range(sorteio.randrange(1, 4))]
+            lista.extend(novos)
+            esperado.extend(novos)
+        if rodada % 25 == 0:
+            conferir(lista, esperado)
+    conferir(lista, esperado)
+
+
+def test_registro_ausente():
+    presente, ausente = Registro(), Registro()
+    lista = ListaRegistros([presente])
+    assert ausente not in lista
+    with pytest.raises(ValueError):
+        lista.posicao(ausente)
+    with pytest.raises(ValueError):
+        lista.trocar(ausente, Registro())
+    lista.remover(presente)
+    with pytest.raises(IndexError):
+        lista[0]
+
+
+def test_exclusao_de_trecho_continuo():
+    # 10% da lista, abaixo do limite de compactação: as casas vazias ficam em sequência
+    esperado = [Registro() for _ in range(2000)]
+    lista = ListaRegistros(esperado)
+    for registro in esperado[300:500]:
+        lista.remover(registro)
+    del esperado[300:500]
+    assert lista._vazias
+    conferir(lista, esperado)
+    assert lista[300] is esperado[300] and lista[299:302] == esperado[299:302]
+
+
+def test_exclusao_em_lote_de_trecho_continuo():
+    # Como selecionar um intervalo na lista e excluir de uma vez
+    esperado = [Registro() for _ in range(3000)]
+    lista = ListaRegistros(esperado)
+    assert lista.remover_lote(esperado[1000:1350]) == list(range(1000, 1350))
+    del esperado[1000:1350]
+    assert lista._vazias
+    conferir(lista, esperado)
+    for inicio in (0, 990, 1000, 1010, len(esperado) - 50):
+        assert lista[inicio:inicio + 50] == esperado[inicio:inicio + 50]
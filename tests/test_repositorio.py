@@ -0,0 +1,73 @@
+"""Índices do repositório em sincronia depois de inclusões, edições e exclusões em lote"""
+import random
+
+import pytest
+
+from dados_sinteticos import gerar_usuarios
+from indice_tempo import CAMPOS_PERIODO
+from ordenacao import COLUNAS, LIMITE_INSERCAO_ORDENADA
+from servico import RepositorioUsuarios
+
+
+def visoes(repositorio):
+    """Tudo o que a interface e a API leem dos índices, em forma comparável"""
+    ids = lambda usuarios: [usuario['id'] for usuario in usuarios]
+    return {
+        'lista': ids(repositorio.usuarios),
+        'chaves': sorted(repositorio.indice.por_id),
+        'busca': {consulta: ids(repositorio.busca.buscar(consulta)) for consulta in ('', 'a', 'silva', '0')},
+        'ordenacao': [ids(repositorio.ordenacao.ordenados(coluna)[:]) for coluna in range(len(COLUNAS))],
+        'estatisticas': repositorio.estatisticas.resumo(),
+        'tempo': {campo: [item[:2] for item in repositorio.tempo.ordem(campo)] for campo in CAMPOS_PERIODO},
+        'duplicatas': sorted((a['id'], b['id'], motivo) for a, b, motivo, _ in repositorio.duplicatas.pares()),
+    }
+
+
+def consultar(repositorio):
+    # Preenche os caches preguiçosos, para que os lotes tenham de mantê-los
+    visoes(repositorio)
+
+
+def editado(usuario, sorteio):
+    return dict(usuario.para_dict(), nome=f"{usuario['nome']} {sorteio.choice(['Silva', 'Souza', 'Lima'])}",
+                idade=sorteio.randrange(18, 90))
+
+
+@pytest.mark.parametrize('tamanho', [7, LIMITE_INSERCAO_ORDENADA + 200])
+def test_lotes_mantem_indices_em_sincronia(tamanho):
+    sorteio = random.Random(tamanho)
+    repositorio = RepositorioUsuarios()
+    repositorio.inserir_lote(gerar_usuarios(2500, semente=2))
+    consultar(repositorio)
+
+    repositorio.inserir_lote(gerar_usuarios(tamanho, semente=3, inicio=2500))
+    consultar(repositorio)
+    alvos = sorteio.sample(list(repositorio.usuarios), tamanho)
+    repositorio.substituir_lote([(usuario, editado(usuario, sorteio)) for usuario in alvos])
+    consultar(repositorio)
+    alvos = sorteio.sample(list(repositorio.usuarios), tamanho)
+    posicoes = repositorio.remover_lote(alvos)
+
+    lista = list(repositorio.usuarios)
+    assert posicoes == sorted(posicoes) and len(posicoes) == tamanho
+    assert not set(alvos) & set(lista)
+    novo = RepositorioUsuarios()
+    novo.inserir_lote(lista)
+    assert visoes(repositorio) == visoes(novo)
+
+
+def test_operacoes_avulsas_mantem_indices_em_sincronia():
+    sorteio = random.Random(5)
+    repositorio = RepositorioUsuarios()
+    repositorio.inserir_lote(gerar_usuarios(500, semente=4))
+    consultar(repositorio)
+    for _ in range(100):
+        usuario = sorteio.choice(list(repositorio.usuarios))
+        if sorteio.random() < 0.5:
+            posicao = list(repositorio.usuarios).index(usuario)
+            assert repositorio.remover(usuario) == posicao
+        else:
+            repositorio.substituir(usuario, editado(usuario, sorteio))
+    novo = RepositorioUsuarios()
+    novo.inserir_lote(list(repositorio.usuarios))
+    assert visoes(repositorio) == visoes(novo)
@@ -0,0 +1,100 @@
+"""Snapshot binário: ida e volta sem perdas e blocos corrompidos"""
+import os
+
+import pytest
+
+from dados_sinteticos import gerar_usuarios
+from modelo import como_usuario
+from persistencia import ArmazenamentoDiario, OP_INSERIR
+from snapshot_binario import (SnapshotCorrompido, blocos_binario, gravar_binario, iterar_binario,
+                              _BLOCO, _BYTES_POR_USUARIO, _CABECALHO, _CRC)
+
+POR_BLOCO = 10
+
+
+def usuarios(quantidade, inicio=0):
+    return [como_usuario(usuario) for usuario in gerar_usuarios(quantidade, semente=9, inicio=inicio)]
+
+
+def fora_das_colunas():
+    # Valores que só cabem nos extras do bloco, e campos vazios
+    base = usuarios(4, inicio=500)
+    estranhos = [dict(base[0].para_dict(), cpf='123', idade='trinta', data_atualizacao='01/02/2024 10:00:00'),
+                 dict(base[1].para_dict(), nome='Nome\0com NUL', cep='sem cep', data_cadastro='ontem'),
+                 dict(base[2].para_dict(), idade=2 ** 40, email='')]
+    vazio = base[3].para_dict()
+    del vazio['data_cadastro'], vazio['versao']
+    return [como_usuario(dados) for dados in estranhos + [vazio]]
+
+
+@pytest.fixture
+def caminho(tmp_path):
+    return str(tmp_path / 'usuarios.bin')
+
+
+def inicio_do_bloco(caminho, numero):
+    """Posição (no arquivo) do cabeçalho do bloco 'numero', contado a partir de 1"""
+    with open(caminho, 'rb') as f:
+        dados = f.read()
+    pos = _CABECALHO.size + _CRC.size
+    for _ in range(numero - 1):
+        quantidade, texto, extras = _BLOCO.unpack_from(dados, pos)
+        pos += _BLOCO.size + _CRC.size + quantidade * _BYTES_POR_USUARIO + texto + extras
+    return pos
+
+
+def test_ida_e_volta_preserva_todos_os_campos(caminho):
+    originais = usuarios(25) + fora_das_colunas()
+    gravar_binario(caminho, originais, por_bloco=POR_BLOCO)
+    with open(caminho, 'rb') as f:
+        dados = f.read()
+    blocos = list(blocos_binario(dados))
+    assert [len(bloco) for bloco in blocos] == [10, 10, 9]
+    lidos = list(iterar_binario(dados))
+    assert [usuario.para_dict() for usuario in lidos] == [usuario.para_dict() for usuario in originais]
+    assert all(lido.mesmos_dados(original) for lido, original in zip(lidos, originais))
+
+
+def test_bloco_corrompido_entrega_os_anteriores(caminho):
+    gravar_binario(caminho, usuarios(30), por_bloco=POR_BLOCO)
+    with open(caminho, 'r+b') as f:
+        f.seek(inicio_do_bloco(caminho, 2) + _BLOCO.size + _CRC.size + 5)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    with open(caminho, 'rb') as f:
+        blocos = blocos_binario(f.read())
+        assert len(next(blocos)) == POR_BLOCO
+        with pytest.raises(SnapshotCorrompido, match='bloco 2 de 3'):
+            next(blocos)
+
+
+def test_arquivo_truncado(caminho):
+    gravar_binario(caminho, usuarios(30), por_bloco=POR_BLOCO)
+    with open(caminho, 'rb') as f:
+        dados = f.read()
+    with pytest.raises(SnapshotCorrompido, match='truncado no bloco 3 de 3'):
+        list(blocos_binario(dados[:-7]))
+
+
+def test_carga_mantem_blocos_integros_e_diario(caminho):
+    gravar_binario(caminho, usuarios(30), por_bloco=POR_BLOCO)
+    armazenamento = ArmazenamentoDiario(caminho)
+    novos = usuarios(2, inicio=30)
+    armazenamento.aplicar([(OP_INSERIR, usuario) for usuario in novos], [])
+    with open(caminho, 'r+b') as f:
+        f.seek(inicio_do_bloco(caminho, 3) + _BLOCO.size)
+        f.write(b'\0\0\0\0')
+    with open(caminho, 'rb') as f:
+        antes = f.read()
+
+    carregados = []
+    with pytest.raises(SnapshotCorrompido, match='bloco 3 de 3'):
+        for pagina in armazenamento.carregar_paginas(7):
+            carregados += pagina
+    armazenamento.fechar()
+    assert [usuario['id'] for usuario in carregados] == \
+        [usuario['id'] for usuario in usuarios(20) + novos]
+    # Sem compactação: o snapshot continua como estava
+    with open(caminho, 'rb') as f:
+        assert f.read() == antes